@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Measures a range query over places, scanning the objects in Python and
+asking the columnar cache of models.engine.columnar.
+
+Usage: ./benchmarks/bench_columnar.py [number of places]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(tempfile.mkdtemp())  # Start from an empty file.json
+
+from models import storage  # noqa: E402
+from models.engine.columnar import ColumnarCache  # noqa: E402
+from models.engine.records import record_class  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def build(count):
+    """Returns `count` place records with random prices, sizes and
+    positions."""
+    rng = random.Random(0)
+    template = Place(city_id="city", user_id="user", name="Place").to_dict()
+    record = record_class(Place)
+    places = []
+    for i in range(count):
+        attrs = dict(template, id="{:036d}".format(i),
+                     price_by_night=rng.randrange(20, 500),
+                     number_rooms=rng.randrange(1, 6),
+                     number_bathrooms=rng.randrange(1, 4),
+                     max_guest=rng.randrange(1, 10),
+                     latitude=rng.uniform(-60, 70),
+                     longitude=rng.uniform(-180, 180))
+        places.append(record.from_dict(attrs))
+    return places
+
+
+def scan(places):
+    """Returns the ids of the matching places, visiting each of them."""
+    return [place.id for place in places
+            if 80 <= place.price_by_night < 150 and place.max_guest >= 4 and
+            35 <= place.latitude <= 45 and -10 <= place.longitude <= 30]
+
+
+def timed(function, repeat=5):
+    """Returns the result of `function` and its best time in ms."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def main():
+    """Prints the time of the query both ways."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    places = build(count)
+    cache = ColumnarCache(storage, Place)
+    for place in places:
+        cache.index("Place." + place.id, place)
+    print("{} places".format(count))
+    expected, elapsed = timed(lambda: scan(places))
+    print("{:<10}{:>10} matches{:>12.1f} ms".format(
+        "scan", len(expected), elapsed))
+    keys, elapsed = timed(lambda: cache.query(
+        price_by_night__ge=80, price_by_night__lt=150, max_guest__ge=4,
+        bbox=(35, -10, 45, 30)))
+    print("{:<10}{:>10} matches{:>12.1f} ms".format(
+        "columnar", len(keys), elapsed))
+    assert sorted(key.split(".", 1)[1] for key in keys) == sorted(expected)
+
+
+if __name__ == "__main__":
+    main()
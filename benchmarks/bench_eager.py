@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""
+Counts the SQL statements DBStorage issues to render typical listing
+pages, with lazy loading and with the eager loading profiles of all().
+
+Runs on a scratch SQLite database in database mode.
+
+Usage: ./benchmarks/bench_eager.py [number of states]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+os.environ["HBNB_TYPE_STORAGE"] = "db"
+os.environ["HBNB_DB_URL"] = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "hbnb.db")
+
+from sqlalchemy import event  # noqa: E402
+from models import storage  # noqa: E402
+from models.city import City  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.state import State  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def populate(count):
+    """Adds `count` states of 5 cities of 4 places with 2 reviews each."""
+    user = User(email="owner@hbtn.io", password="pwd", first_name="First",
+                last_name="Last")
+    objs = [user]
+    for i in range(count):
+        state = State(name="State {}".format(i))
+        objs.append(state)
+        for j in range(5):
+            city = City(name="City {}".format(j), state_id=state.id)
+            objs.append(city)
+            for k in range(4):
+                place = Place(name="Place {}".format(k), city_id=city.id,
+                              user_id=user.id)
+                objs.append(place)
+                objs.extend(Review(text="Nice", place_id=place.id,
+                                   user_id=user.id) for _ in range(2))
+    storage.bulk_save(objs)
+    storage.close()
+
+
+def states_page(load):
+    """Renders every state with its cities and their places."""
+    lines = []
+    for state in storage.all(State, load=load).values():
+        for city in state.cities:
+            lines.extend(place.name for place in city.places)
+    return len(lines)
+
+
+def places_page(load):
+    """Renders every place with its owner and its reviews."""
+    lines = []
+    for place in storage.all(Place, load=load).values():
+        lines.append((place.user.email, len(place.reviews)))
+    return len(lines)
+
+
+def measure(page, load, engine):
+    """Returns the statements and seconds one rendering of `page` takes."""
+    statements = []
+
+    def count(*args):
+        statements.append(True)
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    page(load)
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    storage.close()
+    return len(statements), elapsed
+
+
+def main():
+    """Prints the statements and time of each page and loading profile."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    populate(count)
+    engine = storage._DBStorage__engine
+    print("{} states, 5 cities each, 4 places per city".format(count))
+    print("{:<12}{:<34}{:>12}{:>10}".format("page", "load", "statements",
+                                            "time (s)"))
+    for page, profiles in (
+            (states_page, (None, ["cities.places"],
+                           ["cities:joined.places:joined"])),
+            (places_page, (None, ["user", "reviews"]))):
+        for load in profiles:
+            statements, elapsed = measure(page, load, engine)
+            print("{:<12}{:<34}{:>12}{:>10.3f}".format(
+                page.__name__, ", ".join(load or ["lazy"]), statements,
+                elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Compares the FileStorage file formats: file size, save() time and
+reload() time for a store of generated objects.
+
+Usage: ./benchmarks/bench_formats.py [number of objects]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(tempfile.mkdtemp())
+
+from models.engine import serializers  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def populate(storage, count):
+    """Adds `count` objects, mostly reviews, to `storage`."""
+    for i in range(count):
+        if i % 10 == 0:
+            obj = User(email="user{}@hbtn.io".format(i), password="pwd",
+                       first_name="First", last_name="Last")
+        elif i % 10 < 4:
+            obj = Place(city_id="city", user_id="user", name="Place",
+                        description="A place to stay " * 4,
+                        number_rooms=i % 5, number_bathrooms=1,
+                        max_guest=i % 8, price_by_night=i % 300,
+                        latitude=37.77, longitude=-122.41)
+        else:
+            obj = Review(place_id="place", user_id="user",
+                         text="Great stay, would come back " * 3)
+        storage.new(obj)
+
+
+def main():
+    """Prints one line of measurements per available format."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("{} objects".format(count))
+    print("{:<10}{:>12}{:>12}{:>12}".format(
+        "format", "size (KB)", "save (s)", "reload (s)"))
+    for name in serializers.serializers:
+        os.environ["HBNB_FILE_FORMAT"] = name
+        FileStorage._FileStorage__objects = {}
+        storage = FileStorage()
+        populate(storage, count)
+        start = time.perf_counter()
+        storage.save()
+        save_time = time.perf_counter() - start
+        FileStorage._FileStorage__objects = {}
+        start = time.perf_counter()
+        storage.reload()
+        reload_time = time.perf_counter() - start
+        assert len(storage.all()) == count
+        print("{:<10}{:>12.0f}{:>12.3f}{:>12.3f}".format(
+            name, os.path.getsize("file.json") / 1024, save_time,
+            reload_time))
+        os.remove("file.json")
+
+
+if __name__ == "__main__":
+    main()
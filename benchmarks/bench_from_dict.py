@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""
+Compares the throughput of rehydrating objects from their dict form with
+cls(**record) and with the BaseModel.from_dict() fast path that reload()
+uses.
+
+Usage: ./benchmarks/bench_from_dict.py [number of objects]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def records(count):
+    """Returns the dicts of `count` objects, mostly reviews."""
+    out = []
+    for i in range(count):
+        if i % 10 == 0:
+            obj = User(email="user{}@hbtn.io".format(i), password="pwd",
+                       first_name="First", last_name="Last")
+        elif i % 10 < 4:
+            obj = Place(city_id="city", user_id="user", name="Place",
+                        number_rooms=i % 5, latitude=37.77,
+                        longitude=-122.41)
+        else:
+            obj = Review(place_id="place", user_id="user", text="Great")
+        out.append((type(obj), obj.to_dict()))
+    return out
+
+
+def measure(rebuild, data):
+    """Returns the seconds `rebuild` takes over every record."""
+    start = time.perf_counter()
+    for cls, record in data:
+        rebuild(cls, record)
+    return time.perf_counter() - start
+
+
+def main():
+    """Prints the objects per second of each way to rehydrate."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    data = records(count)
+    print("{} objects".format(count))
+    print("{:<16}{:>10}{:>14}".format("method", "time (s)", "objects/s"))
+    for name, rebuild in (
+            ("cls(**record)", lambda cls, record: cls(**record)),
+            ("from_dict()", lambda cls, record: cls.from_dict(record))):
+        elapsed = measure(rebuild, data)
+        print("{:<16}{:>10.3f}{:>14,.0f}".format(name, elapsed,
+                                                 count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""
+Measures the save() throughput of FileStorage under each HBNB_FSYNC
+policy, with the whole file rewritten by each save and in journaled mode.
+
+Run it on the filesystem the store lives on: a temporary directory on
+tmpfs makes every fsync free.
+
+Usage: ./benchmarks/bench_fsync.py [number of saves] [directory]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(tempfile.mkdtemp(dir=sys.argv[2] if len(sys.argv) > 2 else None))
+
+from models.engine.durability import FsyncPolicy  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def run(count):
+    """Saves a new object `count` times, returning saves per second."""
+    FileStorage._FileStorage__objects = {}
+    storage = FileStorage()
+    for i in range(100):
+        storage.new(User(email="user{}@hbtn.io".format(i), password="pwd"))
+    start = time.perf_counter()
+    for i in range(count):
+        storage.new(User(email="new{}@hbtn.io".format(i), password="pwd"))
+        storage.save()
+    elapsed = time.perf_counter() - start
+    for name in os.listdir("."):
+        os.remove(name)
+    return count / elapsed
+
+
+def main():
+    """Prints the saves per second of each policy and mode."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("{} saves on {}".format(count, os.getcwd()))
+    print("{:<10}{:>16}{:>16}".format("policy", "rewrite (/s)",
+                                      "journal (/s)"))
+    for policy in FsyncPolicy.MODES:
+        os.environ["HBNB_FSYNC"] = policy
+        os.environ.pop("HBNB_FILE_JOURNAL", None)
+        rewrite = run(count)
+        os.environ["HBNB_FILE_JOURNAL"] = "1"
+        journal = run(count)
+        print("{:<10}{:>16.0f}{:>16.0f}".format(policy, rewrite, journal))
+
+
+if __name__ == "__main__":
+    main()
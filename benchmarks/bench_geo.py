@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""
+Measures nearest-place lookups, scanning the places in Python and asking
+the grid index of models.engine.geo.
+
+Usage: ./benchmarks/bench_geo.py [number of places]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+os.chdir(tempfile.mkdtemp())  # Start from an empty file.json
+
+from models import storage  # noqa: E402
+from models.engine.geo import GeoIndex, distance_km  # noqa: E402
+from models.engine.records import record_class  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def build(count):
+    """Returns `count` place records spread over the contiguous US."""
+    rng = random.Random(0)
+    template = Place(city_id="city", user_id="user", name="Place").to_dict()
+    record = record_class(Place)
+    return [record.from_dict(dict(template, id="{:036d}".format(i),
+                                  latitude=rng.uniform(25, 49),
+                                  longitude=rng.uniform(-125, -67)))
+            for i in range(count)]
+
+
+def scan(places, lat, lon, radius_km, limit):
+    """Returns the ids of the nearest places, visiting each of them."""
+    found = []
+    for place in places:
+        distance = distance_km(lat, lon, place.latitude, place.longitude)
+        if distance <= radius_km:
+            found.append((distance, place.id))
+    found.sort()
+    return [id for _, id in found[:limit]]
+
+
+def timed(function, repeat=5):
+    """Returns the result of `function` and its best time in ms."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def main():
+    """Prints the time of a lookup both ways."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    places = build(count)
+    index = GeoIndex(storage, Place)
+    for place in places:
+        index.index("Place." + place.id, place)
+    print("{} places, 20 nearest within 10 km of San Francisco".format(
+        count))
+    expected, elapsed = timed(
+        lambda: scan(places, 37.7749, -122.4194, 10, 20), repeat=1)
+    print("{:<8}{:>6} found{:>12.2f} ms".format(
+        "scan", len(expected), elapsed))
+    found, elapsed = timed(
+        lambda: index.nearby(37.7749, -122.4194, 10, limit=20))
+    print("{:<8}{:>6} found{:>12.2f} ms".format(
+        "grid", len(found), elapsed))
+    assert [key.split(".", 1)[1] for key, _ in found] == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Measures the memory FileStorage takes per object when it keeps model
+instances, and in record mode (HBNB_FILE_RECORDS=1) when it keeps the
+compact records of models.engine.records.
+
+Usage: ./benchmarks/bench_records.py [number of objects]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from models.engine.records import record_class  # noqa: E402
+from models.place import Place  # noqa: E402
+from models.review import Review  # noqa: E402
+from models.user import User  # noqa: E402
+
+
+def templates():
+    """Returns the dict form of a user, a place and a review."""
+    return [
+        User(email="user@hbtn.io", password="pwd", first_name="First",
+             last_name="Last").to_dict(),
+        Place(city_id="city", user_id="user", name="Place",
+              description="A place to stay", number_rooms=3,
+              number_bathrooms=1, max_guest=4, price_by_night=100,
+              latitude=37.77, longitude=-122.41).to_dict(),
+        Review(place_id="place", user_id="user", text="Great stay").to_dict()]
+
+
+def build(count, rebuild):
+    """Returns `count` objects, 10% users, 30% places, 60% reviews, each
+    rebuilt by `rebuild` from a dict form with its own id."""
+    users, places, reviews = templates()
+    objs = []
+    for i in range(count):
+        n = i % 10
+        record = dict(users if n == 0 else places if n < 4 else reviews)
+        record["id"] = "{:036d}".format(i)
+        objs.append(rebuild(record))
+    return objs
+
+
+def measure(count, rebuild):
+    """Returns the bytes held by `count` objects and the seconds taken."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    objs = build(count, rebuild)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objs
+    return size, elapsed
+
+
+def main():
+    """Prints the memory per object of instances and of records."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    classes = {"User": User, "Place": Place, "Review": Review}
+    print("{} objects: 10% users, 30% places, 60% reviews".format(count))
+    print("{:<12}{:>12}{:>14}{:>10}".format("kept as", "total (MB)",
+                                            "bytes/object", "time (s)"))
+    for name, rebuild in (
+            ("instances", lambda r: classes[r["__class__"]].from_dict(r)),
+            ("records", lambda r: record_class(
+                classes[r["__class__"]]).from_dict(r))):
+        size, elapsed = measure(count, rebuild)
+        print("{:<12}{:>12.1f}{:>14.0f}{:>10.2f}".format(
+            name, size / 2 ** 20, size / count, elapsed))
+
+
+if __name__ == "__main__":
+    main()
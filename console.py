@@ -90,28 +90,22 @@ class HBNBCommand(cmd.Cmd):
         Usage:
             show <class_name> <id>
         """
-        match_attrs = False
         args = arg.split()
-        if args:
-            if args[0] not in HBNBCommand.__classes:
-                print("** class doesn't exist **")
-            try:
-                args[1]
-            except IndexError:
-                print("** instance id missing **")
-        else:
+        if not args:
             print("** class name missing **")
+            return
+        if args[0] not in HBNBCommand.__classes:
+            print("** class doesn't exist **")
+            return
+        if len(args) < 2:
+            print("** instance id missing **")
+            return
 
-        all_objs = storage.all()
-        for k, v in all_objs.items():
-            attr_names = k.split('.')
-            if attr_names[0] == args[0] and attr_names[1] == args[1]:
-                match_attrs = True
-                obj = eval(f"{args[0]}(**v)")
-                print(obj)
-                break
-        if not match_attrs:
+        obj = storage.get(args[0], args[1])
+        if obj is None:
             print("** no instance found **")
+        else:
+            print(obj)
 
     def do_destroy(self, line):
         """Deletes an instance based on the class name and id
@@ -129,13 +123,11 @@ class HBNBCommand(cmd.Cmd):
                 raise NameError()
             if len(my_list) < 2:
                 raise IndexError()
-            objects = storage.all()
-            key = my_list[0] + '.' + my_list[1]
-            if key in objects:
-                del objects[key]
-                storage.save()
-            else:
+            obj = storage.get(my_list[0], my_list[1])
+            if obj is None:
                 raise KeyError()
+            storage.delete(obj)
+            storage.save()
         except SyntaxError:
             print("** class name missing **")
         except NameError:
@@ -155,23 +147,15 @@ class HBNBCommand(cmd.Cmd):
         Usage:
             all [<class_name>]
         """
-        list1 = []
         args = arg.split()
         if args:
             if args[0] not in HBNBCommand.__classes:
                 print("** class doesn't exist **")
-            else:
-                all_objs = storage.all(eval(args[0])).copy()
-                for k, v in all_objs.items():
-                    if k.startswith(args[0] + "."):
-                        obj = eval(f"{args[0]}(**v)")
-                        list1.append(obj)
+                return
+            objs = storage.iter_all(eval(args[0]))
         else:
-            for k, v in all_objs.items():
-                class_name = k.split('.')[0]
-                obj = eval(f"{class_name}(**v)")
-                list1.append(obj)
-        print(f"[{', '.join(str(obj) for obj in list1)}]")
+            objs = storage.iter_all()
+        print(f"[{', '.join(str(obj) for obj in objs)}]")
 
     def do_update(self, line):
         """Updates an instanceby adding or updating attribute
@@ -191,20 +175,19 @@ class HBNBCommand(cmd.Cmd):
                 raise NameError()
             if len(my_list) < 2:
                 raise IndexError()
-            objects = storage.all()
-            key = my_list[0] + '.' + my_list[1]
-            if key not in objects:
+            v = storage.get(my_list[0], my_list[1])
+            if v is None:
                 raise KeyError()
             if len(my_list) < 3:
                 raise AttributeError()
             if len(my_list) < 4:
                 raise ValueError()
-            v = objects[key]
             try:
-                v.__dict__[my_list[2]] = eval(my_list[3])
+                value = eval(my_list[3])
             except Exception:
-                v.__dict__[my_list[2]] = my_list[3]
-                v.save()
+                value = my_list[3]
+            setattr(v, my_list[2], value)
+            v.save()
         except SyntaxError:
             print("** class name missing **")
         except NameError:
@@ -221,17 +204,11 @@ class HBNBCommand(cmd.Cmd):
     def count(self, line):
         """count the number of instances of a class
         """
-        counter = 0
         try:
             my_list = split(line, " ")
             if my_list[0] not in self.__classes:
                 raise NameError()
-            objects = storage.all()
-            for key in objects:
-                name = key.split('.')
-                if name[0] == my_list[0]:
-                    counter += 1
-            print(counter)
+            print(storage.count(my_list[0]))
         except NameError:
             print("** class doesn't exist **")
 
@@ -275,7 +252,6 @@ class HBNBCommand(cmd.Cmd):
             elif my_list[1][:6] == "update":
                 args = self.strip_clean(my_list)
                 if isinstance(args, list):
-                    obj = storage.all()
                     key = args[0] + ' ' + args[1]
                     for k, v in args[2].items():
                         self.do_update(key + ' "{}" "{}"'.format(k, v))
@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ State Module for HBNB project """
+import models
 from models.base_model import BaseModel, Base
 from sqlalchemy import Column, String
 from sqlalchemy.orm import relationship
@@ -9,9 +10,11 @@ class Amenity(BaseModel, Base):
     """Represents an Amenity for a MySQL database."""
     __tablename__ = "amenities"
     name = Column(String(128), nullable=False)
-    places = relationship(
-        "Place", 
-        secondary="place_amenity",
-        back_populates="amenities",  # Links to Place.amenities
-        viewonly=False
-    )
+
+    if models.storage_t == "db":
+        places = relationship(
+            "Place",
+            secondary="place_amenity",
+            back_populates="amenities",  # Links to Place.amenities
+            viewonly=False
+        )
@@ -1,12 +1,49 @@
 #!/usr/bin/python3
+import threading
+import weakref
 from uuid import uuid4
 from datetime import datetime
 import models #solves the problem of circular importation
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy.orm import Session, configure_mappers, declarative_base
+from sqlalchemy import Column, String, DateTime, event, inspect
 from datetime import datetime
 Base = declarative_base()
 
+# Instances changed since they were last marked clean, with the names of
+# their changed attributes. Kept outside of the instances so that to_dict()
+# and __str__ are unaffected.
+_changed = weakref.WeakKeyDictionary()
+_changed_lock = threading.Lock()
+
+# The dict form of instances, as returned by to_dict(), kept until they
+# change.
+_dicts = weakref.WeakKeyDictionary()
+
+
+def dirty_objects():
+    """Returns the instances changed since they were last marked clean."""
+    with _changed_lock:
+        return list(_changed)
+
+
+def _forget_dict(target, *args):
+    """Drops the cached dict form of an instance SQLAlchemy reloaded."""
+    _dicts.pop(target, None)
+
+
+def _forget_flushed(session, flush_context):
+    """Drops the cached dict form of the instances a flush wrote, as it
+    can set their attributes, such as foreign keys, through __dict__."""
+    for obj in (*session.new, *session.dirty):
+        _dicts.pop(obj, None)
+
+
+# Loads and refreshes assign __dict__ directly, bypassing __setattr__
+for _name in ("refresh", "refresh_flush", "expire"):
+    event.listen(Base, _name, _forget_dict, propagate=True)
+event.listen(Session, "after_flush", _forget_flushed)
+
+
 class BaseModel:
     """
     The BaseModel class provides a foundation for other classes in the project.
@@ -21,6 +58,18 @@ class BaseModel:
         created_at (datetime): The timestamp when the instance was created.
         updated_at (datetime): The timestamp of the
         last update to the instance.
+
+    Dirty tracking:
+        Setting a public attribute records it as changed, so that storages
+        can persist only what changed: changes() returns the changed
+        attributes and mark_clean() forgets them once persisted.
+
+    Dict form:
+        to_dict() builds the dict form, with its formatted timestamps, once
+        and returns copies of it until an attribute is set or deleted, or
+        the instance is flushed to or reloaded from the database.
+        Changes made in place to a mutable value, such as appending to a
+        list, are not seen: assign a new value instead.
     """
     
     id = Column(String(60), nullable=False, primary_key=True)
@@ -60,21 +109,94 @@ class BaseModel:
             for k, v in kwargs.items():
                 if k != '__class__':
                     if k == 'created_at' or k == 'updated_at':
-                        v = datetime.strptime(v, '%Y-%m-%dT%H:%M:%S')
+                        v = datetime.fromisoformat(v)
                     setattr(self, k, v)
 
+    @classmethod
+    def from_dict(cls, record):
+        """
+        Rebuilds an instance from its dictionary form, as made by to_dict(),
+        much faster than cls(**record): no id or timestamp is generated
+        unless missing from `record`, timestamps are parsed with
+        datetime.fromisoformat, and the attributes are assigned in bulk to
+        __dict__ rather than one setattr() at a time. The instance is
+        clean, see mark_clean().
+
+        Args:
+            record (dict): The attributes. The '__class__' key is ignored.
+
+        Returns:
+            BaseModel: The new instance.
+        """
+        mapper = inspect(cls, raiseerr=False)
+        if mapper is None:
+            obj = cls.__new__(cls)
+        else:
+            # Constructors configure the mappers on first use; new_instance()
+            # does not, and unconfigured attributes cannot be read
+            if not mapper.configured:
+                configure_mappers()
+            obj = mapper.class_manager.new_instance()
+        attrs = obj.__dict__
+        attrs.update(record)
+        attrs.pop('__class__', None)
+        for name in ('created_at', 'updated_at'):
+            value = attrs.get(name)
+            if value is None:
+                attrs[name] = datetime.now()
+            elif isinstance(value, str):
+                attrs[name] = datetime.fromisoformat(value)
+        if 'id' not in attrs:
+            attrs['id'] = str(uuid4())
+        return obj
+
+    def __setattr__(self, name, value):
+        """Sets an attribute, recording public ones as changed."""
+        super().__setattr__(name, value)
+        _dicts.pop(self, None)
+        if not name.startswith('_'):
+            changed = _changed.get(self)
+            if changed is None:
+                with _changed_lock:
+                    _changed.setdefault(self, set()).add(name)
+            else:
+                changed.add(name)
+
+    def __delattr__(self, name):
+        """Deletes an attribute, forgetting the cached dict form."""
+        super().__delattr__(name)
+        _dicts.pop(self, None)
+
+    def changes(self):
+        """
+        Returns the attributes set since the instance was last marked
+        clean, which is all of them for an instance never persisted.
+
+        Returns:
+            dict: The current value of each changed attribute, by name.
+        """
+        return {name: getattr(self, name, None)
+                for name in list(_changed.get(self, ()))}
+
+    def mark_clean(self):
+        """Forgets the changes, once the instance has been persisted."""
+        with _changed_lock:
+            _changed.pop(self, None)
+
     def __str__(self):
         """
         Returns a string representation of the BaseModel instance,
         including the class name, ID, and all attribute values.
+        SQLAlchemy's instance state is left out, but kept on the instance
+        so that it can still be modified and saved afterwards.
 
         Returns:
             str: A formatted string in the format
             "[ClassName] (id) {attributes}".
         """
-        if hasattr(self, '_sa_instance_state'):
-            del self._sa_instance_state
-        return f"[{type(self).__name__}] ({self.id}) {self.__dict__}"
+        attrs = {k: v for k, v in self.__dict__.items()
+                 if k != '_sa_instance_state'}
+        return f"[{type(self).__name__}] ({self.id}) {attrs}"
 
     def save(self):
         """
@@ -99,15 +221,18 @@ class BaseModel:
                   along with a __class__ key.
         """
         """returns a dictionary containing all keys/values of the instance"""
-        new_dict = self.__dict__.copy()
-        if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].isoformat()
-        if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].isoformat()
-        new_dict["__class__"] = self.__class__.__name__
-        if "_sa_instance_state" in new_dict:
-            del new_dict["_sa_instance_state"]
-        return new_dict
+        new_dict = _dicts.get(self)
+        if new_dict is None:
+            new_dict = self.__dict__.copy()
+            if "created_at" in new_dict:
+                new_dict["created_at"] = new_dict["created_at"].isoformat()
+            if "updated_at" in new_dict:
+                new_dict["updated_at"] = new_dict["updated_at"].isoformat()
+            new_dict["__class__"] = self.__class__.__name__
+            if "_sa_instance_state" in new_dict:
+                del new_dict["_sa_instance_state"]
+            _dicts[self] = new_dict
+        return new_dict.copy()
 
     def delete(self):
         del self
\ No newline at end of file
@@ -0,0 +1,244 @@
+#!/usr/bin/python3
+"""Asynchronous facade over the storage engines."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import event, exc, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from models.base_model import Base, dirty_objects
+from models.engine.db_storage import (DBStorage, database_url,
+                                      load_options, mapped_classes)
+from models.engine.geo import bbox_around, bbox_clause, nearest
+try:
+    from sqlalchemy.ext.asyncio import (async_scoped_session,
+                                        async_sessionmaker,
+                                        create_async_engine)
+except ImportError:
+    create_async_engine = None
+
+# Async driver of each database backend
+async_drivers = {"mysql": "aiomysql", "sqlite": "aiosqlite",
+                 "postgresql": "asyncpg"}
+
+
+def async_url(url):
+    """
+    Returns `url` with the async driver of its backend, such as
+    "mysql+aiomysql://..." for "mysql+mysqldb://...", or None if the
+    backend has no known async driver.
+    """
+    url = make_url(url)
+    driver = async_drivers.get(url.get_backend_name())
+    if driver is None:
+        return None
+    return url.set(drivername="{}+{}".format(url.get_backend_name(), driver))
+
+
+class _TrackedSession(Session):
+    """The session under each async session of AsyncStorage, which
+    remembers the objects its flushes wrote, to drop them from the cache
+    of the DBStorage once committed."""
+
+
+@event.listens_for(_TrackedSession, "after_flush")
+def _track_flush(session, flush_context):
+    """Adds the objects a flush wrote to the info of the session."""
+    session.info.setdefault("hbnb_touched", set()).update(
+        session.new, session.dirty, session.deleted)
+
+
+class AsyncStorage:
+    """
+    The AsyncStorage class lets coroutines use a storage engine without
+    blocking the event loop, so that an async web front end can serve
+    concurrent requests without a thread per storage call in flight:
+
+        storage = AsyncStorage(models.storage)
+        await storage.new(obj)
+        await storage.save()
+        obj = await storage.get(Place, place_id)
+
+    Over FileStorage, every call runs in a thread pool of `max_workers`
+    threads, which FileStorage can serve concurrently.
+
+    Over DBStorage, the calls go through SQLAlchemy's async engine, on
+    the async driver of the database (aiomysql for MySQL, aiosqlite for
+    SQLite), with a session per asyncio task, like the scoped session of
+    DBStorage is per thread. Relationships are not loaded lazily on
+    access there: pass their paths to `load`, see load_options(). Without
+    the sqlalchemy[asyncio] extra or the driver, the calls run instead on
+    a single thread that owns the session of the DBStorage, so they are
+    served one at a time; `native` tells which is used. Either way, the
+    changes drop the cache entries of the DBStorage they touch.
+    """
+
+    def __init__(self, storage, max_workers=None):
+        """
+        Initializes the facade.
+
+        Args:
+            storage (FileStorage or DBStorage): The engine to wrap.
+            max_workers (int): Threads running FileStorage calls.
+        """
+        self.__storage = storage
+        self.__engine = None
+        self.__session = None
+        if isinstance(storage, DBStorage):
+            self.__engine = self.__async_engine()
+            max_workers = 1
+        if self.__engine is not None:
+            self.__session = async_scoped_session(
+                async_sessionmaker(self.__engine, expire_on_commit=False,
+                                   sync_session_class=_TrackedSession),
+                scopefunc=asyncio.current_task)
+            self.__executor = None
+        else:
+            self.__executor = ThreadPoolExecutor(
+                max_workers, thread_name_prefix="hbnb-storage")
+
+    @staticmethod
+    def __async_engine():
+        """Returns an async engine on the database, or None if none can be
+        created."""
+        url = async_url(database_url())
+        if create_async_engine is None or url is None:
+            return None
+        try:
+            return create_async_engine(url, pool_pre_ping=True)
+        except (ImportError, exc.NoSuchModuleError):
+            return None
+
+    @property
+    def native(self):
+        """True if calls go through the async engine, not a thread."""
+        return self.__engine is not None
+
+    async def __call(self, method, *args, **kwargs):
+        """Runs a method of the wrapped storage in the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.__executor, partial(method, *args, **kwargs))
+
+    async def all(self, cls=None, load=None):
+        """
+        Returns the objects of `cls`, or of every class, like the all()
+        method of the wrapped storage.
+        """
+        if self.__session is None:
+            return await self.__call(self.__storage.all, cls, load)
+        return await self.find(cls, load)
+
+    async def find(self, cls, load=None, **filters):
+        """
+        Returns the objects of `cls` whose attributes equal the given
+        values, like the find() method of the wrapped storage.
+        """
+        if self.__session is None:
+            return await self.__call(self.__storage.find, cls, load,
+                                     **filters)
+        objs = {}
+        for mapped in mapped_classes(cls, load):
+            query = select(mapped).filter_by(**filters).options(
+                *load_options(mapped, load or ()))
+            for obj in await self.__session.scalars(query):
+                objs["{}.{}".format(type(obj).__name__, obj.id)] = obj
+        return objs
+
+    async def within(self, cls, bbox):
+        """
+        Returns the objects of `cls` inside a (south, west, north, east)
+        box, like the within() method of the wrapped storage.
+        """
+        if self.__session is None:
+            return await self.__call(self.__storage.within, cls, bbox)
+        objs = {}
+        for mapped in mapped_classes(cls):
+            query = select(mapped).where(bbox_clause(mapped, bbox))
+            for obj in await self.__session.scalars(query):
+                objs["{}.{}".format(type(obj).__name__, obj.id)] = obj
+        return objs
+
+    async def nearby(self, cls, lat, lon, radius_km, limit=None):
+        """
+        Returns the objects of `cls` within `radius_km` of (lat, lon),
+        nearest first, like the nearby() method of the wrapped storage.
+        """
+        if self.__session is None:
+            return await self.__call(self.__storage.nearby, cls, lat, lon,
+                                     radius_km, limit)
+        objs = await self.within(cls, bbox_around(lat, lon, radius_km))
+        return nearest(objs, lat, lon, radius_km, limit)
+
+    async def get(self, cls, id):
+        """
+        Returns the object of `cls` with the given id, or None.
+
+        Args:
+            cls (type or str): The class, or class name, of the object.
+            id (str): The id of the object.
+        """
+        if self.__session is None:
+            return await self.__call(self.__storage.get, cls, id)
+        mapped = mapped_classes(cls)
+        if not mapped:
+            return None
+        return await self.__session.get(mapped[0], id)
+
+    async def count(self, cls=None):
+        """Returns the number of objects of `cls`, or of every class."""
+        if self.__session is None:
+            return await self.__call(self.__storage.count, cls)
+        total = 0
+        for mapped in mapped_classes(cls):
+            total += await self.__session.scalar(
+                select(func.count()).select_from(mapped))
+        return total
+
+    async def new(self, obj):
+        """Adds `obj` to the storage."""
+        if self.__session is None:
+            return await self.__call(self.__storage.new, obj)
+        self.__session.add(obj)
+        self.__storage.invalidate((obj,))
+
+    async def delete(self, obj=None):
+        """Deletes `obj` from the storage, if not None."""
+        if self.__session is None:
+            return await self.__call(self.__storage.delete, obj)
+        if obj is not None:
+            await self.__session.delete(obj)
+            self.__storage.invalidate((obj,))
+
+    async def save(self):
+        """Persists the changes, like the save() method of the storage."""
+        if self.__session is None:
+            return await self.__call(self.__storage.save)
+        session = self.__session()
+        await session.commit()
+        self.__storage.invalidate(session.info.pop("hbnb_touched", ()))
+        for obj in dirty_objects():
+            if isinstance(obj, Base) and obj in session:
+                obj.mark_clean()
+
+    async def reload(self):
+        """Loads the storage, creating the tables of a database."""
+        if self.__session is None:
+            return await self.__call(self.__storage.reload)
+        async with self.__engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    async def close(self):
+        """Ends the session of the current task, like the close() method
+        of the wrapped storage."""
+        if self.__session is None:
+            return await self.__call(self.__storage.close)
+        await self.__session.remove()
+
+    async def dispose(self):
+        """Releases the connections or threads of the facade, which must
+        not be used afterwards."""
+        if self.__engine is not None:
+            await self.__engine.dispose()
+        else:
+            self.__executor.shutdown()
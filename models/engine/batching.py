@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+"""Write coalescing shared by the storage engines."""
+import abc
+import atexit
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+from os import getenv
+
+_storages = weakref.WeakSet()
+
+
+class _Counters:
+    """The batch depth and pending saves of a storage."""
+
+    def __init__(self):
+        """Starts with no batch open and nothing pending."""
+        self.depth = 0
+        self.pending = 0
+        self.since = None
+
+
+class _ThreadCounters(_Counters, threading.local):
+    """The batch depth and pending saves of each thread of a storage."""
+
+
+@atexit.register
+def _flush_all():
+    """Persists the saves still pending in every storage at exit."""
+    for storage in list(_storages):
+        storage.flush()
+
+
+class SaveBatching(abc.ABC):
+    """
+    The SaveBatching class lets many save() calls collapse into a single
+    persist. A storage engine inherits from it and implements _persist(),
+    which writes everything to its backend; save() then decides whether
+    to persist now or later.
+
+    Saves are deferred inside a `with storage.batch():` block, and flushed
+    when the outermost block exits. Outside of a batch, every save()
+    persists right away unless an autoflush policy is configured:
+
+        HBNB_AUTOFLUSH_COUNT: persist once this many saves are pending.
+        HBNB_AUTOFLUSH_INTERVAL: persist once the oldest pending save is
+                                 this many seconds old.
+
+    The policy is checked on each save(), and the interval also by a timer
+    started with the first pending save, so that an idle process persists
+    it too. Pending saves are always persisted by flush(), close() and at
+    interpreter exit.
+
+    Engines also implement bulk_new(), on which bulk_save() builds.
+
+    The counters are shared by every thread: a batch open in one thread
+    also defers the saves of the others until it exits. Engines that
+    persist the changes of each thread separately, such as DBStorage with
+    its session per thread, set _batches_per_thread, and each thread then
+    has its own counters: a batch defers the saves of its thread only,
+    and flush() persists the saves of the calling thread. As no other
+    thread can persist them, the interval is then only checked by the
+    next save() of the thread.
+    """
+
+    _batches_per_thread = False
+
+    def __init__(self):
+        """Reads the autoflush policy from the environment."""
+        self.__lock = threading.Lock()
+        self.__counters = (_ThreadCounters() if self._batches_per_thread
+                           else _Counters())
+        self.__max_count = int(getenv("HBNB_AUTOFLUSH_COUNT", "0"))
+        self.__max_delay = float(getenv("HBNB_AUTOFLUSH_INTERVAL", "0"))
+        self.__timer = None
+        _storages.add(self)
+
+    @abc.abstractmethod
+    def _persist(self):
+        """Writes every change to the backend. Implemented by engines."""
+
+    def save(self):
+        """
+        Requests that changes be persisted, which happens right away unless
+        a batch is open or the autoflush policy allows waiting.
+        """
+        counters = self.__counters
+        with self.__lock:
+            if counters.pending == 0:
+                counters.since = time.monotonic()
+            counters.pending += 1
+            if counters.depth:
+                return
+            if self.__max_count or self.__max_delay:
+                due = (self.__max_count and
+                       counters.pending >= self.__max_count or
+                       self.__max_delay and
+                       time.monotonic() - counters.since >= self.__max_delay)
+                if not due:
+                    self.__schedule()
+                    return
+        self.flush()
+
+    def __schedule(self):
+        """Starts the timer persisting the pending saves once the interval
+        has elapsed, unless it runs already. Called with the lock held."""
+        if (not self.__max_delay or self._batches_per_thread or
+                self.__timer is not None):
+            return
+        delay = self.__counters.since + self.__max_delay - time.monotonic()
+        self.__timer = threading.Timer(max(delay, 0), self.__flush_due)
+        self.__timer.daemon = True
+        self.__timer.start()
+
+    def __flush_due(self):
+        """Persists the pending saves when the timer fires, unless a batch
+        is open, which persists them when it exits."""
+        with self.__lock:
+            self.__timer = None
+            if self.__counters.depth:
+                return
+        self.flush()
+
+    @abc.abstractmethod
+    def bulk_new(self, objs):
+        """Adds many objects at once. Implemented by engines."""
+
+    def bulk_save(self, objs):
+        """
+        Saves many objects with a single persist: the bulk counterpart of
+        calling save() on each of them.
+
+        Args:
+            objs (iterable): The BaseModel instances to save.
+        """
+        objs = list(objs)
+        now = datetime.now()
+        for obj in objs:
+            obj.updated_at = now
+        self.bulk_new(objs)
+        self.save()
+
+    def flush(self):
+        """Persists the pending saves, if any."""
+        counters = self.__counters
+        with self.__lock:
+            pending, counters.pending = counters.pending, 0
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+        if pending:
+            self._persist()
+
+    @property
+    def pending(self):
+        """The number of save() calls not persisted yet."""
+        return self.__counters.pending
+
+    @contextmanager
+    def batch(self):
+        """
+        Defers every save() made inside the block, then persists once when
+        the outermost batch exits, even if it exits with an exception.
+
+        Usage:
+            with storage.batch():
+                for obj in objs:
+                    obj.save()
+        """
+        counters = self.__counters
+        with self.__lock:
+            counters.depth += 1
+        try:
+            yield self
+        finally:
+            with self.__lock:
+                counters.depth -= 1
+                depth = counters.depth
+            if depth == 0:
+                self.flush()
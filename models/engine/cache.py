@@ -0,0 +1,92 @@
+#!/usr/bin/python3
+"""Read-through cache of DBStorage."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    The LRUCache class keeps up to `max_size` entries, evicting the least
+    recently used one when full, each for at most `ttl` seconds. It is
+    safe to share between threads.
+
+    Attributes:
+        max_size (int): The maximum number of entries.
+        ttl (float): Seconds an entry stays valid, or 0 for no limit.
+    """
+
+    def __init__(self, max_size, ttl=0):
+        """
+        Initializes an empty cache.
+
+        Raises:
+            ValueError: If `max_size` is not positive or `ttl` negative.
+        """
+        if max_size <= 0 or ttl < 0:
+            raise ValueError("invalid cache size or ttl")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+
+    def get(self, key):
+        """
+        Returns the value cached under `key`, or None if there is none or
+        it has expired.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and self.ttl and \
+                    time.monotonic() - entry[1] >= self.ttl:
+                del self.__entries[key]
+                self.__expirations += 1
+                entry = None
+            if entry is None:
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Caches `value` under `key`, evicting the oldest entry if full."""
+        with self.__lock:
+            self.__entries[key] = (value, time.monotonic())
+            self.__entries.move_to_end(key)
+            if len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def invalidate(self, *keys):
+        """Drops the entries of `keys`."""
+        with self.__lock:
+            for key in keys:
+                self.__entries.pop(key, None)
+
+    def clear(self):
+        """Drops every entry."""
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        """
+        Returns the figures of the cache.
+
+        Returns:
+            dict: The number of entries and the size limit, the number of
+                  hits and misses and the hit ratio, and the number of
+                  entries evicted when full or dropped on expiry.
+        """
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return {"size": len(self.__entries), "max_size": self.max_size,
+                    "ttl": self.ttl, "hits": self.__hits,
+                    "misses": self.__misses,
+                    "hit_ratio": self.__hits / lookups if lookups else 0.0,
+                    "evictions": self.__evictions,
+                    "expirations": self.__expirations}
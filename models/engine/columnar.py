@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+"""Columnar cache of numeric model attributes, for range queries."""
+import operator
+import threading
+from array import array
+import numpy
+
+# Numeric attributes of Place cached by default
+place_columns = ("price_by_night", "number_rooms", "number_bathrooms",
+                 "max_guest", "latitude", "longitude")
+
+operators = {"lt": operator.lt, "le": operator.le, "gt": operator.gt,
+             "ge": operator.ge, "eq": operator.eq}
+
+_NAN = float("nan")
+
+
+class ColumnarCache:
+    """
+    The ColumnarCache class answers queries such as "places under 100 a
+    night for 4 guests or more within a box" without visiting every
+    object:
+
+        cache = ColumnarCache(storage, Place)
+        keys = cache.query(price_by_night__lt=100, max_guest__ge=4,
+                           bbox=(37.7, -122.5, 37.8, -122.4),
+                           order_by="price_by_night", limit=20)
+
+    Conditions are an attribute name, two underscores and one of lt, le,
+    gt, ge or eq. Missing values are stored as NaN, which no condition
+    matches and which sort last. The cache follows the objects as they
+    are stored with new(), which the save() method of a model calls, and
+    deleted. The storage must be a FileStorage; in database mode, the
+    same filters are better expressed as SQL. The columns are filtered
+    with NumPy, which the cache needs.
+
+    Attributes:
+        cls (type): The cached model class.
+        columns (tuple): The cached attribute names.
+    """
+
+    def __init__(self, storage, cls, columns=place_columns):
+        """
+        Builds the columns from the objects of `cls` in `storage`, and
+        registers with it to follow their changes.
+
+        Raises:
+            ValueError: If `storage` has no listeners.
+        """
+        if not hasattr(storage, "add_listener"):
+            raise ValueError("the columnar cache needs a FileStorage")
+        self.cls = cls
+        self.columns = tuple(columns)
+        self.__storage = storage
+        self.__prefix = cls.__name__ + "."
+        self.__lock = threading.Lock()
+        self.reset()
+        storage.load(cls)
+        storage.add_listener(self)
+
+    def close(self):
+        """Stops following the storage."""
+        self.__storage.remove_listener(self)
+
+    def reset(self):
+        """Empties the cache, as the storage rebuilds its indexes."""
+        with self.__lock:
+            self.__keys = []
+            self.__rows = {}
+            self.__data = {name: array("d") for name in self.columns}
+
+    def index(self, key, obj):
+        """Stores the attributes of the object `key`, added or updated."""
+        if not key.startswith(self.__prefix):
+            return
+        values = []
+        for name in self.columns:
+            value = getattr(obj, name, None)
+            values.append(_NAN if value is None else float(value))
+        with self.__lock:
+            row = self.__rows.get(key)
+            if row is None:
+                self.__rows[key] = len(self.__keys)
+                self.__keys.append(key)
+                for name, value in zip(self.columns, values):
+                    self.__data[name].append(value)
+            else:
+                for name, value in zip(self.columns, values):
+                    self.__data[name][row] = value
+
+    def unindex(self, key):
+        """Removes the object `key`, moving the last row in its place."""
+        with self.__lock:
+            row = self.__rows.pop(key, None)
+            if row is None:
+                return
+            last = self.__keys.pop()
+            if last != key:
+                self.__keys[row] = last
+                self.__rows[last] = row
+            for column in self.__data.values():
+                value = column.pop()
+                if last != key:
+                    column[row] = value
+
+    def __len__(self):
+        """Returns the number of cached objects."""
+        return len(self.__keys)
+
+    def __conditions(self, bbox, conditions):
+        """Parses the conditions into (column, operator, value) tuples and
+        the longitude range of `bbox`."""
+        parsed = []
+        for condition, value in conditions.items():
+            name, _, op = condition.rpartition("__")
+            if name not in self.columns or op not in operators:
+                raise ValueError("unknown condition: {}".format(condition))
+            parsed.append((name, operators[op], value))
+        lng = None
+        if bbox is not None:
+            south, west, north, east = bbox
+            parsed += [("latitude", operator.ge, south),
+                       ("latitude", operator.le, north)]
+            if west <= east:
+                parsed += [("longitude", operator.ge, west),
+                           ("longitude", operator.le, east)]
+            else:
+                lng = (west, east)  # The box crosses the antimeridian
+        return parsed, lng
+
+    def query(self, bbox=None, order_by=None, descending=False, limit=None,
+              **conditions):
+        """
+        Returns the keys of the objects matching every condition.
+
+        Args:
+            bbox (tuple): Optional (south, west, north, east) box that the
+                          latitude and longitude must fall in.
+            order_by (str): Optional column to sort the keys by.
+            descending (bool): Whether to sort in descending order.
+            limit (int): Optional maximum number of keys returned.
+            **conditions: Conditions such as price_by_night__lt=100.
+
+        Returns:
+            list: The "ClassName.id" keys of the matching objects.
+
+        Raises:
+            ValueError: If a condition or `order_by` is not a column.
+        """
+        parsed, lng = self.__conditions(bbox, conditions)
+        if order_by is not None and order_by not in self.columns:
+            raise ValueError("unknown column: {}".format(order_by))
+        self.__storage.load(self.cls)
+        with self.__lock:
+            rows = self.__select(parsed, lng, order_by, descending)
+            if limit is not None:
+                rows = rows[:limit]
+            keys = self.__keys
+            return [keys[row] for row in rows]
+
+    def fetch(self, **kwargs):
+        """
+        Returns the objects whose keys query() returns, with the same
+        arguments, in the same order.
+
+        Returns:
+            dict: The objects, keyed by "ClassName.id".
+        """
+        get = self.__storage.get
+        objs = {}
+        for key in self.query(**kwargs):
+            obj = get(self.cls, key.split(".", 1)[1])
+            if obj is not None:
+                objs[key] = obj
+        return objs
+
+    def __select(self, parsed, lng, order_by, descending):
+        """Returns the matching rows, filtering whole columns with NumPy.
+        The views share the memory of the arrays, and are released before
+        the lock is, as arrays cannot grow while viewed."""
+        if not self.__keys:
+            return []
+        view = {name: numpy.frombuffer(column, dtype=numpy.float64)
+                for name, column in self.__data.items()}
+        mask = numpy.ones(len(self.__keys), dtype=bool)
+        for name, op, value in parsed:
+            mask &= op(view[name], value)
+        if lng is not None:
+            mask &= ((view["longitude"] >= lng[0]) |
+                     (view["longitude"] <= lng[1]))
+        rows = numpy.flatnonzero(mask)
+        if order_by is not None:
+            values = view[order_by][rows]
+            rows = rows[numpy.argsort(-values if descending else values,
+                                      kind="stable")]
+        return rows.tolist()
@@ -1,9 +1,18 @@
 #!/usr/bin/python3
 import os
 from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy import orm
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.pool import QueuePool
 from sqlalchemy import create_engine #create a 
 #connection engine that serves as an interface between your Python application and the database
-from models.base_model import Base, BaseModel
+from models.base_model import Base, BaseModel, dirty_objects
+from models.engine.batching import SaveBatching
+from models.engine.cache import LRUCache
+from models.engine.geo import (add_geohash_column, bbox_around,
+                               bbox_clause, nearest)
+from models.engine.pooling import TimedQueuePool, ping_idle, uses_queue_pool
 from models.city import City
 from models.state import State
 from models.amenity import Amenity
@@ -16,45 +25,423 @@ host = os.environ.get("HBNB_MYSQL_HOST")
 database = os.environ.get("HBNB_MYSQL_DB")
 env = os.environ.get("HBNB_ENV")
 
-class DBStorage:
+classes = {"Amenity": Amenity, "City": City, "Place": Place,
+           "Review": Review, "State": State, "User": User}
+
+# Loader option of each strategy accepted in a load path
+strategies = {"selectin": "selectinload", "joined": "joinedload",
+              "subquery": "subqueryload", "lazy": "lazyload"}
+
+
+def database_url():
+    """the SQLAlchemy URL of the database: HBNB_DB_URL if set, else the
+    MySQL database named by the HBNB_MYSQL_* variables"""
+    return os.environ.get("HBNB_DB_URL") or \
+        'mysql+mysqldb://{}:{}@{}/{}'.format(user, password, host, database)
+
+
+def mapped_classes(cls, load=None):
+    """the mapped classes selected by `cls`: a class, a class name, or
+    None for all of them, which cannot be combined with `load`"""
+    if cls is None:
+        if load:
+            raise ValueError("load needs a class")
+        return list(classes.values())
+    if isinstance(cls, str):
+        return [classes[cls]] if cls in classes else []
+    return [cls]
+
+
+def load_options(cls, paths):
+    """build the loader options that eagerly load relationship paths of
+    `cls`, such as "cities.places" for State
+
+    Each relationship of a path is loaded with the strategy named after a
+    colon, as in "cities:joined.places", or else the one set by
+    relationship(..., info={"load": strategy}), or else "selectin" for
+    collections, which costs one query per relationship whatever the
+    number of parents, and "joined" for many-to-one references, which
+    adds a join to the parent query.
+
+    Raises:
+        ValueError: If a relationship or strategy does not exist.
+    """
+    options = []
+    for path in paths:
+        option, current = None, cls
+        for segment in path.split("."):
+            name, _, strategy = segment.partition(":")
+            prop = inspect(current).relationships.get(name)
+            if prop is None:
+                raise ValueError("{} has no relationship {}".format(
+                    current.__name__, name))
+            strategy = strategy or prop.info.get("load") or (
+                "selectin" if prop.uselist else "joined")
+            if strategy not in strategies:
+                raise ValueError("unknown loading strategy: {}".format(
+                    strategy))
+            loader = getattr(orm if option is None else option,
+                             strategies[strategy])
+            option = loader(getattr(current, name))
+            current = prop.mapper.class_
+        options.append(option)
+    return options
+
+
+# Pool settings read from the environment: variable, argument, type
+pool_settings = (("HBNB_DB_POOL_SIZE", "pool_size", int),
+                 ("HBNB_DB_MAX_OVERFLOW", "max_overflow", int),
+                 ("HBNB_DB_POOL_RECYCLE", "pool_recycle", int),
+                 ("HBNB_DB_POOL_TIMEOUT", "pool_timeout", float))
+
+
+class DBStorage(SaveBatching):
+    """MySQL storage through SQLAlchemy.
+
+    The database is the MySQL one named by the HBNB_MYSQL_* variables,
+    unless HBNB_DB_URL gives another SQLAlchemy URL, such as a SQLite file
+    for tests. The connection pool is tuned by HBNB_DB_POOL_SIZE,
+    HBNB_DB_MAX_OVERFLOW, HBNB_DB_POOL_RECYCLE (seconds after which a
+    connection is replaced) and HBNB_DB_POOL_TIMEOUT (seconds a checkout
+    waits for a free connection), which default to SQLAlchemy's.
+
+    Every checkout tests its connection with a round-trip, unless
+    HBNB_DB_PRE_PING_INTERVAL is set to a number of seconds: only the
+    connections idle for that long are then tested. pool_stats() reports
+    the state of the pool and how long checkouts waited.
+
+    Relationships are loaded lazily, one query per parent, unless all()
+    or find() is given the relationship paths to `load` eagerly, see
+    load_options(): listing states with their cities and places then
+    takes three queries instead of one per state and per city.
+
+    Setting HBNB_DB_CACHE_SIZE to a number of entries enables a read-through
+    cache of get() by "ClassName.id" and of all() by class, which keeps the
+    column values of the rows for HBNB_DB_CACHE_TTL seconds (60 by default,
+    0 for no limit), least recently used first out. iter_all() is served
+    from it too, but streams without filling it. An entry is dropped when
+    an object of its key or class is added or deleted, and when a save()
+    commits changes to them, through this storage or an AsyncStorage
+    over it; changes made by other processes show once entries expire.
+    cache_stats() reports the hits and misses.
+    """
     __engine = None
     __session = None
+    # Each thread commits its own session, so it batches its own saves
+    _batches_per_thread = True
 
     def __init__(self):
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.format(user,
-                                                                                   password,
-                                                                                   host,
-                                                                                   database),
-                                                                                   pool_pre_ping=True)
+        super().__init__()
+        self.__cache = None
+        size = int(os.environ.get("HBNB_DB_CACHE_SIZE", "0"))
+        if size > 0:
+            self.__cache = LRUCache(
+                size, float(os.environ.get("HBNB_DB_CACHE_TTL", "60")))
+        url = database_url()
+        options = {}
+        for name, argument, kind in pool_settings:
+            value = os.environ.get(name)
+            if value:
+                options[argument] = kind(value)
+        interval = float(os.environ.get("HBNB_DB_PRE_PING_INTERVAL", "0"))
+        options["pool_pre_ping"] = interval <= 0
+        if uses_queue_pool(url):
+            options["poolclass"] = TimedQueuePool
+        self.__engine = create_engine(url, **options)
+        if interval > 0:
+            ping_idle(self.__engine, interval)
         if env == "test":
             Base.metadata.drop_all(self.__engine)
     
-    def all(self, cls=None):
-        """query on the current database session"""
+    def all(self, cls=None, load=None):
+        """query on the current database session all objects of `cls`, or
+        of every mapped class if `cls` is None
+
+        Args:
+            cls (type or str): Optional class, or class name, to filter by.
+            load (list): Relationship paths of `cls` to load eagerly.
+
+        Returns:
+            dict: The instances, keyed by "ClassName.id".
+        """
         objs_dict = {}
-        objs = self.__session.query(cls).all()
-        for k in objs:
-            objs_dict[f"{type(k).__name__}.{k.id}"] = k.to_dict()
+        for mapped in mapped_classes(cls, load):
+            for k in self.__fetch(mapped, load):
+                objs_dict[f"{type(k).__name__}.{k.id}"] = k
         return objs_dict
-    
+
+    def iter_all(self, cls=None, batch_size=1000):
+        """yield the objects of `cls`, or of every mapped class, fetching
+        them `batch_size` rows at a time through a server-side cursor
+        where the driver supports one, so memory stays bounded whatever
+        the size of the table.
+
+        The session only keeps weak references to unchanged objects, so
+        the ones the caller drops are freed. The generator must be
+        exhausted or closed before the session runs other queries.
+
+        Args:
+            cls (type or str): Optional class, or class name, to filter by.
+            batch_size (int): The number of rows fetched at a time.
+
+        Yields:
+            BaseModel: Each instance in turn.
+        """
+        for mapped in mapped_classes(cls):
+            rows = None
+            if self.__cache is not None:
+                rows = self.__cache.get(mapped.__name__)
+            if rows is not None:
+                for row in rows:
+                    yield self.__attach(mapped, row)
+            else:
+                yield from self.__session.query(mapped).yield_per(batch_size)
+
+    def __query(self, cls, load=None):
+        """a query of `cls` eagerly loading the relationship paths `load`"""
+        query = self.__session.query(cls)
+        if load:
+            query = query.options(*load_options(cls, load))
+        return query
+
+    def __fetch(self, cls, load=None):
+        """the objects of `cls`, from the cache unless relationships are
+        to be loaded eagerly"""
+        if self.__cache is None or load:
+            return self.__query(cls, load)
+        rows = self.__cache.get(cls.__name__)
+        if rows is not None:
+            return [self.__attach(cls, row) for row in rows]
+        objs = self.__query(cls).all()
+        if self.__cacheable():
+            self.__cache.put(cls.__name__,
+                             [self.__snapshot(obj) for obj in objs])
+        return objs
+
+    def __cacheable(self):
+        """whether what the session reads can be cached: not while the
+        transaction holds changes, which a rollback could undo"""
+        session = self.__session
+        return not (session.info.get("hbnb_flushed") or session.new or
+                    session.dirty or session.deleted)
+
+    @staticmethod
+    def __snapshot(obj):
+        """the column values of `obj`, as kept in the cache"""
+        return {c.key: obj.__dict__[c.key] for c in obj.__table__.columns
+                if c.key in obj.__dict__}
+
+    def __attach(self, cls, row):
+        """the instance of `cls` with the cached column values `row` in
+        the current session, without a query: the one the session already
+        holds, else a new one attached as persistent, whose relationships
+        then load as usual"""
+        mapper = inspect(cls)
+        obj = self.__session.identity_map.get(
+            mapper.identity_key_from_primary_key((row["id"],)))
+        if obj is None:
+            obj = cls.from_dict(row)
+            make_transient_to_detached(obj)
+            self.__session.add(obj)
+        return obj
+
+    def invalidate(self, objs):
+        """drop the cache entries of `objs` and of their classes, also
+        called by AsyncStorage for the changes it makes without this
+        storage"""
+        if self.__cache is not None:
+            keys = set()
+            for obj in objs:
+                name = type(obj).__name__
+                keys.update((name, "{}.{}".format(name, obj.id)))
+            self.__cache.invalidate(*keys)
+
+    def cache_stats(self):
+        """report the figures of the cache, see LRUCache.stats(), or None
+        if it is disabled"""
+        if self.__cache is None:
+            return None
+        return self.__cache.stats()
+
+    def find(self, cls, load=None, **filters):
+        """
+        Query the objects of `cls` whose columns equal the given values,
+        letting the database use the indexes declared on the model.
+
+        Args:
+            cls (type): The mapped class to query.
+            load (list): Relationship paths of `cls` to load eagerly.
+            **filters: Column names and the values they must equal.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+        """
+        objs_dict = {}
+        for mapped in mapped_classes(cls, load):
+            for k in self.__query(mapped, load).filter_by(**filters):
+                objs_dict[f"{type(k).__name__}.{k.id}"] = k
+        return objs_dict
+
+    def within(self, cls, bbox):
+        """
+        Query the objects of `cls` inside a box. The geohash column of
+        Place bounds the rows read to the cells covering the box, through
+        its index; see models.engine.geo.bbox_clause().
+
+        Args:
+            cls (type or str): The mapped class, or class name, to query.
+            bbox (tuple): The (south, west, north, east) box, with
+                          west > east if it crosses the antimeridian.
+
+        Returns:
+            dict: The objects inside the box, keyed like all().
+        """
+        objs_dict = {}
+        for mapped in mapped_classes(cls):
+            query = select(mapped).where(bbox_clause(mapped, bbox))
+            for k in self.__session.scalars(query):
+                objs_dict[f"{type(k).__name__}.{k.id}"] = k
+        return objs_dict
+
+    def nearby(self, cls, lat, lon, radius_km, limit=None):
+        """the objects of `cls` within `radius_km` of (lat, lon), nearest
+        first and at most `limit` of them: the ones within() the box
+        around the circle, sorted by distance"""
+        return nearest(self.within(cls, bbox_around(lat, lon, radius_km)),
+                       lat, lon, radius_km, limit)
+
+    def get(self, cls, id):
+        """the object of `cls`, a class or class name, with the given id,
+        or None, looked up by primary key: from the session if already
+        loaded, else with a single-row query"""
+        mapped = mapped_classes(cls)
+        if not mapped:
+            return None
+        if self.__cache is None:
+            return self.__session.get(mapped[0], id)
+        key = "{}.{}".format(mapped[0].__name__, id)
+        row = self.__cache.get(key)
+        if row is not None:
+            return self.__attach(mapped[0], row)
+        obj = self.__session.get(mapped[0], id)
+        if obj is not None and self.__cacheable():
+            self.__cache.put(key, self.__snapshot(obj))
+        return obj
+
+    def count(self, cls=None):
+        """the number of objects of `cls`, a class or class name, or of
+        every mapped class if None, counted with SELECT COUNT(*)"""
+        return sum(self.__session.scalar(
+            select(func.count()).select_from(mapped))
+            for mapped in mapped_classes(cls))
+
     def reload(self):
         Base.metadata.create_all(bind=self.__engine)
+        add_geohash_column(self.__engine, Place)
         factory = sessionmaker(bind=self.__engine,
                                expire_on_commit=False)
+        event.listen(factory, "after_flush", self.__after_flush)
         Session = scoped_session(factory)
         self.__session = Session
     
+    def __after_flush(self, session, flush_context):
+        """remember that the transaction holds changes to commit, which
+        session.new, dirty and deleted no longer show once flushed, and
+        which objects to drop from the cache once committed. Both are kept
+        in the session, as each thread has its own"""
+        session.info["hbnb_flushed"] = True
+        if self.__cache is not None:
+            session.info.setdefault("hbnb_touched", set()).update(
+                session.new, session.dirty, session.deleted)
+
     def new(self, obj):
         self.__session.add(obj)
+        self.invalidate((obj,))
     
-    def save(self):
-        self.__session.commit()
+    def bulk_new(self, objs, chunk_size=1000):
+        """insert many new objects with one executemany per chunk of rows
+        of the same class, instead of one INSERT each at flush time.
+
+        The rows are inserted right away, in the current transaction, and
+        the objects are then attached to the session as persistent, so
+        that later changes to them are UPDATEs. Objects already known to
+        the session and relationship collections, such as Place.amenities,
+        are left to the regular add().
+
+        Args:
+            objs (iterable): The objects to insert.
+            chunk_size (int): The maximum number of rows per executemany.
+        """
+        groups = {}
+        for obj in objs:
+            if not inspect(obj).transient:
+                self.__session.add(obj)
+                continue
+            table = type(obj).__table__
+            row = {c.key: obj.__dict__[c.key] for c in table.columns
+                   if c.key in obj.__dict__}
+            groups.setdefault((table, frozenset(row)), []).append((obj, row))
+        for (table, _), group in groups.items():
+            for i in range(0, len(group), chunk_size):
+                chunk = group[i:i + chunk_size]
+                self.__session.execute(table.insert(),
+                                       [row for _, row in chunk])
+                for obj, _ in chunk:
+                    make_transient_to_detached(obj)
+                    self.__session.add(obj)
+                info = self.__session.info
+                info["hbnb_flushed"] = True
+                inserted = [obj for obj, _ in chunk]
+                self.invalidate(inserted)
+                if self.__cache is not None:
+                    info.setdefault("hbnb_touched", set()).update(inserted)
+
+    def _persist(self):
+        """commit all changes of the current database session, called by
+        save() unless the save is deferred by a batch or autoflush policy.
+
+        The commit is skipped when there is nothing to commit: no object
+        added, changed or deleted, and nothing flushed or inserted by
+        bulk_new() since the last commit. A read-only transaction is then
+        left open until the next commit or close()."""
+        session = self.__session
+        if not (session.info.get("hbnb_flushed") or session.new or
+                session.dirty or session.deleted):
+            return
+        session.commit()
+        session.info.pop("hbnb_flushed", None)
+        self.invalidate(session.info.pop("hbnb_touched", ()))
+        for obj in dirty_objects():
+            if isinstance(obj, Base) and obj in session:
+                obj.mark_clean()
 
     def delete(self, obj=None):
         """delete from the current database session obj if not None"""
         if obj is not None:
             self.__session.delete(obj)
+            self.invalidate((obj,))
+
+    def pool_stats(self):
+        """report the state of the connection pool
+
+        Returns:
+            dict: The pool class name, and for a QueuePool its size and
+                  the number of connections checked in, checked out and
+                  open beyond the size (overflow), plus the checkout
+                  figures of TimedQueuePool.wait_stats().
+        """
+        pool = self.__engine.pool
+        stats = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_in=pool.checkedin(),
+                         checked_out=pool.checkedout(),
+                         overflow=max(pool.overflow(), 0))
+        if isinstance(pool, TimedQueuePool):
+            stats.update(pool.wait_stats())
+        return stats
 
     def close(self):
-        """call remove() method on the private session attribute"""
+        """commit pending saves, then call remove() method on the private
+        session attribute"""
+        self.flush()
         self.__session.remove()
@@ -0,0 +1,114 @@
+#!/usr/bin/python3
+"""Atomic file replacement and fsync policy of FileStorage."""
+import os
+import tempfile
+import time
+
+# Reading the umask sets it, so it is read once, before threads start
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+class FsyncPolicy:
+    """
+    The FsyncPolicy class decides when FileStorage forces its writes to
+    disk, trading save() throughput for durability.
+
+        always: every write is on disk when save() returns.
+        batched: files are synced before they replace the previous
+                 version, so a crash never leaves a partial file, but the
+                 directory entry and journal appends are synced at most
+                 once per `interval` seconds. A crash loses at most the
+                 writes of the last interval.
+        never: syncing is left to the operating system. A crash can lose
+               recent writes, and on some filesystems leave a truncated
+               file, which reload() then reports.
+
+    Attributes:
+        mode (str): One of MODES.
+        interval (float): Seconds between syncs in batched mode.
+    """
+
+    MODES = ("always", "batched", "never")
+
+    def __init__(self, mode="batched", interval=1.0):
+        """
+        Initializes a policy.
+
+        Raises:
+            ValueError: If `mode` is not one of MODES.
+        """
+        if mode not in self.MODES:
+            raise ValueError("unknown fsync policy: {}".format(mode))
+        self.mode = mode
+        self.interval = interval
+        self.__last = time.monotonic()
+
+    def due(self):
+        """
+        Returns True if the write being made now must be synced, and
+        restarts the interval if so.
+        """
+        if self.mode != "batched":
+            return self.mode == "always"
+        now = time.monotonic()
+        if now - self.__last < self.interval:
+            return False
+        self.__last = now
+        return True
+
+
+def fsync_dir(path):
+    """Syncs the directory holding `path`, making a rename durable."""
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _file_mode(path):
+    """Returns the permissions of the file at `path`, or those of a new
+    file under the umask if there is none."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_umask
+
+
+def atomic_write(path, write, sync_data=True, sync_dir=True):
+    """
+    Replaces the file at `path` with the bytes written by `write`, so that
+    readers and crashes only ever see the old or the new file. The new
+    file keeps the permissions of the old one.
+
+    Args:
+        path (str): The file to replace.
+        write (callable): Called with a file opened for binary writing;
+                          its return value is returned.
+        sync_data (bool): Whether to sync the new file before renaming it.
+        sync_dir (bool): Whether to sync the directory after renaming.
+
+    Returns:
+        The return value of `write`.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp",
+                                    dir=directory)
+    try:
+        os.fchmod(fd, _file_mode(path))
+        with os.fdopen(fd, 'wb') as f:
+            result = write(f)
+            if sync_data:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if sync_dir:
+        fsync_dir(path)
+    return result
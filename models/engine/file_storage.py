@@ -1,13 +1,51 @@
 #!/usr/bin/python3
-import json
+import os
+import threading
+import weakref
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from os import getenv
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from models.base_model import BaseModel, dirty_objects
+from models.user import User
+from models.state import State
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from models.engine.journal import Journal
+from models.engine.offset_index import OffsetIndex
+from models.engine import serializers
+from models.engine.batching import SaveBatching
+from models.engine.durability import FsyncPolicy, atomic_write
+from models.engine.geo import GeoIndex
+from models.engine.locks import RWLock
+from models.engine.records import Record, record_class
 
+classes = {"BaseModel": BaseModel, "User": User, "State": State,
+           "City": City, "Amenity": Amenity, "Place": Place,
+           "Review": Review}
 
-class FileStorage:
+# File of the sharded layout directory recording the layout of its shards
+layout_file = ".layout"
+
+# Attributes declared with Column(..., index=True), per class name
+indexes = {name: tuple(c.key for c in cls.__table__.columns if c.index)
+           for name, cls in classes.items() if hasattr(cls, "__table__")}
+
+
+class FileStorage(SaveBatching):
     """
     The FileStorage class handles the serialization and deserialization of
     objects to and from a JSON file. It acts as a simple storage system,
     storing all instances in a dictionary and allowing for the persistence
     of data across sessions by saving to and reloading from a file.
+    Instances are kept as live objects and only converted to their
+    dictionary form when written to the file.
 
     Attributes:
         __file_path (str): The path to the JSON file used for data storage.
@@ -20,21 +58,569 @@ class FileStorage:
         save(): Serializes and writes the storage dictionary to a JSON file.
         reload(): Loads objects from the JSON file
         back into the storage dictionary.
+
+    Class index:
+        Keys are also grouped by class name, so that all(cls) costs time
+        proportional to the number of objects of that class. The index is
+        kept up to date by new(), delete() and reload(), which must be the
+        only way __objects is changed. Attributes declared with
+        Column(..., index=True), such as City.state_id, are indexed by value
+        the same way, so that find() answers in time proportional to the
+        number of matches.
+
+    Journaled mode:
+        When the HBNB_FILE_JOURNAL environment variable is set to 1, new()
+        and delete() are recorded in an append-only log next to the JSON
+        file, and save() only appends those records instead of rewriting
+        the whole file. The JSON file becomes a snapshot that is rewritten
+        in the background once the log outgrows HBNB_FILE_JOURNAL_MAX bytes.
+
+    Lazy mode:
+        When the HBNB_FILE_LAZY environment variable is set to 1, save()
+        also writes a sorted offset index of the JSON file, and reload()
+        only opens that index and a memory map of the file. Records are
+        parsed the first time they are needed: all(cls) and find(cls)
+        load one class, all() loads everything. Records still unparsed
+        when save() runs are copied to the new file as they are. Without
+        a valid index, reload() falls back to loading the whole file.
+
+    File formats:
+        HBNB_FILE_FORMAT selects how save() writes the file: "json" (the
+        default, indented), "compact" (JSON without whitespace), "binary"
+        (struct-packed records) or "msgpack" (if the package is
+        installed). reload() detects the format of the file it reads, so
+        a store is migrated to a new format the next time it is saved.
+
+    Durability:
+        The file is always replaced atomically: save() writes a temporary
+        file next to it and renames it over the previous version, so a
+        crash leaves either the old or the new file. HBNB_FSYNC selects
+        when writes are forced to disk, see FsyncPolicy: "always",
+        "batched" (the default, syncing at most once per
+        HBNB_FSYNC_INTERVAL seconds) or "never". reload() raises
+        ValueError on a file it cannot read rather than starting empty,
+        since the next save() would otherwise overwrite the data.
+
+    Batched saves:
+        save() calls can be coalesced with `with storage.batch():` or an
+        autoflush policy, see SaveBatching.
+
+    Incremental saves:
+        save() collects the stored objects changed since they were last
+        persisted, see BaseModel.changes(), and marks them clean. In
+        journaled mode only those and the objects passed to new() are
+        logged, in the sharded layout only their shards are rewritten, and
+        otherwise the file is not rewritten at all when nothing was added,
+        deleted or changed.
+
+    Thread safety:
+        The stored objects and their indexes are guarded by a readers-writer
+        lock: all() and find() run concurrently, while new(), delete() and
+        reload() run one at a time. all() returns a copy, so callers may
+        iterate it while other threads add objects. Saves are serialized,
+        but only copy __objects under the lock and serialize it outside,
+        so readers and writers are not blocked by the dump, except
+        in lazy mode where records still pending in the offset index are
+        copied under the lock.
+
+    Shared mode:
+        When HBNB_FILE_SHARED is set to 1, several processes can use the
+        same file. save() holds an advisory lock on a ".lock" file next to
+        it, merges the changes other processes saved since this one last
+        read or wrote the file, then writes. The file is always replaced
+        by a rename, so its inode, size and modification time tell whether
+        it changed; all() and find() check them and reload what changed.
+        Keys this process added or deleted since its last save() keep
+        their local state; for every other key the file wins, so two
+        processes only conflict when both save the same object, in which
+        case the last save wins. Shared mode cannot be combined with
+        journaled mode.
+
+    Sharded layout:
+        When HBNB_FILE_SHARDS is set, objects are spread over the files of
+        a directory named after the file, with a ".d" suffix: one file per
+        class with "class", or one per hash bucket of the key with a
+        number of buckets. new() and delete() mark the shard of the key as
+        dirty, and save() only rewrites the dirty shards, each atomically.
+        reload() reads the shards on a thread pool. If the directory does
+        not exist yet, reload() loads the single file instead and the
+        first save() writes every shard. The directory records its layout
+        in a ".layout" file: when reload() finds another layout, or none,
+        the next save() rewrites every shard in the configured one and
+        removes the files of the old one. The sharded layout cannot be
+        combined with journaled, lazy or shared mode.
+
+    Record mode:
+        When HBNB_FILE_RECORDS is set to 1, objects are stored as compact
+        records, see record_class(), rather than as model instances, which
+        takes a fraction of the memory. all(), get() and find() rebuild
+        instances from them, and hand out the same instance for a key as
+        long as a caller holds one. new() and save() copy the instances
+        back to their records, so changes are seen by other callers once
+        saved rather than as soon as made.
+
+    Listeners:
+        Secondary indexes kept outside of the storage, such as the columns
+        of models.engine.columnar and the grid of within() and nearby(),
+        register with add_listener(). They are told of every object
+        indexed or unindexed, and reset when the indexes are rebuilt,
+        while the storage is locked for writing.
     """
 
     __file_path = './file.json'
     __objects = {}
+    __by_class = {}
+    __by_attr = {}
+    __attr_values = {}
+    __indexed = None
+    __listeners = []
+    __live = weakref.WeakValueDictionary()
+    __lock = RWLock()
+    __persist_lock = threading.Lock()
 
-    def all(self, cls=None):
+    def __init__(self):
         """
-        Retrieves the dictionary of all stored objects.
+        Initializes the storage, enabling journaled mode, lazy mode and
+        selecting the file format and fsync policy through environment
+        variables.
+
+        Raises:
+            ValueError: If HBNB_FILE_FORMAT names an unavailable format,
+                        HBNB_FSYNC an unknown policy, HBNB_FILE_SHARDS is
+                        neither "class" nor a positive number, or modes
+                        that cannot be combined are enabled.
+        """
+        super().__init__()
+        self.__format = serializers.get(getenv("HBNB_FILE_FORMAT", "json"))
+        fsync = getenv("HBNB_FSYNC", "batched")
+        interval = float(getenv("HBNB_FSYNC_INTERVAL", "1"))
+        self.__fsync = FsyncPolicy(fsync, interval)
+        self.__journal = None
+        if getenv("HBNB_FILE_JOURNAL") == "1":
+            max_size = int(getenv("HBNB_FILE_JOURNAL_MAX", Journal.MAX_SIZE))
+            self.__journal = Journal(self.__file_path + ".log", max_size,
+                                     FsyncPolicy(fsync, interval))
+        self.__lazy = getenv("HBNB_FILE_LAZY") == "1"
+        self.__offsets = None
+        self.__offsets_format = None
+        self.__loaded = set()
+        self.__complete = set()
+        self.__shared = getenv("HBNB_FILE_SHARED") == "1"
+        if self.__shared and self.__journal is not None:
+            raise ValueError("HBNB_FILE_SHARED cannot be combined with "
+                             "HBNB_FILE_JOURNAL")
+        if self.__shared and fcntl is None:
+            raise ValueError("HBNB_FILE_SHARED needs fcntl file locks")
+        self.__seen = None
+        self.__dirty = set()
+        self.__changed = True
+        self.__unlogged = set()
+        self.__shards = getenv("HBNB_FILE_SHARDS") or None
+        if self.__shards not in (None, "class"):
+            self.__shards = int(self.__shards)
+            if self.__shards < 1:
+                raise ValueError("HBNB_FILE_SHARDS must be positive")
+        if self.__shards is not None and (
+                self.__journal is not None or self.__lazy or self.__shared):
+            raise ValueError("HBNB_FILE_SHARDS cannot be combined with "
+                             "journaled, lazy or shared mode")
+        self.__dirty_shards = set()
+        self.__relayout = False
+        self.__use_records = getenv("HBNB_FILE_RECORDS") == "1"
+        self.__geo = {}
+        self.__geo_lock = threading.Lock()
+
+    def all(self, cls=None, load=None):
+        """
+        Retrieves the dictionary of all stored objects, or of the objects
+        of a single class.
+
+        Args:
+            cls (type or str): Optional class, or class name, to filter by.
+            load (list): Accepted for compatibility with DBStorage, whose
+                         relationships can be loaded eagerly.
 
         Returns:
-            dict: The dictionary containing all objects currently stored.
+            dict: A copy of the dictionary of all objects currently stored.
                   The keys are in the format "ClassName.id", and the values
-                  are the corresponding instance data in dictionary format.
+                  are the corresponding instances. When `cls` is given, only
+                  the objects of that class are included.
+        """
+        self.__refresh()
+        if cls is None:
+            self.__load_pending()
+            with self.__lock.read():
+                objects = self.__objects.copy()
+        else:
+            name = cls if isinstance(cls, str) else cls.__name__
+            self.__load_pending(name)
+            with self.__lock.read():
+                stored = self.__objects
+                keys = FileStorage.__by_class.get(name, {})
+                objects = {k: stored[k] for k in keys if k in stored}
+        if self.__use_records:
+            return {k: self.__instance(k, v) for k, v in objects.items()}
+        return objects
+
+    def iter_all(self, cls=None, batch_size=None):
+        """
+        Yields the objects of a class, or of every class, one at a time:
+        the streaming counterpart of all(), as offered by DBStorage.
+        Objects are all in memory already, so `batch_size` is ignored.
+
+        Args:
+            cls (type or str): Optional class, or class name, to filter by.
+            batch_size (int): Accepted for compatibility with DBStorage.
+
+        Yields:
+            BaseModel: Each stored instance in turn.
+        """
+        yield from self.all(cls).values()
+
+    def get(self, cls, id):
+        """
+        Retrieves one object by its class and id, looking its key up
+        directly. In lazy mode, only the record of that object is parsed.
+
+        Args:
+            cls (type or str): The class, or class name, of the object.
+            id (str): The id of the object.
+
+        Returns:
+            BaseModel: The object, or None if there is none.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        key = "{}.{}".format(name, id)
+        self.__refresh()
+        if self.__offsets is not None and key not in self.__loaded:
+            with self.__lock.write():
+                if self.__offsets is not None and key not in self.__loaded:
+                    record = self.__offsets.get(key)
+                    self.__loaded.add(key)
+                    if record is not None:
+                        self.__put(key, self.__from_dict(
+                            self.__offsets_format.load_record(record)))
+        with self.__lock.read():
+            value = self.__objects.get(key)
+        if self.__use_records and value is not None:
+            return self.__instance(key, value)
+        return value
+
+    def count(self, cls=None):
+        """
+        Counts the objects of a class, or of every class, from the size of
+        the class index. In lazy mode, the records still pending are
+        counted from the offset index without being parsed.
+
+        Args:
+            cls (type or str): Optional class, or class name, to count.
+
+        Returns:
+            int: The number of objects.
+        """
+        name = cls if isinstance(cls, str) or cls is None else cls.__name__
+        self.__refresh()
+        # Keys removed from __objects directly, bypassing delete(), are
+        # still indexed; they show as a total off from len(__objects)
+        with self.__lock.read():
+            stale = FileStorage.__indexed is not self.__objects or sum(
+                map(len, FileStorage.__by_class.values())) != len(
+                    self.__objects)
+        if stale:
+            with self.__lock.write():
+                FileStorage.__indexed = None
+                self.__index()
+        with self.__lock.read():
+            if name is None:
+                total = len(self.__objects)
+            else:
+                total = len(FileStorage.__by_class.get(name, ()))
+            if self.__offsets is not None:
+                # Objects kept across a reload are also pending records
+                stored = self.__objects
+                total += sum(1 for key, _ in self.__offsets.items(
+                    name + "." if name else "")
+                    if key not in self.__loaded and key not in stored)
+        return total
+
+    def find(self, cls, load=None, **filters):
+        """
+        Retrieves the objects of a class whose attributes equal the given
+        values. The id and indexed attributes are looked up directly; the
+        others are compared against the objects matched so far.
+
+        Args:
+            cls (type or str): The class, or class name, to search.
+            load (list): Accepted for compatibility with DBStorage.
+            **filters: Attribute names and the values they must equal.
+
+        Returns:
+            dict: The matching objects, keyed like all().
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        self.__refresh()
+        self.__load_pending(name)
+        with self.__lock.read():
+            candidates = FileStorage.__by_class.get(name, {})
+            for attr in indexes.get(name, ()):
+                if attr in filters:
+                    keys = FileStorage.__by_attr.get(
+                        (name, attr), {}).get(filters[attr], {})
+                    if len(keys) < len(candidates):
+                        candidates = keys
+            if "id" in filters:
+                key = "{}.{}".format(name, filters["id"])
+                candidates = (key,) if key in candidates else ()
+            candidates = [(k, self.__objects.get(k)) for k in candidates]
+        matches = {}
+        for key, value in candidates:
+            if value is not None and all(
+                    getattr(value, attr, None) == v
+                    for attr, v in filters.items()):
+                matches[key] = value
+        if self.__use_records:
+            return {k: self.__instance(k, v) for k, v in matches.items()}
+        return matches
+
+    def within(self, cls, bbox):
+        """
+        Retrieves the objects of a class inside a box, through a grid of
+        their positions built on first use, see GeoIndex.
+
+        Args:
+            cls (type or str): The class, or class name, to search, whose
+                               objects have latitude and longitude.
+            bbox (tuple): The (south, west, north, east) box, with
+                          west > east if it crosses the antimeridian.
+
+        Returns:
+            dict: The objects inside the box, keyed like all().
+        """
+        index = self.__geo_index(cls)
+        if index is None:
+            return {}
+        return self.__lookup(index.within(bbox))
+
+    def nearby(self, cls, lat, lon, radius_km, limit=None):
+        """
+        Retrieves the objects of a class within `radius_km` of a point,
+        nearest first, through the same grid as within().
+
+        Args:
+            cls (type or str): The class, or class name, to search.
+            lat (float): The latitude of the point.
+            lon (float): The longitude of the point.
+            radius_km (float): The distance from the point, in km.
+            limit (int): Optional maximum number of objects returned.
+
+        Returns:
+            dict: The objects found, keyed like all(), nearest first.
+        """
+        index = self.__geo_index(cls)
+        if index is None:
+            return {}
+        return self.__lookup(
+            key for key, _ in index.nearby(lat, lon, radius_km, limit))
+
+    def __geo_index(self, cls):
+        """Returns the GeoIndex of a class, built on first use, or None if
+        the class is unknown."""
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+            if cls is None:
+                return None
+        with self.__geo_lock:
+            index = self.__geo.get(cls)
+            if index is None:
+                index = self.__geo[cls] = GeoIndex(self, cls)
+        return index
+
+    def __lookup(self, keys):
+        """Returns the objects stored under `keys`, in their order."""
+        with self.__lock.read():
+            stored = self.__objects
+            objects = {k: stored[k] for k in keys if k in stored}
+        if self.__use_records:
+            return {k: self.__instance(k, v) for k, v in objects.items()}
+        return objects
+
+    def __instance(self, key, value):
+        """
+        Returns the instance stored under `key`: in record mode, the one
+        handed out before if still held, else one rebuilt from `value`.
+        """
+        if not isinstance(value, Record):
+            return value
+        obj = FileStorage.__live.get(key)
+        if obj is None:
+            obj = value.instance()
+            FileStorage.__live[key] = obj
+        return obj
+
+    def load(self, cls=None):
+        """
+        Brings the objects of a class, or of every class, and their indexes
+        up to date: parses the records still pending in lazy mode and reads
+        the changes of other processes in shared mode. Costs nothing when
+        there is nothing to do.
+
+        Args:
+            cls (type or str): Optional class, or class name, to load.
+        """
+        name = cls if isinstance(cls, str) or cls is None else cls.__name__
+        self.__refresh()
+        self.__load_pending(name)
+
+    def add_listener(self, listener):
+        """
+        Registers a listener, which is first reset and told of every object
+        already stored, then of every change.
+
+        Args:
+            listener: An object with the methods reset(), index(key, obj)
+                      and unindex(key).
+        """
+        with self.__lock.write():
+            self.__index()
+            FileStorage.__listeners.append(listener)
+            listener.reset()
+            for key, value in self.__objects.items():
+                listener.index(key, value)
+
+    def remove_listener(self, listener):
+        """Unregisters a listener added with add_listener()."""
+        with self.__lock.write():
+            FileStorage.__listeners.remove(listener)
+
+    def __index(self):
+        """
+        Returns the class index, a dict mapping each class name to the keys
+        of its objects, rebuilding it and the attribute indexes if __objects
+        has been replaced.
+        """
+        if FileStorage.__indexed is not self.__objects:
+            FileStorage.__by_class = {}
+            FileStorage.__by_attr = {}
+            FileStorage.__attr_values = {}
+            FileStorage.__indexed = self.__objects
+            for listener in FileStorage.__listeners:
+                listener.reset()
+            for key, value in self.__objects.items():
+                self.__index_key(key, value)
+        return FileStorage.__by_class
+
+    def __index_key(self, key, value):
+        """Adds `key` to the class index and to its attribute indexes."""
+        name = key.split('.', 1)[0]
+        FileStorage.__by_class.setdefault(name, {})[key] = None
+        attrs = indexes.get(name)
+        if attrs:
+            values = {attr: getattr(value, attr, None) for attr in attrs}
+            for attr, v in values.items():
+                FileStorage.__by_attr.setdefault(
+                    (name, attr), {}).setdefault(v, {})[key] = None
+            FileStorage.__attr_values[key] = values
+        for listener in FileStorage.__listeners:
+            listener.index(key, value)
+
+    def __unindex_key(self, key):
+        """Removes `key` from the class index and its attribute indexes."""
+        name = key.split('.', 1)[0]
+        FileStorage.__by_class.get(name, {}).pop(key, None)
+        values = FileStorage.__attr_values.pop(key, {})
+        for attr, v in values.items():
+            keys = FileStorage.__by_attr[(name, attr)][v]
+            del keys[key]
+            if not keys:
+                del FileStorage.__by_attr[(name, attr)][v]
+        for listener in FileStorage.__listeners:
+            listener.unindex(key)
+
+    def __load_pending(self, name=None):
+        """
+        Parses the records of class `name`, or of every class, that are
+        still pending in the lazy offset index, and rebuilds the indexes if
+        __objects has been replaced, so that they can then be read under
+        the read lock.
+        """
+        if FileStorage.__indexed is self.__objects and (
+                self.__offsets is None or name in self.__complete):
+            return
+        with self.__lock.write():
+            self.__index()
+            if self.__offsets is None or name in self.__complete:
+                return
+            load_record = self.__offsets_format.load_record
+            for key, record in self.__offsets.items(
+                    name + "." if name else ""):
+                if key not in self.__loaded:
+                    self.__put(key, self.__from_dict(load_record(record)))
+            if name is None:
+                self.__close_offsets()
+            else:
+                self.__complete.add(name)
+
+    def __open_offsets(self):
+        """
+        Opens the offset index of the file, so that its records are
+        parsed on demand. Returns False if there is no valid index.
+        """
+        self.__close_offsets()
+        offsets = OffsetIndex.open(self.__file_path + ".idx",
+                                   self.__file_path)
+        if offsets is None:
+            return False
+        with open(self.__file_path, 'rb') as f:
+            self.__offsets_format = serializers.detect(f.read(16))
+        if self.__offsets_format is None:
+            offsets.close()
+            return False
+        self.__offsets = offsets
+        return True
+
+    def __close_offsets(self):
+        """Releases the offset index once no record is pending anymore."""
+        if self.__offsets is not None:
+            self.__offsets.close()
+        self.__offsets = None
+        self.__loaded = set()
+        self.__complete = set()
+
+    def __discard(self, key):
+        """
+        Removes `key`, whether already loaded or still pending in the
+        offset index. Returns False if there was nothing to remove.
         """
-        return self.__objects
+        pending = False
+        if self.__offsets is not None and key not in self.__loaded:
+            pending = self.__offsets.get(key) is not None
+            self.__loaded.add(key)
+        if key in self.__objects:
+            self.__pop(key)
+            return True
+        return pending
+
+    def __put(self, key, value):
+        """Stores `value` under `key` and indexes it."""
+        if self.__offsets is not None:
+            self.__loaded.add(key)
+        if self.__use_records:
+            if isinstance(value, Record):
+                FileStorage.__live.pop(key, None)
+            else:
+                FileStorage.__live[key] = value
+                value = record_class(type(value)).from_dict(value.__dict__)
+        self.__index()
+        self.__unindex_key(key)
+        self.__objects[key] = value
+        self.__index_key(key, value)
+
+    def __pop(self, key):
+        """Removes `key` from __objects and from the indexes."""
+        self.__index()
+        del self.__objects[key]
+        self.__unindex_key(key)
+        FileStorage.__live.pop(key, None)
 
     def new(self, obj):
         """
@@ -47,54 +633,492 @@ class FileStorage:
 
         Side Effects:
             Updates the __objects dictionary by adding a new entry with the
-            key formatted as "ClassName.id" and value as the dictionary
-            representation of the object.
+            key formatted as "ClassName.id" and value as the object itself.
+        """
+        key = f"{type(obj).__name__}.{obj.id}"
+        with self.__lock.write():
+            self.__put(key, obj)
+            if self.__shared:
+                self.__dirty.add(key)
+            if self.__shards is not None:
+                self.__dirty_shards.add(self.__shard(key))
+            if self.__journal is not None:
+                self.__unlogged.add(key)
+            self.__changed = True
+
+    def bulk_new(self, objs):
         """
-        self.__objects[f"{type(obj).__name__}.{obj.id}"] = obj.to_dict()
+        Adds many objects to the storage dictionary, as new() does for one.
+        They are written by the next persist, so saving them all costs a
+        single write of the file.
 
-    def save(self):
+        Args:
+            objs (iterable): The objects to add.
+        """
+        with self.__lock.write():
+            for obj in objs:
+                self.new(obj)
+
+    def _persist(self):
         """
-        Serializes the __objects dictionary and writes it to the JSON file.
+        Serializes the __objects dictionary and writes it to the file,
+        converting each instance to its dictionary form. Called by save()
+        unless the save is deferred by a batch or the autoflush policy.
 
         Side Effects:
             Writes the current state of the __objects dictionary to the file
-            specified in __file_path in JSON format.
+            specified in __file_path, in the format selected by
+            HBNB_FILE_FORMAT, through a temporary file synced as
+            HBNB_FSYNC requires. In journaled mode, only
+            appends the changes recorded since the last call to the log, and
+            starts a background compaction when the log has grown too big.
+        """
+        with self.__persist_lock, self.__file_lock():
+            if self.__use_records:
+                self.__store_live()
+            dirty = self.__merge(take=True) if self.__shared else set()
+            try:
+                if self.__shards is not None:
+                    self.__persist_shards()
+                elif self.__journal is not None:
+                    self.__persist_journal()
+                elif self.__lazy:
+                    with self.__lock.write():
+                        if self.__must_write():
+                            self.__persist_lazy()
+                else:
+                    with self.__lock.write():
+                        must_write = self.__must_write()
+                        objects = self.__objects.copy()
+                    if must_write:
+                        self.__write_snapshot(objects, durable=False)
+            except BaseException:
+                with self.__lock.write():
+                    self.__dirty |= dirty
+                    self.__changed = True
+                raise
+            if self.__shared:
+                self.__seen = self.__stat()
+
+    def __changed_objects(self):
+        """
+        Returns the stored objects changed since they were last persisted,
+        keyed like __objects.
+        """
+        changed = {}
+        stored = FileStorage.__live if self.__use_records else self.__objects
+        for obj in dirty_objects():
+            key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+            if stored.get(key) is obj and key in self.__objects:
+                changed[key] = obj
+        return changed
+
+    def __store_live(self):
+        """
+        Copies the instances handed out in record mode and changed since
+        they were persisted back to their records, which are what is
+        written.
+        """
+        with self.__lock.write():
+            for key, obj in self.__changed_objects().items():
+                self.__put(key, obj)
+
+    def __take_changes(self):
+        """
+        Like __changed_objects(), but also marks the objects clean and
+        re-indexes them, as they were changed in place since new() indexed
+        them. In record mode, __store_live() has re-indexed them already.
+        """
+        changed = self.__changed_objects()
+        if changed and not self.__use_records:
+            self.__index()
+        for key, obj in changed.items():
+            if not self.__use_records:
+                self.__unindex_key(key)
+                self.__index_key(key, obj)
+            obj.mark_clean()
+        return changed
+
+    def __must_write(self):
+        """
+        Returns whether the file must be rewritten: objects were added,
+        deleted or changed since the last write, or there is no file yet.
+        """
+        changed = self.__take_changes()
+        must_write = (changed or self.__changed or
+                      not os.path.exists(self.__file_path))
+        self.__changed = False
+        return bool(must_write)
+
+    def __persist_journal(self):
+        """
+        Logs the objects passed to new() or changed since the last save,
+        then starts a compaction if the log has grown too big.
+        """
+        with self.__lock.write():
+            keys, self.__unlogged = self.__unlogged, set()
+            keys.update(self.__take_changes())
+            for key in sorted(keys):
+                obj = self.__objects.get(key)
+                if obj is not None:
+                    obj.mark_clean()
+                    self.__journal.record_new(key, obj.to_dict())
+        if self.__journal.commit():
+            self.__load_pending()
+            with self.__lock.read():
+                objects = self.__objects.copy()
+            self.__journal.compact(lambda: self.__write_snapshot(objects))
+
+    def __shard(self, key):
+        """Returns the name of the shard file holding `key`."""
+        if self.__shards == "class":
+            return key.split('.', 1)[0]
+        return "{:03d}".format(zlib.crc32(key.encode("UTF-8")) %
+                               self.__shards)
+
+    def __persist_shards(self):
+        """
+        Rewrites the dirty shards of the sharded layout, removing those
+        left without objects.
+        """
+        with self.__lock.write():
+            dirty, self.__dirty_shards = self.__dirty_shards, set()
+            dirty.update(self.__shard(key) for key in self.__take_changes())
+            relayout = self.__relayout
+            if relayout:
+                dirty.update(self.__shard(key) for key in self.__objects)
+        if not dirty and not relayout:
+            return
+        groups = {shard: {} for shard in dirty}
+        with self.__lock.read():
+            for key, value in self.__objects.items():
+                group = groups.get(self.__shard(key))
+                if group is not None:
+                    group[key] = value
+        directory = self.__file_path + ".d"
+        os.makedirs(directory, exist_ok=True)
+        dump_record = self.__format.dump_record
+        written = set()
+        try:
+            for shard, objects in sorted(groups.items()):
+                path = os.path.join(directory, shard)
+                if objects:
+                    self.__write(((k, dump_record(v.to_dict()))
+                                  for k, v in objects.items()), path=path)
+                else:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                written.add(shard)
+            if relayout:
+                self.__write_layout(directory, groups)
+        except BaseException:
+            with self.__lock.write():
+                self.__dirty_shards |= dirty - written
+            raise
+
+    def __in_layout(self, name):
+        """Returns whether `name` is a shard file of the configured
+        layout."""
+        if self.__shards == "class":
+            return name in classes
+        return len(name) == 3 and name.isdigit() and int(name) < self.__shards
+
+    def __write_layout(self, directory, groups):
+        """
+        Ends a change of layout, once every shard of the configured one is
+        written: removes the files of the old layout, then records the new
+        one.
+        """
+        for name in os.listdir(directory):
+            if name not in groups and name != layout_file and \
+                    not name.endswith(".tmp"):
+                os.remove(os.path.join(directory, name))
+        atomic_write(os.path.join(directory, layout_file),
+                     lambda f: f.write(str(self.__shards).encode()),
+                     sync_data=self.__fsync.mode != "never")
+        self.__relayout = False
+
+    @contextmanager
+    def __file_lock(self):
+        """
+        Holds the advisory lock shared with other processes in shared mode,
+        and nothing otherwise.
+        """
+        if not self.__shared:
+            yield
+            return
+        with open(self.__file_path + ".lock", 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def __stat(self):
+        """
+        Returns what identifies the current version of the file: its inode,
+        size and modification time, or None if it does not exist.
+        """
+        try:
+            st = os.stat(self.__file_path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def __refresh(self):
+        """
+        In shared mode, applies the changes other processes saved to the
+        file since this one last read or wrote it.
         """
-        with open(self.__file_path, 'w', encoding="UTF-8") as f:
-            json.dump(self.__objects, f, indent=2)
+        if self.__shared and self.__stat() != self.__seen:
+            self.__merge()
+
+    def __merge(self, take=False):
+        """
+        Brings __objects up to date with the file, except for the keys this
+        process changed since its last save.
+
+        Args:
+            take (bool): Whether to return the changed keys and stop
+                         tracking them, as _persist() does when about to
+                         write them. Refreshes on reads keep them tracked
+                         until then.
+
+        Returns:
+            set: The keys that were changed locally, if taken.
+        """
+        with self.__lock.write():
+            if self.__stat() != self.__seen:
+                self.__load_pending()
+                seen, records = self.__read()
+                dirty = self.__dirty.union(self.__changed_objects())
+                for key in [k for k in self.__objects
+                            if k not in records and k not in dirty]:
+                    self.__pop(key)
+                for key, record in records.items():
+                    current = self.__objects.get(key)
+                    if key not in dirty and (
+                            current is None or
+                            getattr(current, "updated_at", None) is None or
+                            current.updated_at.isoformat() !=
+                            record.get("updated_at")):
+                        self.__put(key, self.__from_dict(record))
+                self.__seen = seen
+            if not take:
+                return set()
+            dirty, self.__dirty = self.__dirty, set()
+        return dirty
+
+    def __persist_lazy(self):
+        """
+        Writes the file and its offset index in lazy mode, then maps the
+        new file so that the records still pending stay unparsed.
+        """
+        self.__write(self.__records())
+        offsets = OffsetIndex.open(self.__file_path + ".idx", self.__file_path)
+        if offsets is None:
+            self.__load_pending()
+        else:
+            self.__close_offsets()
+            self.__offsets, self.__loaded = offsets, set(self.__objects)
+            self.__offsets_format = self.__format
+
+    def __write_snapshot(self, objects, durable=True):
+        """
+        Writes `objects`, a copy of __objects, to the file. This is also
+        the snapshot of journaled mode: going through a temporary file
+        means a crash while compacting never leaves a truncated snapshot
+        behind, and unless HBNB_FSYNC is "never" the snapshot is `durable`,
+        fully synced, since the log it supersedes is removed right after.
+        """
+        dump_record = self.__format.dump_record
+        self.__write(((k, dump_record(v.to_dict()))
+                      for k, v in objects.items()), durable)
+
+    def __records(self):
+        """
+        Yields the key and serialized form of every stored record, copying
+        the records still pending in the offset index without parsing them
+        unless the file format has changed.
+        """
+        dump_record = self.__format.dump_record
+        for key, obj in self.__objects.items():
+            yield key, dump_record(obj.to_dict())
+        if self.__offsets is not None:
+            same = self.__offsets_format is self.__format
+            load_record = self.__offsets_format.load_record
+            for key, record in self.__offsets.items():
+                if key not in self.__loaded:
+                    yield key, (record if same else
+                                dump_record(load_record(record)))
+
+    def __write(self, records, durable=False, path=None):
+        """
+        Writes serialized `records` to the file, or to the shard at `path`,
+        through a temporary file that then replaces it. In lazy mode, also
+        writes the offset index locating each record in the new file.
+
+        The temporary file is synced before the rename unless the policy
+        is "never", and the rename itself when the policy says it is due,
+        or always if `durable` is set.
+        """
+        sync = self.__fsync.mode != "never"
+        sync_dir = (durable and sync) or self.__fsync.due()
+        entries = atomic_write(path or self.__file_path,
+                               lambda f: self.__format.write(f, records),
+                               sync_data=sync, sync_dir=sync_dir)
+        if self.__lazy:
+            OffsetIndex.write(self.__file_path + ".idx", entries,
+                              self.__file_path, sync)
+
+    def __from_dict(self, record):
+        """
+        Rebuilds an instance of the registered class from its dict, clean
+        since it matches what is stored, or in record mode its record.
+        """
+        cls = classes[record["__class__"]]
+        if self.__use_records:
+            return record_class(cls).from_dict(record)
+        return cls.from_dict(record)
 
     def reload(self):
         """
-        Loads objects from the JSON file into the __objects dictionary.
+        Loads objects from the file into the __objects dictionary.
 
-        This method deserializes data from the JSON file if it exists and
-        populates the __objects dictionary with stored instance data.
-        Each instance is represented in dictionary format with a key formatted
-        as "ClassName.id".
+        This method deserializes data from the file if it exists and
+        populates the __objects dictionary with instances rebuilt from the
+        stored data, through the class named by each record's __class__
+        key. Each instance is stored with a key formatted as "ClassName.id".
 
         Side Effects:
             Updates the __objects dictionary by adding entries from the file.
-            If the file does not exist or is empty, __objects
-            remains unchanged.
+            If the file does not exist, __objects remains unchanged.
+            In lazy mode, only the offset index is read
+            when it is valid. In journaled mode, the logged changes are
+            then replayed on top of the snapshot.
+
+        Raises:
+            ValueError: If the file exists but is empty, truncated or in no
+                        known format. Nothing is loaded in that case.
+        """
+        if self.__shards is not None and os.path.isdir(
+                self.__file_path + ".d"):
+            self.__reload_shards()
+            return
+        if self.__lazy:
+            with self.__lock.write():
+                if self.__open_offsets():
+                    self.__seen = self.__stat()
+                    self.__replay()
+                    return
+        seen, records = self.__read()
+        objects = [(key, self.__from_dict(record))
+                   for key, record in records.items()]
+        with self.__lock.write():
+            for key, obj in objects:
+                self.__put(key, obj)
+            self.__seen = seen
+            self.__replay()
+            if self.__shards is not None:
+                self.__relayout = True
+
+    def __reload_shards(self):
         """
+        Loads every shard of the sharded layout, in parallel. If they are
+        not in the configured layout, the next save rewrites them all.
+        """
+        directory = self.__file_path + ".d"
         try:
-            with open(self.__file_path, 'r', encoding="UTF-8") as f:
-                try:
-                    data = json.load(f)
-                except json.decoder.JSONDecodeError as e:
-                    pass
-                else:
-                    for v in data.values():
-                        self.__objects[f"{v['__class__']}.{v['id']}"] = v
+            with open(os.path.join(directory, layout_file)) as f:
+                layout = f.read()
+        except FileNotFoundError:
+            layout = None
+        # Shards of the configured layout load last: during a change of
+        # layout, they are newer than the ones of the old layout
+        names = sorted((name for name in os.listdir(directory)
+                        if name != layout_file and not name.endswith(".tmp")),
+                       key=lambda name: (self.__in_layout(name), name))
+        paths = [os.path.join(directory, name) for name in names]
+        with ThreadPoolExecutor() as pool:
+            shards = list(pool.map(self.__load_shard, paths))
+        with self.__lock.write():
+            for objects in shards:
+                for key, obj in objects:
+                    self.__put(key, obj)
+            if layout != str(self.__shards):
+                self.__relayout = True
+
+    def __load_shard(self, path):
+        """Returns the (key, instance) pairs stored in the shard `path`."""
+        _, records = self.__read(path)
+        return [(key, self.__from_dict(record))
+                for key, record in records.items()]
+
+    def __read(self, path=None):
+        """
+        Reads and decodes the whole file, or the shard at `path`.
+
+        Returns:
+            tuple: The version of the file read, as returned by __stat(),
+                   and a dict mapping each key to its record. (None, {}) if
+                   the file does not exist.
+
+        Raises:
+            ValueError: If the file is empty, truncated or in no known
+                        format.
+        """
+        path = path or self.__file_path
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
         except FileNotFoundError:
-            pass
+            return None, {}
+        serializer = serializers.detect(data[:16])
+        if serializer is None:
+            raise ValueError("{}: empty or unknown file format".format(path))
+        try:
+            records = dict(serializer.read(data))
+        except ValueError as e:
+            raise ValueError("{}: corrupt {} file: {}".format(
+                path, serializer.name, e)) from e
+        return (st.st_ino, st.st_size, st.st_mtime_ns), records
+
+    def __replay(self):
+        """Applies the journaled changes, if any, on top of the snapshot."""
+        if self.__journal is not None:
+            for op, key, record in self.__journal.replay():
+                if op == "new":
+                    self.__put(key, self.__from_dict(record))
+                else:
+                    self.__discard(key)
+
     def delete(self, obj=None):
-        """Delete a given object from __objects, if it exists."""
+        """
+        Delete a given object from __objects, if it exists.
+
+        Args:
+            obj (BaseModel): The object to delete.
+        """
         try:
-            del self.__objects["{}.{}".format(type(obj).__name__, obj.id)]
-        except (AttributeError, KeyError):
-            pass
+            key = "{}.{}".format(type(obj).__name__, obj.id)
+        except AttributeError:
+            return
+        with self.__lock.write():
+            if not self.__discard(key):
+                return
+            if self.__shared:
+                self.__dirty.add(key)
+            if self.__shards is not None:
+                self.__dirty_shards.add(self.__shard(key))
+            if self.__journal is not None:
+                self.__unlogged.discard(key)
+                self.__journal.record_delete(key)
+            self.__changed = True
 
     def close(self):
-        """Call the reload method."""
+        """Persist pending saves, then call the reload method."""
+        self.flush()
         self.reload()
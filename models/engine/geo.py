@@ -0,0 +1,319 @@
+#!/usr/bin/python3
+"""Geospatial index and queries over latitude and longitude."""
+import math
+import threading
+from operator import itemgetter
+from sqlalchemy import and_, bindparam, inspect, or_, select, text
+
+EARTH_RADIUS_KM = 6371.0088
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Returns the great-circle distance between two points, in km."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) *
+         math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(lat, lon, radius_km):
+    """
+    Returns the smallest (south, west, north, east) box holding the
+    points within `radius_km` of (lat, lon). The box spans every
+    longitude when it reaches a pole, and has west > east when it
+    crosses the antimeridian.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = lat - math.degrees(angle)
+    north = lat + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        return (max(south, -90.0), -180.0, min(north, 90.0), 180.0)
+    dlon = math.degrees(math.asin(
+        min(1.0, math.sin(angle) / math.cos(math.radians(lat)))))
+    west, east = lon - dlon, lon + dlon
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return (south, west, north, east)
+
+
+def split_bbox(bbox):
+    """Returns `bbox` as one box, or two if it crosses the antimeridian."""
+    south, west, north, east = bbox
+    if west <= east:
+        return [bbox]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def geohash(lat, lon, precision=12):
+    """
+    Returns the geohash of a point: `precision` base 32 characters, each
+    halving its cell five times, alternately in longitude and latitude.
+    Points in a cell share the prefix of its geohash. Returns None if a
+    coordinate is None.
+    """
+    if lat is None or lon is None:
+        return None
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits, count, even = 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (lon, lon_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            bounds[0] = middle
+        else:
+            bits = bits * 2
+            bounds[1] = middle
+        even = not even
+        count += 1
+        if count == 5:
+            chars.append(_BASE32[bits])
+            bits, count = 0, 0
+    return "".join(chars)
+
+
+def _cell_size(precision):
+    """Returns the height and width in degrees of the geohash cells of
+    `precision` characters."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def _cell_span(low, high, origin, size):
+    """Returns the indexes of the cells of `size` from `origin` that the
+    range [low, high] overlaps."""
+    return range(int((low - origin) // size),
+                 int((high - origin) // size) + 1)
+
+
+def geohash_cells(bbox, max_cells=16):
+    """
+    Returns the geohashes of the cells covering `bbox`, at the highest
+    precision needing `max_cells` cells or fewer, or None if even the
+    32 cells of precision 1 are too many.
+    """
+    boxes = split_bbox(bbox)
+    for precision in range(12, 0, -1):
+        height, width = _cell_size(precision)
+        spans = [(_cell_span(south, north, -90.0, height),
+                  _cell_span(west, east, -180.0, width))
+                 for south, west, north, east in boxes]
+        if sum(len(rows) * len(cols) for rows, cols in spans) <= max_cells:
+            return sorted({
+                geohash(min(-90 + (row + 0.5) * height, 90.0),
+                        min(-180 + (col + 0.5) * width, 180.0), precision)
+                for rows, cols in spans for row in rows for col in cols})
+    return None
+
+
+def bbox_clause(cls, bbox, max_cells=16):
+    """
+    Returns the SQL condition selecting the rows of `cls` inside `bbox`.
+    When `cls` has a geohash column, the condition also bounds it by the
+    prefixes of the cells covering the box, as ranges an index on the
+    column can serve.
+    """
+    where = or_(*(and_(cls.latitude.between(south, north),
+                       cls.longitude.between(west, east))
+                  for south, west, north, east in split_bbox(bbox)))
+    column = getattr(cls, "geohash", None)
+    cells = geohash_cells(bbox, max_cells) if column is not None else None
+    if cells:
+        # "{" sorts right after "z", the last geohash character
+        where = and_(or_(*(and_(column >= cell, column < cell + "{")
+                           for cell in cells)), where)
+    return where
+
+
+def add_geohash_column(engine, cls):
+    """
+    Adds the geohash column of `cls` and its index to a table created
+    before the column existed, which create_all() leaves as is, and fills
+    it from the coordinates of the rows. Does nothing if `cls` has no
+    geohash column or the table has it already.
+    """
+    table = cls.__table__
+    column = table.c.get("geohash")
+    if column is None or "geohash" in {
+            c["name"] for c in inspect(engine).get_columns(table.name)}:
+        return
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE {} ADD COLUMN geohash {}".format(
+            table.name, column.type.compile(engine.dialect))))
+        for index in table.indexes:
+            if column in index.columns.values():
+                index.create(connection)
+        rows = connection.execute(
+            select(table.c.id, table.c.latitude, table.c.longitude).where(
+                table.c.latitude.is_not(None),
+                table.c.longitude.is_not(None))).all()
+        if rows:
+            connection.execute(
+                table.update().where(table.c.id == bindparam("row_id"))
+                .values(geohash=bindparam("hash")),
+                [{"row_id": id, "hash": geohash(lat, lon)}
+                 for id, lat, lon in rows])
+
+
+def nearest(objs, lat, lon, radius_km, limit=None):
+    """
+    Returns the objects within `radius_km` of (lat, lon), nearest first.
+
+    Args:
+        objs (dict): Objects with latitude and longitude, keyed by
+                     "ClassName.id".
+        limit (int): Optional maximum number of objects returned.
+
+    Returns:
+        dict: The objects found, keyed like `objs`.
+    """
+    found = []
+    for key, obj in objs.items():
+        if obj.latitude is None or obj.longitude is None:
+            continue
+        distance = distance_km(lat, lon, obj.latitude, obj.longitude)
+        if distance <= radius_km:
+            found.append((distance, key, obj))
+    found.sort(key=itemgetter(0))
+    return {key: obj for _, key, obj in found[:limit]}
+
+
+class GeoIndex:
+    """
+    The GeoIndex class keeps the latitude and longitude of the objects of
+    a class in a grid of `cell_size` degree cells, so that the objects in
+    a box or near a point are found by looking at the cells it overlaps
+    only:
+
+        index = GeoIndex(storage, Place)
+        keys = index.within((37.7, -122.5, 37.8, -122.4))
+        for key, distance in index.nearby(37.77, -122.41, 5, limit=10):
+            ...
+
+    Like the columnar cache, the index follows the objects as they are
+    stored with new() and deleted, through the listeners of a FileStorage.
+    DBStorage queries the geohash column of Place instead.
+    """
+
+    def __init__(self, storage, cls, cell_size=0.1):
+        """
+        Builds the grid from the objects of `cls` in `storage`, and
+        registers with it to follow their changes.
+
+        Raises:
+            ValueError: If `storage` has no listeners.
+        """
+        if not hasattr(storage, "add_listener"):
+            raise ValueError("the geospatial index needs a FileStorage")
+        self.cls = cls
+        self.cell_size = cell_size
+        self.__storage = storage
+        self.__prefix = cls.__name__ + "."
+        self.__lock = threading.Lock()
+        self.reset()
+        storage.load(cls)
+        storage.add_listener(self)
+
+    def close(self):
+        """Stops following the storage."""
+        self.__storage.remove_listener(self)
+
+    def reset(self):
+        """Empties the index, as the storage rebuilds its indexes."""
+        with self.__lock:
+            self.__cells = {}
+            self.__points = {}
+
+    def __cell(self, lat, lon):
+        """Returns the grid cell of a point."""
+        return (int(lat // self.cell_size), int(lon // self.cell_size))
+
+    def index(self, key, obj):
+        """Stores the position of the object `key`, added or updated."""
+        if not key.startswith(self.__prefix):
+            return
+        lat = getattr(obj, "latitude", None)
+        lon = getattr(obj, "longitude", None)
+        with self.__lock:
+            self.__remove(key)
+            if lat is None or lon is None:
+                return
+            point = (float(lat), float(lon))
+            self.__points[key] = point
+            self.__cells.setdefault(self.__cell(*point), {})[key] = point
+
+    def unindex(self, key):
+        """Removes the object `key`."""
+        with self.__lock:
+            self.__remove(key)
+
+    def __remove(self, key):
+        """Removes `key` from the grid, the lock being held."""
+        point = self.__points.pop(key, None)
+        if point is not None:
+            cell = self.__cell(*point)
+            del self.__cells[cell][key]
+            if not self.__cells[cell]:
+                del self.__cells[cell]
+
+    def __len__(self):
+        """Returns the number of objects with a position."""
+        return len(self.__points)
+
+    def __within(self, bbox):
+        """Returns the (key, point) pairs inside `bbox`, the lock being
+        held. All the cells are scanned when the box overlaps more cells
+        than there are cells in use."""
+        size = self.cell_size
+        found = []
+        for south, west, north, east in split_bbox(bbox):
+            rows = _cell_span(south, north, 0.0, size)
+            cols = _cell_span(west, east, 0.0, size)
+            if len(rows) * len(cols) > len(self.__cells):
+                cells = self.__cells.values()
+            else:
+                cells = filter(None, (self.__cells.get((row, col))
+                                      for row in rows for col in cols))
+            for cell in cells:
+                for key, (lat, lon) in cell.items():
+                    if south <= lat <= north and west <= lon <= east:
+                        found.append((key, (lat, lon)))
+        return found
+
+    def within(self, bbox):
+        """
+        Returns the keys of the objects inside a box.
+
+        Args:
+            bbox (tuple): The (south, west, north, east) box, with
+                          west > east if it crosses the antimeridian.
+        """
+        self.__storage.load(self.cls)
+        with self.__lock:
+            return [key for key, _ in self.__within(bbox)]
+
+    def nearby(self, lat, lon, radius_km, limit=None):
+        """
+        Returns the objects within `radius_km` of (lat, lon).
+
+        Args:
+            limit (int): Optional maximum number of objects returned.
+
+        Returns:
+            list: (key, distance in km) pairs, nearest first.
+        """
+        self.__storage.load(self.cls)
+        with self.__lock:
+            candidates = self.__within(bbox_around(lat, lon, radius_km))
+        found = []
+        for key, point in candidates:
+            distance = distance_km(lat, lon, *point)
+            if distance <= radius_km:
+                found.append((key, distance))
+        found.sort(key=itemgetter(1))
+        return found[:limit]
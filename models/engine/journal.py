@@ -0,0 +1,183 @@
+#!/usr/bin/python3
+"""Append-only journal used by FileStorage in journaled mode."""
+import json
+import os
+import shutil
+import threading
+
+
+class Journal:
+    """
+    The Journal class records every change made to a FileStorage as one
+    JSON line appended to a log file, so persisting a change costs the size
+    of that change instead of the size of the whole store.
+
+    Records are buffered by `record_new` and `record_delete` and written by
+    `commit`. Once the log grows past `max_size` it is rotated to a
+    `.compacting` file and a snapshot of the store is written in a
+    background thread, after which the rotated log is discarded. Replaying
+    records is idempotent, so a crash at any point of a compaction only
+    means some records are applied twice on the next `replay`. A record
+    torn by a crash is cut off the logs when the journal is opened, so
+    that the records committed afterwards start on a line of their own.
+
+    Attributes:
+        path (str): The path of the log file.
+        max_size (int): Log size in bytes that triggers a compaction.
+    """
+
+    MAX_SIZE = 1 << 20
+
+    def __init__(self, path, max_size=MAX_SIZE, fsync=None):
+        """
+        Initializes a journal writing to `path`.
+
+        Args:
+            path (str): The path of the log file.
+            max_size (int): Log size in bytes that triggers a compaction.
+            fsync (FsyncPolicy): When commits are synced to disk. None
+                                 leaves it to the operating system.
+        """
+        self.path = path
+        self.max_size = max_size
+        self.__fsync = fsync
+        self.__pending = []
+        self.__lock = threading.Lock()
+        self.__compactor = None
+        for log in (self.compacting_path, self.path):
+            self.__trim(log)
+
+    @staticmethod
+    def __trim(path):
+        """Truncates `path` after its last newline, dropping a trailing
+        record whose write was interrupted."""
+        try:
+            with open(path, 'rb+') as f:
+                end = f.seek(0, os.SEEK_END)
+                if end == 0:
+                    return
+                f.seek(end - 1)
+                if f.read(1) == b"\n":
+                    return
+                while end > 0:
+                    start = max(0, end - 4096)
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b"\n")
+                    if newline != -1:
+                        end = start + newline + 1
+                        break
+                    end = start
+                f.truncate(end)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def compacting_path(self):
+        """Path the log is rotated to while a snapshot is being written."""
+        return self.path + ".compacting"
+
+    def record_new(self, key, record):
+        """Buffers the creation or update of `key` with its dict form."""
+        with self.__lock:
+            self.__pending.append({"op": "new", "key": key, "obj": record})
+
+    def record_delete(self, key):
+        """Buffers the deletion of `key`."""
+        with self.__lock:
+            self.__pending.append({"op": "delete", "key": key})
+
+    def commit(self):
+        """
+        Appends the buffered records to the log.
+
+        Returns:
+            bool: True if the log has outgrown `max_size` and no compaction
+                  is already running, meaning the caller should compact.
+        """
+        with self.__lock:
+            pending, self.__pending = self.__pending, []
+            if pending:
+                with open(self.path, 'a', encoding="UTF-8") as f:
+                    for entry in pending:
+                        f.write(json.dumps(entry) + "\n")
+                    if self.__fsync is not None and self.__fsync.due():
+                        f.flush()
+                        os.fsync(f.fileno())
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                return False
+            return size > self.max_size and not self.compacting
+
+    @property
+    def compacting(self):
+        """True while a background compaction is running."""
+        return self.__compactor is not None and self.__compactor.is_alive()
+
+    def compact(self, write_snapshot):
+        """
+        Rotates the log and writes a snapshot in a background thread.
+
+        Args:
+            write_snapshot (callable): Writes the snapshot file. It must
+                                       reflect at least every record
+                                       committed before this call.
+        """
+        with self.__lock:
+            if self.compacting:
+                return
+            self.__rotate()
+            self.__compactor = threading.Thread(
+                target=self.__compact, args=(write_snapshot,), daemon=True)
+            self.__compactor.start()
+
+    def wait(self):
+        """Blocks until the running compaction, if any, has finished."""
+        if self.__compactor is not None:
+            self.__compactor.join()
+
+    def replay(self):
+        """
+        Yields the logged records, oldest first.
+
+        A line that cannot be decoded is the result of a write
+        interrupted by a crash and is skipped, and the lines after it are
+        replayed.
+
+        Yields:
+            tuple: (op, key, record) where op is "new" or "delete" and
+                   record is None for deletions.
+        """
+        for path in (self.compacting_path, self.path):
+            try:
+                with open(path, 'r', encoding="UTF-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.decoder.JSONDecodeError:
+                            continue
+                        yield entry["op"], entry["key"], entry.get("obj")
+            except FileNotFoundError:
+                pass
+
+    def __rotate(self):
+        """Moves the current log aside so new records go to a fresh one."""
+        if not os.path.exists(self.path):
+            return
+        if os.path.exists(self.compacting_path):
+            # Left behind by an interrupted compaction: its records are
+            # already in memory, so keep them until the next snapshot lands.
+            with open(self.compacting_path, 'ab') as dst, \
+                    open(self.path, 'rb') as src:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.compacting_path)
+
+    def __compact(self, write_snapshot):
+        """Writes the snapshot then drops the rotated log it supersedes."""
+        write_snapshot()
+        try:
+            os.remove(self.compacting_path)
+        except FileNotFoundError:
+            pass
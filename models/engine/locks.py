@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""Readers-writer lock guarding the in-memory state of FileStorage."""
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """
+    The RWLock class lets any number of threads hold it for reading, or a
+    single thread hold it for writing.
+
+    Writers are preferred: once a writer is waiting, threads not already
+    reading wait too, so a steady flow of readers cannot starve it. A
+    thread may re-acquire a lock it holds, and the writing thread may also
+    acquire it for reading, but a reading thread cannot upgrade to writing.
+
+    Usage:
+        with lock.read():
+            ...
+        with lock.write():
+            ...
+    """
+
+    def __init__(self):
+        """Initializes an unlocked lock."""
+        self.__cond = threading.Condition(threading.Lock())
+        self.__readers = {}
+        self.__writer = None
+        self.__depth = 0
+        self.__waiting = 0
+
+    def acquire_read(self):
+        """Blocks until the lock can be held for reading."""
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer == me or me in self.__readers:
+                self.__readers[me] = self.__readers.get(me, 0) + 1
+                return
+            while self.__writer is not None or self.__waiting:
+                self.__cond.wait()
+            self.__readers[me] = 1
+
+    def release_read(self):
+        """Releases one hold for reading."""
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__readers[me] == 1:
+                del self.__readers[me]
+                if not self.__readers:
+                    self.__cond.notify_all()
+            else:
+                self.__readers[me] -= 1
+
+    def acquire_write(self):
+        """
+        Blocks until the lock can be held for writing.
+
+        Raises:
+            RuntimeError: If the thread holds the lock for reading only.
+        """
+        me = threading.get_ident()
+        with self.__cond:
+            if self.__writer == me:
+                self.__depth += 1
+                return
+            if me in self.__readers:
+                raise RuntimeError(
+                    "cannot upgrade a read lock to a write lock")
+            self.__waiting += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__cond.wait()
+            finally:
+                self.__waiting -= 1
+            self.__writer = me
+            self.__depth = 1
+
+    def release_write(self):
+        """Releases one hold for writing."""
+        with self.__cond:
+            self.__depth -= 1
+            if self.__depth == 0:
+                self.__writer = None
+                self.__cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Holds the lock for reading for the duration of the block."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Holds the lock for writing for the duration of the block."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
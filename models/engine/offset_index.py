@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+"""Sorted on-disk offset index used by FileStorage in lazy mode."""
+import mmap
+import os
+import struct
+from models.engine.durability import atomic_write
+
+
+class OffsetIndex:
+    """
+    The OffsetIndex class maps each "ClassName.id" key of a data file to the
+    offset and length of its serialized record, so that records can be
+    parsed one at a time, straight from a memory map of the data file.
+
+    The index file holds a header followed by fixed-size entries sorted by
+    key. Opening it costs the same whatever the number of records, a key is
+    found by binary search, and the keys of one class form a contiguous
+    range. The header stores the size and modification time of the data
+    file it describes, so an index left behind by a writer that did not
+    maintain it is detected as stale and ignored.
+
+    Attributes:
+        KEY_SIZE (int): Maximum length in bytes of an indexed key.
+    """
+
+    MAGIC = b"HBNBIDX1"
+    KEY_SIZE = 80
+    HEADER = struct.Struct(">8sQQq")
+    ENTRY = struct.Struct(">{}sQI".format(KEY_SIZE))
+
+    def __init__(self, index, data, count):
+        """
+        Initializes an index over already opened memory maps.
+
+        Args:
+            index (mmap.mmap): Memory map of the index file.
+            data (mmap.mmap): Memory map of the data file.
+            count (int): Number of entries in the index.
+        """
+        self.__index = index
+        self.__data = data
+        self.__count = count
+
+    @classmethod
+    def write(cls, path, entries, data_path, sync=False):
+        """
+        Writes the index of `data_path`, which must already be in place.
+
+        Args:
+            path (str): The path of the index file.
+            entries (list): (key, offset, length) tuples for each record.
+            data_path (str): The path of the data file being indexed.
+            sync (bool): Whether to sync the index to disk before it
+                         replaces the previous one.
+
+        Returns:
+            bool: False if a key was too long to be indexed, in which case
+                  any previous index file is removed instead.
+        """
+        packed = []
+        for key, offset, length in entries:
+            raw = key.encode("UTF-8")
+            if len(raw) > cls.KEY_SIZE:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                return False
+            packed.append((raw, offset, length))
+        packed.sort()
+        st = os.stat(data_path)
+
+        def write(f):
+            f.write(cls.HEADER.pack(cls.MAGIC, len(packed), st.st_size,
+                                    st.st_mtime_ns))
+            for entry in packed:
+                f.write(cls.ENTRY.pack(*entry))
+        atomic_write(path, write, sync_data=sync, sync_dir=False)
+        return True
+
+    @classmethod
+    def open(cls, path, data_path):
+        """
+        Opens the index of `data_path`.
+
+        Returns:
+            OffsetIndex: The index, or None if either file is missing or
+                         the index does not describe the current data file.
+        """
+        try:
+            with open(data_path, 'rb') as data_f, open(path, 'rb') as idx_f:
+                st = os.fstat(data_f.fileno())
+                header = idx_f.read(cls.HEADER.size)
+                if len(header) < cls.HEADER.size:
+                    return None
+                magic, count, size, mtime_ns = cls.HEADER.unpack(header)
+                if (magic != cls.MAGIC or size != st.st_size or
+                        mtime_ns != st.st_mtime_ns or size == 0):
+                    return None
+                data = mmap.mmap(data_f.fileno(), 0, access=mmap.ACCESS_READ)
+                index = mmap.mmap(idx_f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        return cls(index, data, count)
+
+    def close(self):
+        """Releases both memory maps."""
+        self.__index.close()
+        self.__data.close()
+
+    def __len__(self):
+        """Returns the number of indexed records."""
+        return self.__count
+
+    def __entry(self, i):
+        """Returns the raw key, offset and length of entry `i`."""
+        return self.ENTRY.unpack_from(
+            self.__index, self.HEADER.size + i * self.ENTRY.size)
+
+    def __bisect(self, raw):
+        """Returns the position of the first entry whose key is >= raw."""
+        lo, hi = 0, self.__count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.__entry(mid)[0].rstrip(b"\0") < raw:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, key):
+        """
+        Returns the serialized record of `key`.
+
+        Returns:
+            bytes: The record as stored in the data file, or None if `key`
+                   is not indexed.
+        """
+        raw = key.encode("UTF-8")
+        i = self.__bisect(raw)
+        if i < self.__count:
+            found, offset, length = self.__entry(i)
+            if found.rstrip(b"\0") == raw:
+                return self.__data[offset:offset + length]
+        return None
+
+    def items(self, prefix=""):
+        """
+        Yields the keys starting with `prefix` and their serialized record,
+        in key order. With a "ClassName." prefix, yields that class only.
+
+        Yields:
+            tuple: (key, bytes) for each matching record.
+        """
+        raw = prefix.encode("UTF-8")
+        for i in range(self.__bisect(raw), self.__count):
+            found, offset, length = self.__entry(i)
+            found = found.rstrip(b"\0")
+            if not found.startswith(raw):
+                break
+            yield found.decode("UTF-8"), self.__data[offset:offset + length]
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""Connection pool tuning of DBStorage."""
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    """
+    The TimedQueuePool class is a QueuePool that also measures how long
+    checkouts wait for a connection, and how many give up after
+    pool_timeout, for DBStorage.pool_stats(). The figures cover the life
+    of the pool, which a dispose() replaces.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initializes the pool and its counters."""
+        super().__init__(*args, **kwargs)
+        self.__lock = threading.Lock()
+        self.__checkouts = 0
+        self.__timeouts = 0
+        self.__wait_total = 0.0
+        self.__wait_max = 0.0
+
+    def _do_get(self):
+        """Checks a connection out of the pool, timing the wait."""
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with self.__lock:
+                self.__timeouts += 1
+            raise
+        wait = time.perf_counter() - start
+        with self.__lock:
+            self.__checkouts += 1
+            self.__wait_total += wait
+            self.__wait_max = max(self.__wait_max, wait)
+        return connection
+
+    def wait_stats(self):
+        """
+        Returns the checkout figures.
+
+        Returns:
+            dict: checkouts, timeouts, and the total, maximum and average
+                  wait for a connection in seconds.
+        """
+        with self.__lock:
+            return {"checkouts": self.__checkouts,
+                    "timeouts": self.__timeouts,
+                    "wait_total": self.__wait_total,
+                    "wait_max": self.__wait_max,
+                    "wait_avg": self.__wait_total / self.__checkouts
+                    if self.__checkouts else 0.0}
+
+
+def uses_queue_pool(url):
+    """
+    Returns True if connections to `url` can be pooled in a QueuePool,
+    which is every database but an in-memory SQLite one, whose content
+    lives and dies with its single connection.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return True
+    return (url.database not in (None, "", ":memory:") and
+            url.query.get("mode") != "memory")
+
+
+def ping_idle(engine, interval):
+    """
+    Makes the pool of `engine` test a connection with "SELECT 1" when it
+    is checked out after being idle for `interval` seconds or more, and
+    replace it if the test fails. Unlike pool_pre_ping, connections reused
+    right away cost no extra round-trip.
+
+    Args:
+        engine (Engine): The engine whose pool is configured.
+        interval (float): Idle seconds after which a connection is tested.
+    """
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, record):
+        """Remembers when the connection went idle."""
+        if record is not None:
+            record.info["hbnb_idle_since"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, record, proxy):
+        """Tests the connection if it has been idle long enough."""
+        since = record.info.get("hbnb_idle_since")
+        if since is None or time.monotonic() - since < interval:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception as e:
+            # The pool invalidates the connection and retries with a new one
+            raise exc.DisconnectionError() from e
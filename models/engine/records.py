@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""Compact records FileStorage can keep in place of model instances."""
+from datetime import datetime
+from sqlalchemy import Column, inspect
+
+_TIMESTAMPS = ("created_at", "updated_at")
+_MISSING = object()
+
+# Record class of each model class, made on first use
+record_classes = {}
+
+
+class Record:
+    """
+    The Record class is the base of the classes made by record_class():
+    plain objects with a slot per column of their model, and none of the
+    instance dictionary and SQLAlchemy state a model instance carries.
+    Attributes that are not columns, such as the ones the console's update
+    command can set, are kept in a dictionary of extras. Timestamps are
+    kept as datetime objects.
+
+    Attributes:
+        model (type): The model class the records stand for.
+        fields (tuple): The names of the slots, in column order.
+        names (frozenset): The same names, for lookups.
+    """
+
+    __slots__ = ("_extra",)
+    model = None
+    fields = ()
+    names = frozenset()
+
+    @classmethod
+    def from_dict(cls, attrs):
+        """
+        Builds a record from the attributes of an instance, or from the
+        dict form of one, whose timestamps are then parsed.
+
+        Args:
+            attrs (dict): The attributes. '__class__' and SQLAlchemy's
+                          '_sa_instance_state' are ignored.
+        """
+        record = cls.__new__(cls)
+        slots = cls.names
+        extra = None
+        for name, value in attrs.items():
+            if name in slots:
+                if name in _TIMESTAMPS and isinstance(value, str):
+                    value = datetime.fromisoformat(value)
+                setattr(record, name, value)
+            elif name != '__class__' and name != '_sa_instance_state':
+                if extra is None:
+                    extra = {}
+                extra[name] = value
+        record._extra = extra
+        return record
+
+    def __getattr__(self, name):
+        """Returns an extra attribute, as slots are looked up first."""
+        extra = self._extra
+        if extra is not None and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def attrs(self):
+        """Returns the attributes as an instance of the model holds them."""
+        attrs = {}
+        for name in self.fields:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                attrs[name] = value
+        if self._extra:
+            attrs.update(self._extra)
+        return attrs
+
+    def to_dict(self):
+        """Returns the dict form of the record, as the model's to_dict()."""
+        new_dict = self.attrs()
+        for name in _TIMESTAMPS:
+            if name in new_dict:
+                new_dict[name] = new_dict[name].isoformat()
+        new_dict['__class__'] = self.model.__name__
+        return new_dict
+
+    def mark_clean(self):
+        """Does nothing: a record holds what was last stored."""
+
+    def instance(self):
+        """Returns a new, clean instance of the model holding the record."""
+        return self.model.from_dict(self.attrs())
+
+
+def record_class(model):
+    """
+    Returns the record class of `model`, made the first time from its
+    columns, plus the attributes its constructor sets besides them, such
+    as Place.amenity_ids.
+
+    Args:
+        model (type): A BaseModel subclass, mapped or not.
+    """
+    cls = record_classes.get(model)
+    if cls is None:
+        mapper = inspect(model, raiseerr=False)
+        if mapper is not None:
+            fields = [attr.key for attr in mapper.column_attrs]
+        else:
+            fields = [name for name in dir(model)
+                      if isinstance(getattr(model, name, None), Column)]
+        fields += [name for name in model().__dict__
+                   if name not in fields and not name.startswith('_')]
+        cls = type(model.__name__ + "Record", (Record,),
+                   {"__slots__": tuple(fields), "fields": tuple(fields),
+                    "names": frozenset(fields), "model": model})
+        record_classes[model] = cls
+    return cls
@@ -0,0 +1,355 @@
+#!/usr/bin/python3
+"""
+On-disk formats of FileStorage.
+
+Each serializer turns the dictionary form of an object into bytes and
+lays such records out in a file, reporting where each one landed so that
+lazy mode can index them. The format of an existing file is detected from
+its first bytes, so changing HBNB_FILE_FORMAT migrates a store the next
+time it is saved. A store can also be converted offline with:
+
+    python3 -m models.engine.serializers <src> <dst> <format>
+"""
+import json
+import math
+import struct
+import sys
+from datetime import datetime, timedelta
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _finite(value):
+    """Returns False if `value` holds NaN or an infinity, which orjson
+    would encode as null."""
+    if isinstance(value, float):
+        return math.isfinite(value)
+    if isinstance(value, dict):
+        return all(map(_finite, value.values()))
+    if isinstance(value, list):
+        return all(map(_finite, value))
+    return True
+
+
+class JSONSerializer:
+    """
+    Lays records out as a single JSON object keyed by "ClassName.id".
+
+    The pretty variant reproduces json.dump(..., indent=2) byte for byte;
+    the compact variant drops all optional whitespace. When the orjson
+    package is installed, it encodes the compact one, which then holds
+    non-ASCII text as UTF-8 rather than escapes. Records orjson cannot
+    encode as json would, holding NaN, infinities or integers beyond 64
+    bits, are left to json. Both variants are parsed by json, as orjson
+    rejects NaN and reads big integers as floats.
+
+    Attributes:
+        name (str): The name the format is selected by.
+    """
+
+    def __init__(self, name, indent):
+        """
+        Initializes a JSON format.
+
+        Args:
+            name (str): The name the format is selected by.
+            indent (bool): Whether to pretty-print with an indent of 2.
+        """
+        self.name = name
+        self.__indent = indent
+
+    def dump_record(self, record):
+        """Serializes one record, nested as it appears in the file."""
+        if self.__indent:
+            return json.dumps(record, indent=2).replace(
+                "\n", "\n  ").encode()
+        if orjson is not None and _finite(record):
+            try:
+                return orjson.dumps(record)
+            except TypeError:
+                pass  # Integers beyond 64 bits, left to json
+        return json.dumps(record, separators=(",", ":")).encode()
+
+    def load_record(self, data):
+        """Deserializes one record written by dump_record()."""
+        return json.loads(data)
+
+    def write(self, f, items):
+        """
+        Writes serialized records to the binary file `f`.
+
+        Args:
+            f (file): A file opened for binary writing.
+            items (iterable): (key, bytes) pairs from dump_record().
+
+        Returns:
+            list: (key, offset, length) of each record within the file.
+        """
+        if self.__indent:
+            first, sep, colon, end = b"\n  ", b",\n  ", b": ", b"\n}"
+        else:
+            first, sep, colon, end = b"", b",", b":", b"}"
+        entries = []
+        offset = f.write(b"{")
+        for key, record in items:
+            offset += f.write((sep if entries else first) +
+                              json.dumps(key).encode() + colon)
+            entries.append((key, offset, len(record)))
+            offset += f.write(record)
+        f.write(end if entries else b"}")
+        return entries
+
+    def read(self, data):
+        """
+        Yields the (key, record) pairs of a whole file.
+
+        Raises:
+            ValueError: If `data` is not a valid JSON object.
+        """
+        return iter(json.loads(data).items())
+
+    def detect(self, head):
+        """Returns True if a file starting with `head` has this format."""
+        head = head.lstrip()
+        if self.__indent:
+            return head[:2] in (b"{\n", b"{}")
+        return head[:1] == b"{" and head[1:2] != b"\n"
+
+
+class BinarySerializer:
+    """
+    Lays records out as a magic header followed by length-prefixed
+    records: a 2-byte key length, the UTF-8 key, a 4-byte record length
+    and the record itself, as produced by the `encode` function.
+
+    Attributes:
+        name (str): The name the format is selected by.
+        magic (bytes): The 8 bytes every file of this format starts with.
+    """
+
+    KEY = struct.Struct(">H")
+    LENGTH = struct.Struct(">I")
+
+    def __init__(self, name, magic, encode, decode):
+        """
+        Initializes a binary format.
+
+        Args:
+            name (str): The name the format is selected by.
+            magic (bytes): The 8 bytes files of this format start with.
+            encode (callable): Turns a record dict into bytes.
+            decode (callable): Turns bytes back into a record dict.
+        """
+        self.name = name
+        self.magic = magic
+        self.dump_record = encode
+        self.load_record = decode
+
+    def write(self, f, items):
+        """
+        Writes serialized records to the binary file `f`.
+
+        Args:
+            f (file): A file opened for binary writing.
+            items (iterable): (key, bytes) pairs from dump_record().
+
+        Returns:
+            list: (key, offset, length) of each record within the file.
+        """
+        entries = []
+        offset = f.write(self.magic)
+        for key, record in items:
+            raw = key.encode("UTF-8")
+            offset += f.write(self.KEY.pack(len(raw)) + raw +
+                              self.LENGTH.pack(len(record)))
+            entries.append((key, offset, len(record)))
+            offset += f.write(record)
+        return entries
+
+    def read(self, data):
+        """
+        Yields the (key, record) pairs of a whole file.
+
+        Raises:
+            ValueError: If `data` is truncated or has another format.
+        """
+        if not data.startswith(self.magic):
+            raise ValueError("not a {} file".format(self.name))
+        pos, end = len(self.magic), len(data)
+        try:
+            while pos < end:
+                size, = self.KEY.unpack_from(data, pos)
+                pos += self.KEY.size
+                key = data[pos:pos + size].decode("UTF-8")
+                pos += size
+                size, = self.LENGTH.unpack_from(data, pos)
+                pos += self.LENGTH.size
+                if pos + size > end:
+                    raise ValueError("truncated record")
+                yield key, self.load_record(data[pos:pos + size])
+                pos += size
+        except struct.error as e:
+            raise ValueError("truncated record") from e
+
+    def detect(self, head):
+        """Returns True if a file starting with `head` has this format."""
+        return head.startswith(self.magic)
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_TIMESTAMPS = ("created_at", "updated_at")
+_NAME = struct.Struct(">B")
+_COUNT = struct.Struct(">H")
+_INT = struct.Struct(">q")
+_FLOAT = struct.Struct(">d")
+_SIZE = struct.Struct(">I")
+
+
+def pack_record(record):
+    """
+    Encodes a record dict as typed, struct-packed fields.
+
+    Each field is its name, a one-byte type tag and the value: None and
+    booleans take no room, integers and floats 8 bytes, the timestamps
+    8 bytes of microseconds since the epoch, strings a length and UTF-8
+    text. Other values, such as lists, are stored as JSON text.
+    """
+    out = [_COUNT.pack(len(record))]
+    for name, value in record.items():
+        raw = name.encode("UTF-8")
+        out.append(_NAME.pack(len(raw)) + raw)
+        if value is None:
+            out.append(b"n")
+        elif value is True or value is False:
+            out.append(b"t" if value else b"f")
+        elif isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+            out.append(b"i" + _INT.pack(value))
+        elif isinstance(value, float):
+            out.append(b"d" + _FLOAT.pack(value))
+        elif isinstance(value, str):
+            if name in _TIMESTAMPS:
+                try:
+                    stamp = datetime.fromisoformat(value)
+                except ValueError:
+                    stamp = None
+                if stamp is not None and stamp.tzinfo is None:
+                    out.append(b"T" + _INT.pack(
+                        (stamp - _EPOCH) // _MICROSECOND))
+                    continue
+            text = value.encode("UTF-8")
+            out.append(b"s" + _SIZE.pack(len(text)) + text)
+        else:
+            text = json.dumps(value).encode("UTF-8")
+            out.append(b"j" + _SIZE.pack(len(text)) + text)
+    return b"".join(out)
+
+
+def unpack_record(data):
+    """Decodes a record encoded by pack_record()."""
+    record = {}
+    count, = _COUNT.unpack_from(data, 0)
+    pos = _COUNT.size
+    for _ in range(count):
+        size = data[pos]
+        name = data[pos + 1:pos + 1 + size].decode("UTF-8")
+        pos += 1 + size
+        tag = data[pos:pos + 1]
+        pos += 1
+        if tag == b"n":
+            value = None
+        elif tag == b"t" or tag == b"f":
+            value = tag == b"t"
+        elif tag == b"i":
+            value, = _INT.unpack_from(data, pos)
+            pos += _INT.size
+        elif tag == b"d":
+            value, = _FLOAT.unpack_from(data, pos)
+            pos += _FLOAT.size
+        elif tag == b"T":
+            stamp, = _INT.unpack_from(data, pos)
+            value = (_EPOCH + stamp * _MICROSECOND).isoformat()
+            pos += _INT.size
+        else:
+            size, = _SIZE.unpack_from(data, pos)
+            pos += _SIZE.size
+            value = data[pos:pos + size].decode("UTF-8")
+            if tag == b"j":
+                value = json.loads(value)
+            pos += size
+        record[name] = value
+    return record
+
+
+serializers = {
+    "json": JSONSerializer("json", indent=True),
+    "compact": JSONSerializer("compact", indent=False),
+    "binary": BinarySerializer("binary", b"HBNBBIN1",
+                               pack_record, unpack_record),
+}
+if msgpack is not None:
+    serializers["msgpack"] = BinarySerializer(
+        "msgpack", b"HBNBMSG1", msgpack.packb,
+        lambda data: msgpack.unpackb(data, raw=False))
+
+
+def get(name):
+    """
+    Returns the serializer selected by `name`.
+
+    Raises:
+        ValueError: If the format is unknown or its package is missing.
+    """
+    if name == "msgpack" and msgpack is None:
+        raise ValueError("the msgpack format needs the msgpack package")
+    try:
+        return serializers[name]
+    except KeyError:
+        raise ValueError("unknown file format: {}".format(name)) from None
+
+
+def detect(head):
+    """
+    Returns the serializer that wrote a file starting with `head`, or None
+    if no known format matches.
+    """
+    for serializer in serializers.values():
+        if serializer.detect(head):
+            return serializer
+    return None
+
+
+def migrate(src, dst, name):
+    """
+    Rewrites the store at `src` to `dst` in the format `name`.
+
+    Returns:
+        int: The number of records converted.
+
+    Raises:
+        ValueError: If `src` has an unknown format or `name` is unknown.
+    """
+    target = get(name)
+    with open(src, 'rb') as f:
+        data = f.read()
+    source = detect(data[:16])
+    if source is None:
+        raise ValueError("unknown file format: {}".format(src))
+    with open(dst, 'wb') as f:
+        entries = target.write(f, ((key, target.dump_record(record))
+                                   for key, record in source.read(data)))
+    return len(entries)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("Usage: {} <src> <dst> <{}>".format(
+            sys.argv[0], "|".join(serializers)), file=sys.stderr)
+        sys.exit(1)
+    print(migrate(*sys.argv[1:]))
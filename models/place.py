@@ -1,8 +1,13 @@
 #!/usr/bin/python3
 """ Place Module for HBNB project """
+import models
+from models.amenity import Amenity
 from models.base_model import BaseModel, Base
+from models.engine.geo import geohash
 from sqlalchemy import Column, String, Integer, Float, ForeignKey, Table
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
+from models.review import Review
 
 association_table = Table(
     "place_amenity", Base.metadata,
@@ -13,8 +18,10 @@ association_table = Table(
 class Place(BaseModel, Base):
     """ A place to stay """
     __tablename__ = "places"
-    city_id = Column(String(60), ForeignKey("cities.id"), nullable=False)
-    user_id = Column(String(60), ForeignKey("users.id"), nullable=False)
+    city_id = Column(String(60), ForeignKey("cities.id"), nullable=False,
+                     index=True)
+    user_id = Column(String(60), ForeignKey("users.id"), nullable=False,
+                     index=True)
     name = Column(String(128), nullable=False)
     description = Column(String(1024))
     number_rooms = Column(Integer, default=0)
@@ -23,11 +30,67 @@ class Place(BaseModel, Base):
     price_by_night = Column(Integer, default=0)
     latitude = Column(Float)
     longitude = Column(Float)
-    reviews = relationship("Review", backref="place", cascade="delete")
-    amenities = relationship(
-        "Amenity", 
-        secondary="place_amenity",
-        back_populates="places",  # Links to Amenity.places
-        viewonly=False
-    )
-    amenity_ids = []
+
+    if models.storage_t == "db":
+        # Kept in step with latitude and longitude, see _set_geohash()
+        geohash = Column(String(12), index=True)
+        reviews = relationship("Review", backref="place", cascade="delete")
+        amenities = relationship(
+            "Amenity",
+            secondary="place_amenity",
+            back_populates="places",  # Links to Amenity.places
+            viewonly=False
+        )
+
+        @classmethod
+        def from_dict(cls, record):
+            """ Rebuilds a place, with the geohash of its coordinates,
+            which the set events do not see being filled in """
+            obj = super().from_dict(record)
+            obj.__dict__["geohash"] = geohash(obj.__dict__.get("latitude"),
+                                              obj.__dict__.get("longitude"))
+            return obj
+    else:
+        def __init__(self, *args, **kwargs):
+            """ Initializes a place with its own list of amenity ids """
+            self.amenity_ids = []
+            super().__init__(*args, **kwargs)
+
+        @classmethod
+        def from_dict(cls, record):
+            """ Rebuilds a place, with its own list of amenity ids """
+            obj = super().from_dict(record)
+            obj.__dict__.setdefault("amenity_ids", [])
+            return obj
+
+        @property
+        def reviews(self):
+            """ The Review instances of this Place, from the file storage """
+            return list(models.storage.find(Review, place_id=self.id).values())
+
+        @property
+        def amenities(self):
+            """ The Amenity instances whose id is in amenity_ids """
+            return [amenity for amenity_id in self.amenity_ids
+                    for amenity in models.storage.find(
+                        Amenity, id=amenity_id).values()]
+
+        @amenities.setter
+        def amenities(self, obj):
+            """ Adds the id of an Amenity instance to amenity_ids """
+            if isinstance(obj, Amenity) and obj.id not in self.amenity_ids:
+                # Assigned rather than appended, so the change is tracked
+                self.amenity_ids = self.amenity_ids + [obj.id]
+
+
+def _set_geohash(target, value, oldvalue, initiator):
+    """ Recomputes the geohash of a place as a coordinate is set """
+    coords = {"latitude": target.__dict__.get("latitude"),
+              "longitude": target.__dict__.get("longitude")}
+    coords[initiator.key] = value
+    target.geohash = geohash(coords["latitude"], coords["longitude"])
+
+
+if models.storage_t == "db":
+    event.listen(Place.latitude, "set", _set_geohash)
+    event.listen(Place.longitude, "set", _set_geohash)
@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 """ State Module for HBNB project """
+import models
 from models.base_model import BaseModel, Base
 from models.city import City
 from sqlalchemy import Column, String
@@ -9,8 +10,11 @@ class State(BaseModel, Base):
     """ State class """
     __tablename__ = 'states'
     name = Column(String(128), nullable=False)
-    cities = relationship('City', backref="state", cascade="all")
 
-    @property
-    def cities(self):
-        return self.cities
\ No newline at end of file
+    if models.storage_t == "db":
+        cities = relationship('City', backref="state", cascade="all")
+    else:
+        @property
+        def cities(self):
+            """ The City instances of this State, from the file storage """
+            return list(models.storage.find(City, state_id=self.id).values())
@@ -59,8 +59,10 @@ class test_basemodel(unittest.TestCase):
     def test_str(self):
         """ """
         i = self.value()
+        attrs = {k: v for k, v in i.__dict__.items()
+                 if k != '_sa_instance_state'}
         self.assertEqual(str(i), '[{}] ({}) {}'.format(self.name, i.id,
-                         i.__dict__))
+                         attrs))
 
     def test_todict(self):
         """ """
@@ -68,6 +70,51 @@ class test_basemodel(unittest.TestCase):
         n = i.to_dict()
         self.assertEqual(i.to_dict(), n)
 
+    def test_changes(self):
+        """ Attributes set since mark_clean() are reported """
+        i = self.value()
+        self.assertIn('id', i.changes())
+        i.mark_clean()
+        self.assertEqual(i.changes(), {})
+        i.updated_at = datetime.datetime(2020, 1, 1)
+        self.assertEqual(i.changes(),
+                         {'updated_at': datetime.datetime(2020, 1, 1)})
+        self.assertNotIn('changes', i.to_dict())
+
+    def test_to_dict_cached(self):
+        """ to_dict() is rebuilt only after the instance changes """
+        i = self.value()
+        n = i.to_dict()
+        n['name'] = 'changed'
+        self.assertNotIn('name', i.to_dict())
+        self.assertIsNot(i.to_dict(), i.to_dict())
+        i.name = 'set'
+        self.assertEqual(i.to_dict()['name'], 'set')
+        del i.name
+        self.assertNotIn('name', i.to_dict())
+        i.updated_at = datetime.datetime(2020, 1, 1)
+        self.assertEqual(i.to_dict()['updated_at'], '2020-01-01T00:00:00')
+
+    def test_from_dict(self):
+        """ from_dict() rebuilds a clean copy of the instance """
+        i = self.value()
+        n = i.to_dict()
+        new = self.value.from_dict(n)
+        self.assertIsInstance(new, self.value)
+        self.assertEqual(new.to_dict(), n)
+        self.assertEqual(new.created_at, i.created_at)
+        self.assertEqual(new.changes(), {})
+        self.assertIn('__class__', n)
+
+    def test_from_dict_defaults(self):
+        """ from_dict() generates only what the record lacks """
+        new = self.value.from_dict({'id': 'abc'})
+        self.assertEqual(new.id, 'abc')
+        self.assertEqual(type(new.created_at), datetime.datetime)
+        self.assertEqual(type(new.updated_at), datetime.datetime)
+        self.assertNotEqual(self.value.from_dict({}).id,
+                            self.value.from_dict({}).id)
+
     def test_kwargs_none(self):
         """ """
         n = {None: None}
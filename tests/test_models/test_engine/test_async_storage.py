@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+""" Module for testing the asynchronous storage facade """
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from models.engine.async_storage import AsyncStorage, async_url
+from models.engine.db_storage import DBStorage
+from models import storage
+from models.state import State
+import models
+
+
+@unittest.skipIf(models.storage_t == "db", "file storage only")
+class test_AsyncStorage_file(unittest.TestCase):
+    """ Class to test the facade over the file storage """
+
+    def setUp(self):
+        """ Empty the storage """
+        for key in list(storage._FileStorage__objects):
+            del storage._FileStorage__objects[key]
+        self.storage = AsyncStorage(storage, max_workers=4)
+
+    def tearDown(self):
+        """ Remove storage file at end of tests """
+        asyncio.run(self.storage.dispose())
+        try:
+            os.remove('file.json')
+        except Exception:
+            pass
+
+    def test_round_trip(self):
+        """ Objects are added, found, saved and deleted """
+        state = State(name="California")
+
+        async def run():
+            await self.storage.new(state)
+            await self.storage.save()
+            self.assertIs(await self.storage.get(State, state.id), state)
+            self.assertIs(await self.storage.get("State", state.id), state)
+            self.assertIsNone(await self.storage.get(State, "nothing"))
+            found = await self.storage.find(State, name="California")
+            self.assertEqual(list(found.values()), [state])
+            await self.storage.delete(state)
+            return await self.storage.all(State)
+        self.assertEqual(asyncio.run(run()), {})
+        self.assertFalse(self.storage.native)
+
+    def test_off_the_loop(self):
+        """ Calls run outside of the thread of the event loop """
+        seen = []
+        original = storage.all
+
+        def all(*args, **kwargs):
+            seen.append(threading.get_ident())
+            return original(*args, **kwargs)
+        storage.all = all
+        try:
+            async def run():
+                return await asyncio.gather(
+                    *(self.storage.all() for _ in range(8)))
+            results = asyncio.run(run())
+        finally:
+            del storage.all
+        self.assertEqual(len(results), 8)
+        self.assertNotIn(threading.get_ident(), seen)
+
+
+class test_AsyncStorage_db(unittest.TestCase):
+    """ Class to test the facade over the database storage """
+
+    def setUp(self):
+        """ Open a cached storage on a scratch SQLite database """
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["HBNB_DB_URL"] = "sqlite:///" + os.path.join(
+            self.tmp.name, "hbnb.db")
+        os.environ["HBNB_DB_CACHE_SIZE"] = "100"
+        self.sync = DBStorage()
+        self.sync.reload()
+        self.storage = AsyncStorage(self.sync)
+
+    def tearDown(self):
+        """ Close the storages and remove the database """
+        asyncio.run(self.storage.dispose())
+        self.sync.close()
+        self.sync._DBStorage__engine.dispose()
+        os.environ.pop("HBNB_DB_URL", None)
+        os.environ.pop("HBNB_DB_CACHE_SIZE", None)
+        self.tmp.cleanup()
+
+    def test_async_url(self):
+        """ URLs get the async driver of their backend """
+        self.assertEqual(async_url("sqlite:///a.db").drivername,
+                         "sqlite+aiosqlite")
+        self.assertEqual(async_url("mysql+mysqldb://u:p@h/db").drivername,
+                         "mysql+aiomysql")
+        self.assertIsNone(async_url("oracle://u:p@h/db"))
+
+    def test_round_trip(self):
+        """ Objects are added, found, saved and deleted """
+        state = State(name="California")
+
+        async def run():
+            await self.storage.reload()
+            await self.storage.new(state)
+            await self.storage.save()
+            await self.storage.close()
+            found = await self.storage.get(State, state.id)
+            self.assertEqual(found.name, "California")
+            self.assertEqual(list(await self.storage.all(State)),
+                             ["State." + state.id])
+            await self.storage.delete(found)
+            await self.storage.save()
+            found = await self.storage.find(State, name="California")
+            await self.storage.close()
+            return found
+        self.assertEqual(asyncio.run(run()), {})
+
+    def test_native(self):
+        """ SQLite is served by the async engine, on aiosqlite """
+        try:
+            import aiosqlite  # noqa: F401
+        except ImportError:
+            self.skipTest("aiosqlite is not installed")
+        self.assertTrue(self.storage.native)
+
+    def test_cache(self):
+        """ Changes drop the cache entries of the storage they touch """
+        state = State(name="California")
+        self.sync.new(state)
+        self.sync.save()
+        self.sync.close()
+        self.assertEqual(list(self.sync.all(State)), ["State." + state.id])
+        self.assertEqual(self.sync.get(State, state.id).name, "California")
+        self.sync.close()
+        other = State(name="Nevada")
+
+        async def run():
+            await self.storage.new(other)
+            found = await self.storage.get(State, state.id)
+            found.name = "Oregon"
+            await self.storage.count(State)  # Flushes the new name
+            await self.storage.save()
+            await self.storage.close()
+        asyncio.run(run())
+        self.assertEqual(self.sync.get(State, state.id).name, "Oregon")
+        self.assertEqual(len(self.sync.all(State)), 2)
+
+    def test_nearby(self):
+        """ Places are found by position """
+        from models.place import Place
+        place = Place(city_id="c", user_id="u", name="SF",
+                      latitude=37.7749, longitude=-122.4194)
+
+        async def run():
+            await self.storage.reload()
+            await self.storage.new(place)
+            await self.storage.save()
+            found = await self.storage.within(Place, (37, -123, 38, -122))
+            self.assertEqual(list(found), ["Place." + place.id])
+            found = await self.storage.nearby(Place, 37.77, -122.41, 5)
+            await self.storage.close()
+            return found
+        self.assertEqual(list(asyncio.run(run())), ["Place." + place.id])
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+""" Module for testing write coalescing """
+import os
+import time
+import unittest
+from unittest.mock import patch
+from models.engine.batching import SaveBatching
+
+
+class Counting(SaveBatching):
+    """ Storage stand-in counting how often it persists """
+
+    def __init__(self):
+        """ Start with no persist """
+        super().__init__()
+        self.persisted = 0
+        self.added = []
+
+    def _persist(self):
+        """ Count one persist """
+        self.persisted += 1
+
+    def bulk_new(self, objs):
+        """ Remember the objects added """
+        self.added.extend(objs)
+
+
+class test_saveBatching(unittest.TestCase):
+    """ Class to test the save batching mixin """
+
+    def test_abstract(self):
+        """ Engines must implement _persist() and bulk_new() """
+        class NoPersist(SaveBatching):
+            """ Storage stand-in without _persist() """
+            bulk_new = Counting.bulk_new
+
+        class NoBulk(SaveBatching):
+            """ Storage stand-in without bulk_new() """
+            _persist = Counting._persist
+        for cls in (NoPersist, NoBulk):
+            with self.assertRaises(TypeError):
+                cls()
+
+    def test_save_persists(self):
+        """ Without batch nor policy, each save persists """
+        storage = Counting()
+        storage.save()
+        storage.save()
+        self.assertEqual(storage.persisted, 2)
+
+    def test_batch(self):
+        """ Saves inside a batch persist once, on exit """
+        storage = Counting()
+        with storage.batch():
+            for i in range(10):
+                storage.save()
+            self.assertEqual(storage.persisted, 0)
+            self.assertEqual(storage.pending, 10)
+        self.assertEqual(storage.persisted, 1)
+        self.assertEqual(storage.pending, 0)
+
+    def test_batch_per_thread(self):
+        """ Engines can keep a batch to the thread that opened it """
+        import threading
+
+        class PerThread(Counting):
+            """ Storage stand-in batching each thread separately """
+            _batches_per_thread = True
+        for cls, persisted in ((Counting, 0), (PerThread, 1)):
+            storage = cls()
+            with storage.batch():
+                storage.save()
+                thread = threading.Thread(target=storage.save)
+                thread.start()
+                thread.join()
+                self.assertEqual(storage.persisted, persisted)
+            self.assertEqual(storage.persisted, persisted + 1)
+
+    def test_nested_batch(self):
+        """ Only the outermost batch persists """
+        storage = Counting()
+        with storage.batch():
+            with storage.batch():
+                storage.save()
+            self.assertEqual(storage.persisted, 0)
+        self.assertEqual(storage.persisted, 1)
+
+    def test_batch_error(self):
+        """ A batch left by an exception still persists """
+        storage = Counting()
+        with self.assertRaises(KeyError):
+            with storage.batch():
+                storage.save()
+                raise KeyError()
+        self.assertEqual(storage.persisted, 1)
+
+    def test_empty_batch(self):
+        """ A batch without saves does not persist """
+        storage = Counting()
+        with storage.batch():
+            pass
+        self.assertEqual(storage.persisted, 0)
+
+    @patch.dict(os.environ, {"HBNB_AUTOFLUSH_COUNT": "3"})
+    def test_autoflush_count(self):
+        """ The count policy persists every 3 saves """
+        storage = Counting()
+        for i in range(7):
+            storage.save()
+        self.assertEqual(storage.persisted, 2)
+        storage.flush()
+        self.assertEqual(storage.persisted, 3)
+
+    @patch.dict(os.environ, {"HBNB_AUTOFLUSH_INTERVAL": "0.05"})
+    def test_autoflush_interval(self):
+        """ The interval policy persists once pending saves are old """
+        storage = Counting()
+        storage.save()
+        storage.save()
+        self.assertEqual(storage.persisted, 0)
+        time.sleep(0.06)
+        storage.save()
+        self.assertEqual(storage.persisted, 1)
+
+    @patch.dict(os.environ, {"HBNB_AUTOFLUSH_INTERVAL": "0.05"})
+    def test_autoflush_interval_idle(self):
+        """ A pending save is persisted once old, without another save """
+        storage = Counting()
+        storage.save()
+        self.assertEqual(storage.pending, 1)
+        deadline = time.monotonic() + 2
+        while storage.persisted == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(storage.persisted, 1)
+        self.assertEqual(storage.pending, 0)
+
+    @patch.dict(os.environ, {"HBNB_AUTOFLUSH_INTERVAL": "0.05"})
+    def test_autoflush_interval_batch(self):
+        """ The timer leaves the saves of an open batch pending """
+        storage = Counting()
+        storage.save()
+        with storage.batch():
+            time.sleep(0.1)
+            self.assertEqual(storage.persisted, 0)
+        self.assertEqual(storage.persisted, 1)
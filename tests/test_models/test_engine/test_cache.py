@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+""" Module for testing the read-through cache """
+import time
+import unittest
+from models.engine.cache import LRUCache
+
+
+class test_lruCache(unittest.TestCase):
+    """ Class to test the LRU cache """
+
+    def test_get_put(self):
+        """ Values are returned until invalidated """
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        cache.invalidate("a", "b")
+        self.assertIsNone(cache.get("a"))
+
+    def test_evicts_least_recently_used(self):
+        """ A full cache drops the entry unused for the longest """
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl(self):
+        """ Entries expire after ttl seconds """
+        cache = LRUCache(2, ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_stats(self):
+        """ stats() counts hits and misses """
+        cache = LRUCache(4)
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]),
+                         (1, 1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_invalid(self):
+        """ The size must be positive """
+        with self.assertRaises(ValueError):
+            LRUCache(0)
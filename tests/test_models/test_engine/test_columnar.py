@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+""" Module for testing the columnar cache of the file storage """
+import os
+import unittest
+import models
+from models.engine.columnar import ColumnarCache
+from models.place import Place
+from models.user import User
+
+
+@unittest.skipIf(models.storage_t == "db", "columnar cache is file only")
+class test_columnar(unittest.TestCase):
+    """ Class to test the columnar cache """
+
+    def setUp(self):
+        """ Fill an empty storage with places and cache them """
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.places = [
+            Place(name="A", price_by_night=50, max_guest=2,
+                  latitude=37.77, longitude=-122.41),
+            Place(name="B", price_by_night=120, max_guest=6,
+                  latitude=48.85, longitude=2.35),
+            Place(name="C", price_by_night=80, max_guest=4,
+                  latitude=-16.5, longitude=179.5),
+            Place(name="D", price_by_night=80, max_guest=4)]
+        for place in self.places:
+            self.storage.new(place)
+        self.storage.new(User())
+        self.cache = ColumnarCache(self.storage, Place)
+
+    def tearDown(self):
+        """ Stop the cache and remove the storage file """
+        from models.engine.file_storage import FileStorage
+        self.cache.close()
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def keys(self, *places):
+        """ Returns the keys of places """
+        return ["Place." + place.id for place in places]
+
+    def test_filter(self):
+        """ Conditions are combined """
+        a, b, c, d = self.places
+        self.assertEqual(len(self.cache), 4)
+        self.assertEqual(set(self.cache.query(price_by_night__lt=100)),
+                         set(self.keys(a, c, d)))
+        self.assertEqual(
+            set(self.cache.query(price_by_night__le=80, max_guest__ge=4)),
+            set(self.keys(c, d)))
+        self.assertEqual(self.cache.query(max_guest__eq=6), self.keys(b))
+        self.assertEqual(self.cache.query(price_by_night__gt=500), [])
+
+    def test_missing(self):
+        """ Missing values match no condition and sort last """
+        a, b, c, d = self.places
+        self.assertNotIn("Place." + d.id,
+                         self.cache.query(latitude__gt=-90))
+        self.assertEqual(self.cache.query(order_by="latitude"),
+                         self.keys(c, a, b, d))
+        self.assertEqual(
+            self.cache.query(order_by="latitude", descending=True),
+            self.keys(b, a, c, d))
+
+    def test_sort_limit(self):
+        """ Results are sorted and limited """
+        a, b, c, d = self.places
+        keys = self.cache.query(order_by="price_by_night", descending=True,
+                                limit=2)
+        self.assertEqual(keys[0], "Place." + b.id)
+        self.assertIn(keys[1], self.keys(c, d))
+        self.assertEqual(self.cache.query(order_by="price_by_night")[0],
+                         "Place." + a.id)
+
+    def test_bbox(self):
+        """ Boxes filter on latitude and longitude """
+        a, b, c, d = self.places
+        self.assertEqual(self.cache.query(bbox=(37, -123, 38, -122)),
+                         self.keys(a))
+        self.assertEqual(self.cache.query(bbox=(-20, 170, -10, -170)),
+                         self.keys(c))
+
+    def test_sync(self):
+        """ The cache follows new, updated and deleted places """
+        a, b, c, d = self.places
+        e = Place(price_by_night=10)
+        self.storage.new(e)
+        self.assertEqual(self.cache.query(price_by_night__lt=20),
+                         self.keys(e))
+        b.price_by_night = 15
+        self.storage.new(b)
+        self.assertEqual(set(self.cache.query(price_by_night__lt=20)),
+                         set(self.keys(b, e)))
+        self.storage.delete(e)
+        self.storage.delete(a)
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.query(price_by_night__lt=20),
+                         self.keys(b))
+
+    def test_reload(self):
+        """ The cache is rebuilt when the storage is reloaded """
+        from models.engine.file_storage import FileStorage
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(len(self.cache.query()), 4)
+
+    def test_fetch(self):
+        """ fetch() returns the objects in order """
+        a, b, c, d = self.places
+        objs = self.cache.fetch(order_by="price_by_night", limit=1)
+        self.assertEqual(list(objs), self.keys(a))
+        self.assertEqual(objs["Place." + a.id].name, "A")
+
+    def test_invalid(self):
+        """ Unknown columns and operators are rejected """
+        with self.assertRaises(ValueError):
+            self.cache.query(name__eq="A")
+        with self.assertRaises(ValueError):
+            self.cache.query(price_by_night__ne=1)
+        with self.assertRaises(ValueError):
+            self.cache.query(order_by="name")
+
+    def test_grow_after_query(self):
+        """ The columns still grow once a query has viewed them """
+        self.cache.query(price_by_night__lt=100, order_by="latitude")
+        e = Place(price_by_night=10)
+        self.storage.new(e)
+        self.assertEqual(self.cache.query(price_by_night__lt=20),
+                         self.keys(e))
+
+    def test_empty(self):
+        """ An empty cache matches nothing """
+        for place in self.places:
+            self.storage.delete(place)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.query(price_by_night__lt=100,
+                                          order_by="price_by_night"), [])
@@ -0,0 +1,372 @@
+#!/usr/bin/python3
+""" Module for testing the database storage on SQLite """
+import os
+import tempfile
+import time
+import unittest
+from sqlalchemy import event
+from models.engine.db_storage import DBStorage
+from models.city import City
+from models.place import Place
+from models.state import State
+
+
+class test_DBStorage(unittest.TestCase):
+    """ Class to test the database storage """
+
+    def setUp(self):
+        """ Open a storage on a scratch SQLite database """
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ["HBNB_DB_URL"] = "sqlite:///" + os.path.join(
+            self.tmp.name, "hbnb.db")
+        self.storage = self.open()
+
+    def tearDown(self):
+        """ Close the storage and remove the database """
+        self.storage.close()
+        self.storage._DBStorage__engine.dispose()
+        for name in ("HBNB_DB_URL", "HBNB_DB_POOL_SIZE",
+                     "HBNB_DB_PRE_PING_INTERVAL", "HBNB_DB_CACHE_SIZE"):
+            os.environ.pop(name, None)
+        self.tmp.cleanup()
+
+    def open(self):
+        """ A storage on the scratch database """
+        storage = DBStorage()
+        storage.reload()
+        return storage
+
+    def statements(self):
+        """ Records the first word of each statement executed """
+        seen = []
+        event.listen(self.storage._DBStorage__engine,
+                     "before_cursor_execute",
+                     lambda conn, cursor, statement, *args:
+                     seen.append(statement.split()[0]))
+        return seen
+
+    def test_all_instances(self):
+        """ all() returns instances, for one class or every class """
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        key = 'State.' + state.id
+        self.assertIs(self.storage.all(State)[key], state)
+        self.assertIs(self.storage.all("State")[key], state)
+        self.assertIs(self.storage.all()[key], state)
+        self.assertEqual(self.storage.all("Nothing"), {})
+
+    def test_find(self):
+        """ find() returns the matching instances """
+        ca, nv = State(name="California"), State(name="Nevada")
+        self.storage.bulk_save([ca, nv])
+        self.assertEqual(list(self.storage.find(State, name="Nevada")),
+                         ['State.' + nv.id])
+
+    def test_get_count(self):
+        """ get() looks an object up by id, count() counts rows """
+        ca, nv = State(name="California"), State(name="Nevada")
+        self.storage.bulk_save([ca, nv, City(name="Reno", state_id=nv.id)])
+        self.assertIs(self.storage.get(State, nv.id), nv)
+        self.assertIs(self.storage.get("State", nv.id), nv)
+        self.assertIsNone(self.storage.get(State, "nothing"))
+        self.assertIsNone(self.storage.get("Nothing", nv.id))
+        seen = self.statements()
+        self.assertEqual(self.storage.count(State), 2)
+        self.assertEqual(self.storage.count("City"), 1)
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(seen, ["SELECT"] * 8)
+
+    def test_iter_all(self):
+        """ iter_all() streams every object in batches """
+        self.storage.bulk_save(State(name=str(i)) for i in range(25))
+        self.assertEqual(
+            len(list(self.storage.iter_all(State, batch_size=10))), 25)
+
+    def test_bulk_new(self):
+        """ bulk_new() inserts rows of one class in one executemany """
+        seen = self.statements()
+        self.storage.bulk_save(State(name=str(i)) for i in range(50))
+        self.assertEqual(seen.count("INSERT"), 1)
+        self.assertEqual(len(self.storage.all(State)), 50)
+
+    def test_unchanged_save_skips_commit(self):
+        """ save() does not commit when nothing changed """
+        commits = []
+        event.listen(self.storage._DBStorage__engine, "commit",
+                     lambda conn: commits.append(True))
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        self.storage.save()
+        self.assertEqual(len(commits), 1)
+
+    def cities_with_places(self):
+        """ Saves 3 cities of 2 places each, then starts a new session """
+        objs = []
+        for i in range(3):
+            city = City(name=str(i), state_id="state")
+            objs.append(city)
+            objs.extend(Place(name=str(j), city_id=city.id, user_id="user")
+                        for j in range(2))
+        self.storage.bulk_save(objs)
+        self.storage.close()
+
+    def test_lazy_load(self):
+        """ Without load, each city queries its places """
+        self.cities_with_places()
+        seen = self.statements()
+        for city in self.storage.all(City).values():
+            self.assertEqual(len(city.places), 2)
+        self.assertEqual(seen.count("SELECT"), 4)
+
+    def test_eager_load(self):
+        """ With load, the places of every city take one query """
+        self.cities_with_places()
+        seen = self.statements()
+        for city in self.storage.all(City, load=["places"]).values():
+            self.assertEqual(len(city.places), 2)
+        self.assertEqual(seen.count("SELECT"), 2)
+
+    def test_joined_load(self):
+        """ A joined strategy loads the places in the same query """
+        self.cities_with_places()
+        seen = self.statements()
+        cities = self.storage.find(City, load=["places:joined"], name="1")
+        for city in cities.values():
+            self.assertEqual(len(city.places), 2)
+        self.assertEqual(seen.count("SELECT"), 1)
+
+    def test_load_invalid(self):
+        """ Unknown relationships and strategies are refused """
+        with self.assertRaises(ValueError):
+            self.storage.all(City, load=["nothing"])
+        with self.assertRaises(ValueError):
+            self.storage.all(City, load=["places:eager"])
+        with self.assertRaises(ValueError):
+            self.storage.all(load=["places"])
+
+    def test_state_cities_db_mode(self):
+        """ In database mode, State.cities is a relationship """
+        import subprocess
+        import sys
+        env = dict(os.environ, HBNB_TYPE_STORAGE="db")
+        subprocess.run([sys.executable, "-c", """if True:
+            from models import storage
+            from models.state import State
+            from models.city import City
+            state = State(name="California")
+            state.cities.append(City(name="San Francisco"))
+            storage.new(state)
+            storage.save()
+            storage.close()
+            states = storage.all(State, load=["cities.places"])
+            assert [c.name for c in states["State." + state.id].cities] == [
+                "San Francisco"]
+            """], check=True, env=env)
+
+    def test_batch_per_thread(self):
+        """ A batch open in one thread does not swallow the saves of
+        another thread, which commits its own session """
+        import threading
+        opened, saved = threading.Event(), threading.Event()
+
+        def batching():
+            with self.storage.batch():
+                self.storage.new(State(name="A"))
+                self.storage.save()
+                opened.set()
+                saved.wait()
+            self.storage.close()
+
+        def saving():
+            opened.wait()
+            self.storage.new(State(name="B"))
+            self.storage.save()
+            self.storage.close()
+            saved.set()
+        threads = [threading.Thread(target=batching),
+                   threading.Thread(target=saving)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        storage = self.open()
+        try:
+            self.assertEqual(sorted(s.name for s in storage.all(State)
+                                    .values()), ["A", "B"])
+        finally:
+            storage.close()
+
+    def test_flushed_per_thread(self):
+        """ A save with nothing to commit in one thread does not make the
+        save of another thread, whose insert was flushed, a no-op """
+        import threading
+        self.storage.new(State(name="California"))
+        self.assertEqual(len(self.storage.all(State)), 1)  # Autoflush
+
+        def saving():
+            self.storage.save()
+            self.storage.close()
+        thread = threading.Thread(target=saving)
+        thread.start()
+        thread.join()
+        self.storage.save()
+        storage = self.open()
+        try:
+            self.assertEqual(storage.count(State), 1)
+        finally:
+            storage.close()
+
+    def test_within_nearby(self):
+        """ within() and nearby() query places by position """
+        sf = Place(city_id="c", user_id="u", name="SF",
+                   latitude=37.7749, longitude=-122.4194)
+        oakland = Place(city_id="c", user_id="u", name="Oakland",
+                        latitude=37.8044, longitude=-122.2712)
+        fiji = Place(city_id="c", user_id="u", name="Fiji",
+                     latitude=-16.5, longitude=179.99)
+        self.storage.bulk_save([sf, oakland, fiji])
+        self.assertEqual(list(self.storage.nearby(Place, 37.77, -122.41, 20)),
+                         ['Place.' + sf.id, 'Place.' + oakland.id])
+        self.assertEqual(
+            list(self.storage.nearby("Place", 37.77, -122.41, 20, limit=1)),
+            ['Place.' + sf.id])
+        self.assertEqual(list(self.storage.within(
+            Place, (-20, 179, -10, -179))), ['Place.' + fiji.id])
+
+    def test_geohash_db_mode(self):
+        """ In database mode, places get an indexed geohash column, added
+        to tables created without it """
+        import subprocess
+        import sys
+        old = Place(city_id="c", user_id="u", name="Old",
+                    latitude=37.8044, longitude=-122.2712)
+        self.storage.new(old)
+        self.storage.save()
+        env = dict(os.environ, HBNB_TYPE_STORAGE="db")
+        subprocess.run([sys.executable, "-c", """if True:
+            from models import storage
+            from models.place import Place
+            place = Place(city_id="c", user_id="u", name="SF",
+                          latitude=37.7749, longitude=-122.4194)
+            assert place.geohash == "9q8yyk8ytpxr"
+            storage.new(place)
+            storage.save()
+            place.longitude = None
+            assert place.geohash is None
+            place.longitude = -122.4194
+            storage.save()
+            storage.close()
+            found = storage.nearby(Place, 37.77, -122.41, 20)
+            assert list(found) == ["Place." + place.id, "Place.%s"]
+            assert found["Place." + place.id].geohash == "9q8yyk8ytpxr"
+            """ % old.id], check=True, env=env)
+
+    def test_geohash_from_dict_db_mode(self):
+        """ Places rebuilt by from_dict() get their geohash too """
+        import subprocess
+        import sys
+        env = dict(os.environ, HBNB_TYPE_STORAGE="db")
+        subprocess.run([sys.executable, "-c", """if True:
+            from models import storage
+            from models.place import Place
+            record = Place(city_id="c", user_id="u", name="SF",
+                           latitude=37.7749, longitude=-122.4194).to_dict()
+            del record["geohash"]  # As in a record of the file storage
+            added = Place.from_dict(dict(record, id="added"))
+            assert added.geohash == "9q8yyk8ytpxr"
+            storage.new(added)
+            storage.bulk_new([Place.from_dict(dict(record, id="bulk"))])
+            storage.save()
+            storage.close()
+            found = storage.nearby(Place, 37.77, -122.41, 20)
+            assert sorted(found) == ["Place.added", "Place.bulk"], found
+            """], check=True, env=env)
+
+    def test_to_dict_after_flush_db_mode(self):
+        """ The dict form shows the foreign keys a flush fills in """
+        import subprocess
+        import sys
+        env = dict(os.environ, HBNB_TYPE_STORAGE="db")
+        subprocess.run([sys.executable, "-c", """if True:
+            from models import storage
+            from models.state import State
+            from models.city import City
+            state, city = State(name="California"), City(name="Fresno")
+            assert city.to_dict().get("state_id") is None
+            state.cities.append(city)
+            storage.new(state)
+            storage.save()
+            assert city.to_dict()["state_id"] == state.id
+            """], check=True, env=env)
+
+    def test_pool_stats(self):
+        """ pool_stats() reports the pool and its checkouts """
+        self.storage.new(State(name="California"))
+        self.storage.save()
+        stats = self.storage.pool_stats()
+        self.assertEqual(stats["pool"], "TimedQueuePool")
+        self.assertGreater(stats["checkouts"], 0)
+        self.assertEqual(stats["timeouts"], 0)
+        for name in ("size", "checked_in", "checked_out", "overflow",
+                     "wait_max", "wait_avg"):
+            self.assertIn(name, stats)
+
+    def test_pool_settings(self):
+        """ The pool size is read from the environment """
+        os.environ["HBNB_DB_POOL_SIZE"] = "3"
+        storage = self.open()
+        try:
+            self.assertEqual(storage.pool_stats()["size"], 3)
+        finally:
+            storage.close()
+            storage._DBStorage__engine.dispose()
+
+    def test_cache(self):
+        """ Cached reads skip the database until invalidated """
+        os.environ["HBNB_DB_CACHE_SIZE"] = "10"
+        self.storage.close()
+        self.storage = self.open()
+        state = State(name="California")
+        self.storage.new(state)
+        self.storage.save()
+        self.storage.close()
+        self.storage.all(State)
+        self.storage.get(State, state.id)
+        self.storage.close()
+        seen = self.statements()
+        cached = self.storage.get(State, state.id)
+        self.assertEqual(cached.name, "California")
+        self.assertEqual(list(self.storage.all(State)),
+                         ['State.' + state.id])
+        self.assertEqual(seen, [])
+        self.assertEqual(cached.changes(), {})
+        cached.name = "Nevada"
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.get(State, state.id).name, "Nevada")
+        self.storage.new(State(name="Oregon"))
+        self.assertEqual(len(self.storage.all(State)), 2)
+        stats = self.storage.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 4))
+
+    def test_cache_disabled(self):
+        """ The cache is off unless given a size """
+        self.assertIsNone(self.storage.cache_stats())
+
+    def test_pre_ping_interval(self):
+        """ A connection broken while idle is replaced on checkout """
+        os.environ["HBNB_DB_PRE_PING_INTERVAL"] = "0.01"
+        storage = self.open()
+        engine = storage._DBStorage__engine
+        try:
+            self.assertFalse(engine.pool._pre_ping)
+            with engine.connect() as conn:
+                raw = conn.connection.dbapi_connection
+            raw.close()
+            time.sleep(0.05)
+            with engine.connect() as conn:
+                self.assertEqual(
+                    conn.exec_driver_sql("SELECT 1").scalar(), 1)
+        finally:
+            engine.dispose()
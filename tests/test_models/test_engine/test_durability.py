@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+""" Module for testing atomic writes and the fsync policy """
+import os
+import tempfile
+import unittest
+from models.engine.durability import FsyncPolicy, atomic_write
+
+
+class test_fsyncPolicy(unittest.TestCase):
+    """ Class to test when writes are synced """
+
+    def test_always(self):
+        """ Every write is synced """
+        policy = FsyncPolicy("always")
+        self.assertTrue(policy.due())
+        self.assertTrue(policy.due())
+
+    def test_never(self):
+        """ No write is synced """
+        self.assertFalse(FsyncPolicy("never").due())
+
+    def test_batched(self):
+        """ At most one write per interval is synced """
+        policy = FsyncPolicy("batched", interval=0)
+        self.assertTrue(policy.due())
+        policy = FsyncPolicy("batched", interval=3600)
+        self.assertFalse(policy.due())
+
+    def test_unknown(self):
+        """ An unknown policy is rejected """
+        with self.assertRaises(ValueError):
+            FsyncPolicy("sometimes")
+
+
+class test_atomicWrite(unittest.TestCase):
+    """ Class to test atomic file replacement """
+
+    def setUp(self):
+        """ Create a file in a scratch directory """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "file.json")
+        with open(self.path, 'wb') as f:
+            f.write(b"old")
+
+    def tearDown(self):
+        """ Remove the scratch directory """
+        self.tmp.cleanup()
+
+    def test_replace(self):
+        """ The file is replaced and the result of write returned """
+        result = atomic_write(self.path, lambda f: f.write(b"new"))
+        self.assertEqual(result, 3)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b"new")
+        self.assertEqual(os.listdir(self.tmp.name), ["file.json"])
+
+    def test_mode(self):
+        """ The file keeps its permissions, or gets those of open() """
+        os.chmod(self.path, 0o640)
+        atomic_write(self.path, lambda f: f.write(b"new"))
+        self.assertEqual(os.stat(self.path).st_mode & 0o7777, 0o640)
+        created = os.path.join(self.tmp.name, "created")
+        open(created, 'wb').close()
+        path = os.path.join(self.tmp.name, "new.json")
+        atomic_write(path, lambda f: f.write(b"new"))
+        self.assertEqual(os.stat(path).st_mode & 0o7777,
+                         os.stat(created).st_mode & 0o7777)
+
+    def test_failed_write(self):
+        """ A failing write keeps the old file and no temporary file """
+        def write(f):
+            f.write(b"partial")
+            raise OSError("disk full")
+        with self.assertRaises(OSError):
+            atomic_write(self.path, write, sync_data=False, sync_dir=False)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertEqual(os.listdir(self.tmp.name), ["file.json"])
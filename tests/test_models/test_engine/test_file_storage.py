@@ -3,6 +3,7 @@
 import unittest
 from models.base_model import BaseModel
 from models import storage
+import json
 import os
 
 
@@ -24,6 +25,31 @@ class test_fileStorage(unittest.TestCase):
         except Exception as e:
             print(e)
 
+    def test_reload_in_new_process(self):
+        """ Objects saved by one process are read back by a new one,
+        which reloads them before constructing any model """
+        import subprocess
+        import sys
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, PYTHONPATH=os.getcwd())
+            for code in ("""if True:
+                    from models.state import State
+                    from models.city import City
+                    state = State(id="s", name="California")
+                    state.save()
+                    City(name="Fresno", state_id=state.id).save()
+                    """, """if True:
+                    from models import storage
+                    from models.state import State
+                    from models.city import City
+                    cities = storage.find(City, state_id="s")
+                    assert [c.name for c in cities.values()] == ["Fresno"]
+                    assert storage.get(State, "s").name == "California"
+                    """):
+                subprocess.run([sys.executable, "-c", code], check=True,
+                               cwd=tmp, env=env)
+
     def test_obj_list_empty(self):
         """ __objects is initially empty """
         self.assertEqual(len(storage.all()), 0)
@@ -76,6 +102,90 @@ class test_fileStorage(unittest.TestCase):
         with self.assertRaises(ValueError):
             storage.reload()
 
+    def test_reload_corrupt(self):
+        """ A truncated file is reported instead of loaded as empty """
+        new = BaseModel()
+        storage.new(new)
+        storage.save()
+        with open('file.json', 'rb') as f:
+            data = f.read()
+        with open('file.json', 'wb') as f:
+            f.write(data[:len(data) // 2])
+        storage._FileStorage__objects.clear()
+        with self.assertRaises(ValueError):
+            storage.reload()
+
+    def test_save_leaves_no_temporary_file(self):
+        """ save() replaces the file through a temporary one """
+        storage.new(BaseModel())
+        storage.save()
+        self.assertEqual([f for f in os.listdir('.')
+                          if f.startswith('file.json.')], [])
+
+    def test_all_is_a_copy(self):
+        """ all() can be iterated while objects are added """
+        storage.new(BaseModel())
+        for key in storage.all():
+            storage.new(BaseModel())
+        self.assertEqual(len(storage.all()), 2)
+
+    def test_concurrent_saves(self):
+        """ Threads adding, saving and listing objects lose nothing """
+        import threading
+        errors = []
+
+        def work():
+            try:
+                for i in range(20):
+                    storage.new(BaseModel())
+                    storage.save()
+                    for obj in storage.all().values():
+                        obj.to_dict()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=work) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        storage._FileStorage__objects.clear()
+        storage.reload()
+        self.assertEqual(len(storage.all()), 80)
+
+    def test_iter_all(self):
+        """ iter_all() yields the objects all() returns """
+        from models.user import User
+        user = User()
+        storage.new(user)
+        storage.new(BaseModel())
+        self.assertEqual(list(storage.iter_all(User)), [user])
+        self.assertEqual(len(list(storage.iter_all())), 2)
+
+    def test_unchanged_save_skips_write(self):
+        """ save() does not rewrite the file when nothing changed """
+        new = BaseModel()
+        storage.new(new)
+        storage.save()
+        before = os.stat('file.json').st_ino
+        storage.save()
+        self.assertEqual(os.stat('file.json').st_ino, before)
+        new.name = 'changed'
+        storage.save()
+        self.assertNotEqual(os.stat('file.json').st_ino, before)
+        with open('file.json') as f:
+            self.assertEqual(json.load(f)['BaseModel.' + new.id]['name'],
+                             'changed')
+
+    def test_reloaded_objects_clean(self):
+        """ Objects loaded from the file have no changes """
+        storage.new(BaseModel())
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage.reload()
+        for obj in storage.all().values():
+            self.assertEqual(obj.changes(), {})
+
     def test_reload_from_nonexistent(self):
         """ Nothing happens if file does not exist """
         self.assertEqual(storage.reload(), None)
@@ -102,8 +212,741 @@ class test_fileStorage(unittest.TestCase):
             temp = key
         self.assertEqual(temp, 'BaseModel' + '.' + _id)
 
+    def test_new_keeps_instance(self):
+        """ new() stores the instance itself """
+        new = BaseModel()
+        storage.new(new)
+        self.assertIs(storage.all()['BaseModel.' + new.id], new)
+
+    def test_reload_instances(self):
+        """ reload() rebuilds instances of the stored classes """
+        from models.user import User
+        user = User()
+        user.email = 'a@b.c'
+        storage.new(user)
+        storage.save()
+        storage._FileStorage__objects.clear()
+        storage.reload()
+        loaded = storage.all()['User.' + user.id]
+        self.assertIsInstance(loaded, User)
+        self.assertEqual(loaded.email, 'a@b.c')
+        self.assertEqual(loaded.created_at, user.created_at)
+
+    def test_all_cls(self):
+        """ all(cls) only returns objects of that class """
+        from models.user import User
+        base, user = BaseModel(), User()
+        storage.new(base)
+        storage.new(user)
+        self.assertEqual(list(storage.all(User)), ['User.' + user.id])
+        self.assertEqual(list(storage.all('BaseModel')),
+                         ['BaseModel.' + base.id])
+
+    def test_all_cls_after_delete(self):
+        """ Deleted objects leave the class index """
+        new = BaseModel()
+        storage.new(new)
+        storage.delete(new)
+        self.assertEqual(storage.all(BaseModel), {})
+
+    def test_all_cls_after_replace(self):
+        """ The class index follows a replaced __objects dictionary """
+        from models.engine.file_storage import FileStorage
+        storage.new(BaseModel())
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(storage.all(BaseModel), {})
+
+    def test_find_indexed(self):
+        """ find() matches on an indexed attribute """
+        from models.city import City
+        ca, ny = City(), City()
+        ca.state_id, ny.state_id = 'CA', 'NY'
+        storage.new(ca)
+        storage.new(ny)
+        self.assertEqual(list(storage.find(City, state_id='CA')),
+                         ['City.' + ca.id])
+        self.assertEqual(storage.find(City, state_id='TX'), {})
+
+    def test_find_reindexes_updates(self):
+        """ find() follows objects whose indexed attribute changed """
+        from models.city import City
+        city = City()
+        city.state_id = 'CA'
+        storage.new(city)
+        city.state_id = 'NY'
+        storage.new(city)
+        self.assertEqual(storage.find(City, state_id='CA'), {})
+        self.assertEqual(list(storage.find(City, state_id='NY')),
+                         ['City.' + city.id])
+
+    def test_find_reindexes_saves(self):
+        """ find() and listeners follow objects changed then saved """
+        from models.city import City
+        from models.engine.columnar import ColumnarCache
+        from models.place import Place
+        city, place = City(), Place(price_by_night=50)
+        city.state_id = 'CA'
+        storage.new(city)
+        storage.new(place)
+        cache = ColumnarCache(storage, Place)
+        try:
+            city.state_id = 'NY'
+            place.price_by_night = 150
+            storage.save()
+            self.assertEqual(storage.find(City, state_id='CA'), {})
+            self.assertEqual(list(storage.find(City, state_id='NY')),
+                             ['City.' + city.id])
+            self.assertEqual(cache.query(price_by_night__gt=100),
+                             ['Place.' + place.id])
+        finally:
+            cache.close()
+
+    def test_get(self):
+        """ get() returns the object with the given class and id """
+        from models.city import City
+        city = City()
+        storage.new(city)
+        self.assertIs(storage.get(City, city.id), city)
+        self.assertIs(storage.get('City', city.id), city)
+        self.assertIsNone(storage.get('State', city.id))
+        self.assertIsNone(storage.get(City, 'nothing'))
+
+    def test_count(self):
+        """ count() counts the objects of a class or of all classes """
+        from models.city import City
+        storage.new(City())
+        storage.new(City())
+        storage.new(BaseModel())
+        self.assertEqual(storage.count(City), 2)
+        self.assertEqual(storage.count('BaseModel'), 1)
+        self.assertEqual(storage.count('State'), 0)
+        self.assertEqual(storage.count(), 3)
+
+    def test_find_unindexed(self):
+        """ find() also filters on attributes without an index """
+        from models.city import City
+        sf, la = City(), City()
+        sf.state_id = la.state_id = 'CA'
+        sf.name, la.name = 'San Francisco', 'Los Angeles'
+        storage.new(sf)
+        storage.new(la)
+        self.assertEqual(list(storage.find('City', state_id='CA',
+                                           name='Los Angeles')),
+                         ['City.' + la.id])
+
+    def test_batch(self):
+        """ Saves inside a batch write the file once, on exit """
+        with storage.batch():
+            for i in range(3):
+                BaseModel().save()
+            self.assertFalse(os.path.exists('file.json'))
+        with open('file.json') as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+    def test_bulk_new(self):
+        """ bulk_new() adds every object without writing the file """
+        objs = [BaseModel() for i in range(5)]
+        storage.bulk_new(objs)
+        self.assertEqual(len(storage.all(BaseModel)), 5)
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_bulk_save(self):
+        """ bulk_save() stamps the objects and writes the file once """
+        from unittest.mock import patch
+        objs = [BaseModel() for i in range(5)]
+        with patch.object(storage, '_persist') as persist:
+            storage.bulk_save(objs)
+        persist.assert_called_once_with()
+        self.assertEqual(len({obj.updated_at for obj in objs}), 1)
+        storage.bulk_save([])
+        with open('file.json') as f:
+            self.assertEqual(len(json.load(f)), 5)
+
     def test_storage_var_created(self):
         """ FileStorage object storage created """
         from models.engine.file_storage import FileStorage
         print(type(storage))
         self.assertEqual(type(storage), FileStorage)
+
+
+class test_fileStorage_journal(unittest.TestCase):
+    """ Class to test the journaled mode of the file storage """
+
+    def setUp(self):
+        """ Enable journaled mode on a fresh storage """
+        from models.engine.file_storage import FileStorage
+        os.environ["HBNB_FILE_JOURNAL"] = "1"
+        os.environ["HBNB_FILE_JOURNAL_MAX"] = "1000"
+        self.storage = FileStorage()
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """ Disable journaled mode and remove storage files """
+        del os.environ["HBNB_FILE_JOURNAL"]
+        del os.environ["HBNB_FILE_JOURNAL_MAX"]
+        self.storage._FileStorage__journal.wait()
+        for path in ('file.json', 'file.json.log',
+                     'file.json.log.compacting'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_logs_changes(self):
+        """ Changes made without new() are logged by the next save """
+        new = BaseModel()
+        self.storage.new(new)
+        self.storage.save()
+        new.name = 'changed'
+        self.storage.save()
+        self.storage._FileStorage__objects.clear()
+        self.storage.reload()
+        self.assertEqual(self.storage.all()['BaseModel.' + new.id].name,
+                         'changed')
+
+    def test_save_appends(self):
+        """ save() appends to the log instead of writing the snapshot """
+        new = BaseModel()
+        self.storage.new(new)
+        self.storage.save()
+        self.assertFalse(os.path.exists('file.json'))
+        self.assertTrue(os.path.exists('file.json.log'))
+
+    def test_reload_replays(self):
+        """ Logged creations and deletions are replayed by reload() """
+        kept, gone = BaseModel(), BaseModel()
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        self.storage.delete(gone)
+        self.storage.save()
+        self.storage._FileStorage__objects.clear()
+        self.storage.reload()
+        self.assertIn('BaseModel.' + kept.id, self.storage.all())
+        self.assertNotIn('BaseModel.' + gone.id, self.storage.all())
+
+    def test_compaction(self):
+        """ An oversized log is folded into the snapshot """
+        objs = [BaseModel() for i in range(20)]
+        for obj in objs:
+            self.storage.new(obj)
+            self.storage.save()
+        self.storage._FileStorage__journal.wait()
+        self.assertTrue(os.path.exists('file.json'))
+        self.storage._FileStorage__objects.clear()
+        self.storage.reload()
+        for obj in objs:
+            self.assertIn('BaseModel.' + obj.id, self.storage.all())
+
+
+class test_fileStorage_lazy(unittest.TestCase):
+    """ Class to test the lazy mode of the file storage """
+
+    def setUp(self):
+        """ Enable lazy mode on a fresh storage """
+        from models.engine.file_storage import FileStorage
+        os.environ["HBNB_FILE_LAZY"] = "1"
+        self.storage = FileStorage()
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """ Disable lazy mode and remove storage files """
+        from models.engine.file_storage import FileStorage
+        del os.environ["HBNB_FILE_LAZY"]
+        self.storage._FileStorage__close_offsets()
+        FileStorage._FileStorage__objects = {}
+        for path in ('file.json', 'file.json.idx'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def reopen(self):
+        """ Simulate a restart: fresh objects, lazy reload """
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+
+    def test_same_layout(self):
+        """ Lazy mode writes the same file as the default mode """
+        from models.user import User
+        user = User()
+        user.email = 'a@b.c'
+        self.storage.new(user)
+        self.storage.new(BaseModel())
+        self.storage.save()
+        with open('file.json') as f:
+            written = f.read()
+        self.assertEqual(written, json.dumps(
+            {k: v.to_dict() for k, v in self.storage.all().items()},
+            indent=2))
+
+    def test_reload_is_lazy(self):
+        """ reload() parses nothing until a class is requested """
+        from models.user import User
+        from models.state import State
+        user, state = User(), State()
+        self.storage.new(user)
+        self.storage.new(state)
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(self.storage._FileStorage__objects, {})
+        self.assertEqual(list(self.storage.all(User)), ['User.' + user.id])
+        self.assertNotIn('State.' + state.id,
+                         self.storage._FileStorage__objects)
+        self.assertIn('State.' + state.id, self.storage.all())
+
+    def test_save_keeps_pending(self):
+        """ Records never parsed are kept by save() """
+        from models.user import User
+        from models.state import State
+        user, state = User(), State()
+        self.storage.new(user)
+        self.storage.new(state)
+        self.storage.save()
+        self.reopen()
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(len(self.storage.all()), 3)
+
+    def test_delete_pending(self):
+        """ A record deleted before being parsed stays deleted """
+        from models.user import User
+        user = User()
+        self.storage.new(user)
+        self.storage.save()
+        self.reopen()
+        self.storage.delete(user)
+        self.assertEqual(self.storage.all(User), {})
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(self.storage.all(), {})
+
+    def test_get_count_pending(self):
+        """ get() parses one record, count() parses none """
+        from models.user import User
+        users = [User(), User()]
+        for user in users:
+            self.storage.new(user)
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.reopen()
+        self.assertEqual(self.storage.count(User), 2)
+        self.assertEqual(self.storage.count(), 3)
+        self.assertEqual(self.storage._FileStorage__objects, {})
+        user = self.storage.get(User, users[1].id)
+        self.assertEqual(user.id, users[1].id)
+        self.assertEqual(list(self.storage._FileStorage__objects),
+                         ['User.' + user.id])
+        self.storage.delete(user)
+        self.assertIsNone(self.storage.get(User, user.id))
+        self.assertEqual(self.storage.count(User), 1)
+
+    def test_count_after_close(self):
+        """ Objects kept in memory across a reload are counted once """
+        from models.state import State
+        for name in ("California", "Nevada"):
+            self.storage.new(State(name=name))
+        self.storage.save()
+        self.storage.close()
+        self.assertEqual(self.storage.count(State), 2)
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(len(self.storage.all(State)), 2)
+        self.assertEqual(self.storage.count(State), 2)
+
+    def test_stale_index(self):
+        """ A file written without its index is loaded eagerly """
+        from models.user import User
+        user = User()
+        self.storage.new(user)
+        self.storage.save()
+        with open('file.json', 'w') as f:
+            json.dump({}, f)
+        self.reopen()
+        self.assertEqual(self.storage.all(), {})
+
+
+class test_fileStorage_format(unittest.TestCase):
+    """ Class to test the file formats of the file storage """
+
+    def setUp(self):
+        """ Start from an empty storage """
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """ Restore the default format and remove the storage file """
+        from models.engine.file_storage import FileStorage
+        os.environ.pop("HBNB_FILE_FORMAT", None)
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def storage(self, name):
+        """ A storage writing in format `name` """
+        from models.engine.file_storage import FileStorage
+        os.environ["HBNB_FILE_FORMAT"] = name
+        return FileStorage()
+
+    def test_binary_roundtrip(self):
+        """ Objects saved in binary format are reloaded """
+        from models.engine.file_storage import FileStorage
+        from models.place import Place
+        storage = self.storage("binary")
+        place = Place()
+        place.number_rooms = 3
+        storage.new(place)
+        storage.save()
+        with open('file.json', 'rb') as f:
+            self.assertEqual(f.read(8), b"HBNBBIN1")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        loaded = storage.all(Place)['Place.' + place.id]
+        self.assertEqual(loaded.number_rooms, 3)
+        self.assertEqual(loaded.updated_at, place.updated_at)
+
+    def test_migration(self):
+        """ A JSON store is rewritten in the new format on save """
+        from models.engine.file_storage import FileStorage
+        new = BaseModel()
+        storage = self.storage("json")
+        storage.new(new)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = self.storage("compact")
+        storage.reload()
+        storage.save()
+        with open('file.json') as f:
+            self.assertEqual(json.load(f),
+                             {'BaseModel.' + new.id: new.to_dict()})
+        self.assertEqual(os.path.getsize('file.json'),
+                         len(json.dumps({'BaseModel.' + new.id:
+                                         new.to_dict()},
+                                        separators=(",", ":"))))
+
+    def test_unknown_format(self):
+        """ An unknown format is refused """
+        with self.assertRaises(ValueError):
+            self.storage("yaml")
+
+
+class test_fileStorage_shared(unittest.TestCase):
+    """ Class to test the file storage shared between processes """
+
+    def setUp(self):
+        """ Enable shared mode on an empty storage """
+        from models.engine.file_storage import FileStorage
+        os.environ["HBNB_FILE_SHARED"] = "1"
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """ Disable shared mode and remove storage files """
+        from models.engine.file_storage import FileStorage
+        del os.environ["HBNB_FILE_SHARED"]
+        FileStorage._FileStorage__objects = {}
+        for path in ('file.json', 'file.json.lock'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def other_process(self, code):
+        """ Runs `code` in another process sharing the file """
+        import subprocess
+        import sys
+        subprocess.run([sys.executable, "-c",
+                        "from models import storage\n"
+                        "from models.engine.file_storage import FileStorage\n"
+                        "from models.base_model import BaseModel\n"
+                        "storage = FileStorage()\n" + code],
+                       check=True, env=dict(os.environ))
+
+    def test_merge_on_write(self):
+        """ A save keeps the objects saved by another process """
+        first, second = BaseModel(), BaseModel()
+        self.storage.new(first)
+        self.storage.save()
+        self.other_process("storage.new(BaseModel(id='other'))\n"
+                           "storage.save()")
+        self.storage.new(second)
+        self.storage.save()
+        with open('file.json') as f:
+            self.assertEqual(set(json.load(f)),
+                             {'BaseModel.' + first.id,
+                              'BaseModel.' + second.id, 'BaseModel.other'})
+
+    def test_refresh(self):
+        """ Objects saved by another process are seen by all() """
+        self.storage.new(BaseModel(id='mine'))
+        self.storage.save()
+        mine = self.storage.all()['BaseModel.mine']
+        self.other_process("storage.new(BaseModel(id='other'))\n"
+                           "storage.save()")
+        objects = self.storage.all()
+        self.assertIn('BaseModel.other', objects)
+        self.assertIs(objects['BaseModel.mine'], mine)
+
+    def test_deleted_by_other(self):
+        """ Objects deleted by another process disappear """
+        self.storage.new(BaseModel(id='gone'))
+        self.storage.save()
+        self.other_process(
+            "storage.delete(storage.all()['BaseModel.gone'])\n"
+            "storage.save()")
+        self.assertNotIn('BaseModel.gone', self.storage.all())
+
+    def test_unsaved_changes_kept(self):
+        """ Objects added but not saved yet survive a refresh """
+        self.storage.new(BaseModel(id='saved'))
+        self.storage.save()
+        self.storage.new(BaseModel(id='unsaved'))
+        self.other_process("storage.new(BaseModel(id='other'))\n"
+                           "storage.save()")
+        self.assertIn('BaseModel.unsaved', self.storage.all())
+
+    def test_unsaved_delete_kept(self):
+        """ Objects deleted but not saved yet stay deleted across
+        refreshes, and are not written back """
+        self.storage.new(BaseModel(id='gone'))
+        self.storage.save()
+        self.storage.delete(self.storage.all()['BaseModel.gone'])
+        for other in ('one', 'two'):
+            self.other_process("storage.new(BaseModel(id='{}'))\n"
+                               "storage.save()".format(other))
+            self.assertNotIn('BaseModel.gone', self.storage.all())
+        self.storage.save()
+        with open('file.json') as f:
+            self.assertEqual(set(json.load(f)),
+                             {'BaseModel.one', 'BaseModel.two'})
+
+    def test_journal_rejected(self):
+        """ Shared mode cannot be combined with journaled mode """
+        from models.engine.file_storage import FileStorage
+        os.environ["HBNB_FILE_JOURNAL"] = "1"
+        try:
+            with self.assertRaises(ValueError):
+                FileStorage()
+        finally:
+            del os.environ["HBNB_FILE_JOURNAL"]
+
+
+class test_fileStorage_sharded(unittest.TestCase):
+    """ Class to test the sharded layout of the file storage """
+
+    def setUp(self):
+        """ Start from an empty storage """
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """ Disable sharding and remove storage files """
+        import shutil
+        from models.engine.file_storage import FileStorage
+        os.environ.pop("HBNB_FILE_SHARDS", None)
+        FileStorage._FileStorage__objects = {}
+        shutil.rmtree('file.json.d', ignore_errors=True)
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def storage(self, shards):
+        """ A storage sharded by `shards` """
+        from models.engine.file_storage import FileStorage
+        os.environ["HBNB_FILE_SHARDS"] = shards
+        return FileStorage()
+
+    def test_one_file_per_class(self):
+        """ Each class is saved to its own shard """
+        from models.user import User
+        from models.state import State
+        storage = self.storage("class")
+        storage.new(User())
+        storage.new(State())
+        storage.save()
+        self.assertEqual(sorted(os.listdir('file.json.d')), ['State', 'User'])
+        self.assertFalse(os.path.exists('file.json'))
+
+    def test_only_dirty_shards_rewritten(self):
+        """ Saving a User leaves the State shard untouched """
+        from models.user import User
+        from models.state import State
+        storage = self.storage("class")
+        storage.new(User())
+        storage.new(State())
+        storage.save()
+        before = os.stat('file.json.d/State').st_ino
+        storage.new(User())
+        storage.save()
+        self.assertEqual(os.stat('file.json.d/State').st_ino, before)
+
+    def test_changed_object_shard_rewritten(self):
+        """ The shard of an object changed without new() is rewritten """
+        from models.user import User
+        storage = self.storage("class")
+        user = User()
+        storage.new(user)
+        storage.save()
+        before = os.stat('file.json.d/User').st_ino
+        user.first_name = 'Betty'
+        storage.save()
+        self.assertNotEqual(os.stat('file.json.d/User').st_ino, before)
+
+    def test_hash_buckets_reload(self):
+        """ Objects spread over hash buckets are all reloaded """
+        from models.engine.file_storage import FileStorage
+        storage = self.storage("4")
+        objs = [BaseModel() for i in range(20)]
+        storage.bulk_new(objs)
+        storage.save()
+        self.assertLessEqual(len(os.listdir('file.json.d')), 4)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(set(storage.all()),
+                         {'BaseModel.' + obj.id for obj in objs})
+
+    def test_empty_shard_removed(self):
+        """ A shard whose last object is deleted is removed """
+        from models.user import User
+        storage = self.storage("class")
+        user = User()
+        storage.new(user)
+        storage.save()
+        storage.delete(user)
+        storage.save()
+        self.assertEqual(os.listdir('file.json.d'), [])
+
+    def test_migration(self):
+        """ A single file is split into shards on the next save """
+        from models.engine.file_storage import FileStorage
+        from models.user import User
+        user = User()
+        FileStorage().new(user)
+        FileStorage().save()
+        FileStorage._FileStorage__objects = {}
+        storage = self.storage("class")
+        storage.reload()
+        storage.save()
+        self.assertEqual(sorted(os.listdir('file.json.d')),
+                         ['.layout', 'User'])
+
+    def test_layout_change(self):
+        """ Shards of another layout are rewritten, then removed """
+        from models.engine.file_storage import FileStorage
+        from models.state import State
+        from models.user import User
+        state = State(name="California")
+        storage = self.storage("class")
+        storage.new(state)
+        storage.new(User())
+        storage.save()
+        for name in ("Nevada", "Oregon"):
+            FileStorage._FileStorage__objects = {}
+            storage = self.storage("4")
+            storage.reload()
+            self.assertEqual(storage.count(), 2)
+            updated = storage.get(State, state.id)
+            updated.name = name
+            storage.new(updated)
+            storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage = self.storage("4")
+        storage.reload()
+        self.assertEqual(storage.get(State, state.id).name, "Oregon")
+        names = os.listdir('file.json.d')
+        self.assertNotIn('State', names)
+        self.assertNotIn('User', names)
+        with open('file.json.d/.layout') as f:
+            self.assertEqual(f.read(), "4")
+
+    def test_invalid(self):
+        """ Unknown sharding and incompatible modes are refused """
+        with self.assertRaises(ValueError):
+            self.storage("0")
+        os.environ["HBNB_FILE_LAZY"] = "1"
+        try:
+            with self.assertRaises(ValueError):
+                self.storage("class")
+        finally:
+            del os.environ["HBNB_FILE_LAZY"]
+
+
+class test_fileStorage_records(unittest.TestCase):
+    """ Class to test the record mode of the file storage """
+
+    def setUp(self):
+        """ Enable record mode on an empty storage """
+        from models.engine.file_storage import FileStorage
+        os.environ["HBNB_FILE_RECORDS"] = "1"
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """ Disable record mode and remove the storage file """
+        from models.engine.file_storage import FileStorage
+        del os.environ["HBNB_FILE_RECORDS"]
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def reopen(self):
+        """ Simulate a restart: fresh objects, reload """
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+
+    def test_stored_as_records(self):
+        """ Objects are stored as records and handed out as instances """
+        from models.engine.records import Record
+        from models.place import Place
+        place = Place(name="House")
+        self.storage.new(place)
+        stored = self.storage._FileStorage__objects['Place.' + place.id]
+        self.assertIsInstance(stored, Record)
+        self.assertIs(self.storage.get(Place, place.id), place)
+        self.assertIs(self.storage.all(Place)['Place.' + place.id], place)
+
+    def test_reload(self):
+        """ Records are saved and reloaded like instances """
+        from models.place import Place
+        place = Place(name="House", city_id="SF")
+        place.custom = "kept"
+        self.storage.new(place)
+        self.storage.save()
+        expected = place.to_dict()
+        del place
+        self.reopen()
+        place = self.storage.find(Place, city_id="SF")
+        self.assertEqual([p.to_dict() for p in place.values()], [expected])
+        place = list(place.values())[0]
+        self.assertIsInstance(place, Place)
+        self.assertIs(self.storage.get(Place, place.id), place)
+        self.assertEqual(place.changes(), {})
+
+    def test_changes_saved(self):
+        """ Changes to a held instance are stored by save() """
+        from models.user import User
+        user = User(email="a@b.c")
+        self.storage.new(user)
+        self.storage.save()
+        user.email = "d@e.f"
+        self.storage.save()
+        del user
+        self.reopen()
+        self.assertEqual(
+            [u.email for u in self.storage.all(User).values()], ["d@e.f"])
+
+    def test_delete(self):
+        """ Deleted objects are gone from records and instances """
+        from models.user import User
+        user = User()
+        self.storage.new(user)
+        self.storage.delete(user)
+        self.assertIsNone(self.storage.get(User, user.id))
+        self.assertEqual(self.storage.count(User), 0)
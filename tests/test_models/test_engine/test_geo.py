@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+""" Module for testing the geospatial index and queries """
+import os
+import unittest
+import models
+from models.engine.geo import (GeoIndex, bbox_around, distance_km,
+                               geohash, geohash_cells, split_bbox)
+from models.place import Place
+
+
+class test_geo(unittest.TestCase):
+    """ Class to test the geospatial helpers """
+
+    def test_geohash(self):
+        """ Geohashes match the reference encoding """
+        self.assertEqual(geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(geohash(37.7749, -122.4194, 6), "9q8yyk")
+        self.assertEqual(len(geohash(0, 0)), 12)
+        self.assertIsNone(geohash(None, 0))
+
+    def test_distance(self):
+        """ Distances are great-circle distances """
+        self.assertAlmostEqual(
+            distance_km(37.7749, -122.4194, 34.0522, -118.2437), 559, 0)
+        self.assertAlmostEqual(distance_km(0, 179.9, 0, -179.9), 22.2, 1)
+
+    def test_bbox_around(self):
+        """ The box around a circle holds it """
+        south, west, north, east = bbox_around(37.77, -122.41, 5)
+        self.assertLess(south, 37.77)
+        self.assertGreater(north, 37.77)
+        self.assertAlmostEqual(distance_km(37.77, west, 37.77, -122.41),
+                               5, 1)
+        self.assertGreater(*bbox_around(0, 179.99, 5)[1::2])
+        self.assertEqual(bbox_around(89.99, 0, 5)[1::2], (-180, 180))
+        self.assertEqual(len(split_bbox((0, 170, 1, -170))), 2)
+
+    def test_geohash_cells(self):
+        """ The cells covering a box are few and hold its points """
+        bbox = (37.7, -122.5, 37.8, -122.4)
+        cells = geohash_cells(bbox)
+        self.assertLessEqual(len(cells), 16)
+        self.assertTrue(any(geohash(37.75, -122.45).startswith(cell)
+                            for cell in cells))
+        self.assertIsNone(geohash_cells((-90, -180, 90, 180)))
+
+
+@unittest.skipIf(models.storage_t == "db", "grid index is file only")
+class test_geo_index(unittest.TestCase):
+    """ Class to test the grid index of the file storage """
+
+    def setUp(self):
+        """ Fill an empty storage with places """
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.sf = Place(name="SF", latitude=37.7749, longitude=-122.4194)
+        self.oakland = Place(name="Oakland", latitude=37.8044,
+                             longitude=-122.2712)
+        self.fiji = Place(name="Fiji", latitude=-16.5, longitude=179.99)
+        self.nowhere = Place(name="Nowhere")
+        for place in (self.sf, self.oakland, self.fiji, self.nowhere):
+            self.storage.new(place)
+
+    def tearDown(self):
+        """ Remove the storage file """
+        from models.engine.file_storage import FileStorage
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove('file.json')
+        except FileNotFoundError:
+            pass
+
+    def test_index(self):
+        """ The index follows the places with a position """
+        index = GeoIndex(self.storage, Place)
+        try:
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.within((37.7, -122.5, 37.8, -122.4)),
+                             ["Place." + self.sf.id])
+            self.assertEqual(index.within((-20, 179, -10, -179)),
+                             ["Place." + self.fiji.id])
+            found = index.nearby(37.7749, -122.4194, 20)
+            self.assertEqual([key for key, _ in found],
+                             ["Place." + self.sf.id,
+                              "Place." + self.oakland.id])
+            self.assertAlmostEqual(found[1][1], 13.4, 0)
+            self.storage.delete(self.sf)
+            self.assertEqual(len(index), 2)
+            self.nowhere.latitude, self.nowhere.longitude = 37.77, -122.41
+            self.storage.new(self.nowhere)
+            self.assertEqual([key for key, _ in index.nearby(
+                37.7749, -122.4194, 1)], ["Place." + self.nowhere.id])
+        finally:
+            index.close()
+
+    def test_storage(self):
+        """ within() and nearby() return the places in order """
+        found = self.storage.nearby(Place, 37.7749, -122.4194, 20, limit=1)
+        self.assertEqual(list(found), ["Place." + self.sf.id])
+        self.assertIs(found["Place." + self.sf.id], self.sf)
+        self.assertEqual(list(self.storage.within(
+            "Place", (-20, 179, -10, -179))), ["Place." + self.fiji.id])
+        self.assertEqual(self.storage.nearby("Nothing", 0, 0, 1), {})
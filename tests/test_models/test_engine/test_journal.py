@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+""" Module for testing the FileStorage journal """
+import os
+import tempfile
+import unittest
+from models.engine.durability import FsyncPolicy
+from models.engine.journal import Journal
+
+
+class test_journal(unittest.TestCase):
+    """ Class to test the append-only journal """
+
+    def setUp(self):
+        """ Create a journal in a scratch directory """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "file.json.log")
+        self.journal = Journal(self.path, max_size=200)
+
+    def tearDown(self):
+        """ Remove the scratch directory """
+        self.journal.wait()
+        self.tmp.cleanup()
+
+    def test_commit_appends(self):
+        """ Committed records are appended to the log """
+        self.journal.record_new("User.1", {"id": "1"})
+        self.journal.commit()
+        self.journal.record_delete("User.1")
+        self.journal.commit()
+        self.assertEqual(list(self.journal.replay()),
+                         [("new", "User.1", {"id": "1"}),
+                          ("delete", "User.1", None)])
+
+    def test_commit_synced(self):
+        """ A journal syncing every commit records the same entries """
+        journal = Journal(self.path, fsync=FsyncPolicy("always"))
+        journal.record_new("User.1", {"id": "1"})
+        journal.commit()
+        self.assertEqual(list(journal.replay()),
+                         [("new", "User.1", {"id": "1"})])
+
+    def test_commit_without_records(self):
+        """ Committing nothing does not create the log """
+        self.assertFalse(self.journal.commit())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_replay_skips_torn_line(self):
+        """ A truncated trailing record is ignored """
+        self.journal.record_new("User.1", {"id": "1"})
+        self.journal.commit()
+        with open(self.path, 'a') as f:
+            f.write('{"op": "new", "key": "Us')
+        self.assertEqual(len(list(self.journal.replay())), 1)
+
+    def test_commit_after_torn_line(self):
+        """ Records committed after a torn record are replayed """
+        self.journal.record_new("A.1", {"id": "1"})
+        self.journal.commit()
+        with open(self.path, 'a') as f:
+            f.write('{"op": "new", "key": "A.2", "obj": {"i')
+        journal = Journal(self.path)
+        journal.record_new("A.3", {"id": "3"})
+        journal.record_new("A.4", {"id": "4"})
+        journal.commit()
+        self.assertEqual([key for _, key, _ in journal.replay()],
+                         ["A.1", "A.3", "A.4"])
+
+    def test_replay_skips_bad_line(self):
+        """ A record that cannot be decoded does not hide the next ones """
+        with open(self.path, 'w') as f:
+            f.write('{"op": "new", "key": "A.1", "obj": {}}\n{"op"\n'
+                    '{"op": "delete", "key": "A.1"}\n')
+        self.assertEqual([op for op, _, _ in self.journal.replay()],
+                         ["new", "delete"])
+
+    def test_commit_reports_threshold(self):
+        """ commit() asks for a compaction once the log is too big """
+        for i in range(10):
+            self.journal.record_new("User.{}".format(i), {"id": str(i)})
+        self.assertTrue(self.journal.commit())
+
+    def test_compact(self):
+        """ Compaction writes the snapshot and drops the rotated log """
+        written = []
+        self.journal.record_new("User.1", {"id": "1"})
+        self.journal.commit()
+        self.journal.compact(lambda: written.append(True))
+        self.journal.wait()
+        self.assertEqual(written, [True])
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.journal.compacting_path))
+        self.assertEqual(list(self.journal.replay()), [])
+
+    def test_rotate_keeps_leftover(self):
+        """ Records of an interrupted compaction survive the next rotation """
+        with open(self.journal.compacting_path, 'w') as f:
+            f.write('{"op": "new", "key": "User.1", "obj": {"id": "1"}}\n')
+        self.journal.record_new("User.2", {"id": "2"})
+        self.journal.commit()
+        seen = []
+        self.journal.compact(lambda: seen.extend(
+            k for _, k, _ in self.journal.replay()))
+        self.journal.wait()
+        self.assertEqual(seen, ["User.1", "User.2"])
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+""" Module for testing the readers-writer lock """
+import threading
+import unittest
+from models.engine.locks import RWLock
+
+
+class test_rwLock(unittest.TestCase):
+    """ Class to test the readers-writer lock """
+
+    def setUp(self):
+        """ Create an unlocked lock """
+        self.lock = RWLock()
+
+    def run_thread(self, target):
+        """ Runs `target` in a thread, returning whether it finished """
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(0.2)
+        return not thread.is_alive()
+
+    def test_concurrent_readers(self):
+        """ Readers do not exclude each other """
+        with self.lock.read():
+            self.assertTrue(self.run_thread(self.lock.acquire_read))
+
+    def test_writer_excludes_readers(self):
+        """ A reader waits for the writer to release the lock """
+        self.lock.acquire_write()
+        self.assertFalse(self.run_thread(self.lock.acquire_read))
+        self.lock.release_write()
+
+    def test_reader_excludes_writer(self):
+        """ A writer waits for the readers to release the lock """
+        self.lock.acquire_read()
+        done = []
+
+        def write():
+            with self.lock.write():
+                done.append(True)
+        thread = threading.Thread(target=write, daemon=True)
+        thread.start()
+        thread.join(0.2)
+        self.assertEqual(done, [])
+        self.lock.release_read()
+        thread.join(1)
+        self.assertEqual(done, [True])
+
+    def test_reentrant(self):
+        """ The writing thread may acquire the lock again """
+        with self.lock.write():
+            with self.lock.write():
+                with self.lock.read():
+                    pass
+        self.assertTrue(self.run_thread(self.lock.acquire_write))
+
+    def test_no_upgrade(self):
+        """ A reading thread cannot upgrade to writing """
+        with self.lock.read():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
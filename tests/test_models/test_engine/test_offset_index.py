@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+""" Module for testing the lazy mode offset index """
+import os
+import tempfile
+import unittest
+from models.engine.offset_index import OffsetIndex
+
+
+class test_offsetIndex(unittest.TestCase):
+    """ Class to test the sorted offset index """
+
+    def setUp(self):
+        """ Write a small data file and its index """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data = os.path.join(self.tmp.name, "file.json")
+        self.path = self.data + ".idx"
+        records = [("User.2", b"two"), ("City.1", b"one"),
+                   ("User.1", b"uno"), ("Amenity.9", b"nine")]
+        entries, blob = [], b""
+        for key, record in records:
+            entries.append((key, len(blob), len(record)))
+            blob += record + b"|"
+        with open(self.data, 'wb') as f:
+            f.write(blob)
+        self.assertTrue(OffsetIndex.write(self.path, entries, self.data))
+        self.index = OffsetIndex.open(self.path, self.data)
+
+    def tearDown(self):
+        """ Release the index and remove the scratch directory """
+        if self.index is not None:
+            self.index.close()
+        self.tmp.cleanup()
+
+    def test_len(self):
+        """ Every record is indexed """
+        self.assertEqual(len(self.index), 4)
+
+    def test_get(self):
+        """ Records are found by key """
+        self.assertEqual(self.index.get("User.1"), b"uno")
+        self.assertEqual(self.index.get("Amenity.9"), b"nine")
+        self.assertIsNone(self.index.get("User.3"))
+        self.assertIsNone(self.index.get("User."))
+
+    def test_items_prefix(self):
+        """ A class prefix yields that class only, in key order """
+        self.assertEqual(list(self.index.items("User.")),
+                         [("User.1", b"uno"), ("User.2", b"two")])
+        self.assertEqual(list(self.index.items("State.")), [])
+        self.assertEqual(len(list(self.index.items())), 4)
+
+    def test_stale(self):
+        """ An index is ignored once its data file has changed """
+        with open(self.data, 'ab') as f:
+            f.write(b"more")
+        self.assertIsNone(OffsetIndex.open(self.path, self.data))
+
+    def test_missing(self):
+        """ A missing index or data file opens as None """
+        os.remove(self.path)
+        self.assertIsNone(OffsetIndex.open(self.path, self.data))
+
+    def test_key_too_long(self):
+        """ Keys that do not fit are refused and the old index removed """
+        key = "User." + "x" * OffsetIndex.KEY_SIZE
+        self.assertFalse(OffsetIndex.write(self.path, [(key, 0, 1)],
+                                           self.data))
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+""" Module for testing the compact records of the file storage """
+import unittest
+from models.base_model import BaseModel
+from models.engine.records import Record, record_class
+from models.place import Place
+from models.user import User
+
+
+class test_records(unittest.TestCase):
+    """ Class to test the record classes """
+
+    def test_fields(self):
+        """ Record classes have a slot per column """
+        cls = record_class(User)
+        self.assertTrue(issubclass(cls, Record))
+        self.assertIs(cls.model, User)
+        self.assertIs(record_class(User), cls)
+        for name in ("id", "created_at", "updated_at", "email"):
+            self.assertIn(name, cls.fields)
+        self.assertIn("amenity_ids", record_class(Place).fields)
+        self.assertEqual(set(record_class(BaseModel).fields),
+                         {"id", "created_at", "updated_at"})
+
+    def test_round_trip(self):
+        """ A record holds what to_dict() and from_dict() exchange """
+        place = Place(name="House", number_rooms=3)
+        place.custom = "extra"
+        record = record_class(Place).from_dict(place.to_dict())
+        self.assertEqual(record.to_dict(), place.to_dict())
+        self.assertEqual(record.custom, "extra")
+        self.assertEqual(record.created_at, place.created_at)
+        self.assertIsNone(getattr(record, "description", None))
+        instance = record.instance()
+        self.assertIsInstance(instance, Place)
+        self.assertEqual(instance.to_dict(), place.to_dict())
+
+    def test_from_instance(self):
+        """ A record can be built from the attributes of an instance """
+        user = User(email="a@b.c")
+        record = record_class(User).from_dict(user.__dict__)
+        self.assertEqual(record.to_dict(), user.to_dict())
+
+    def test_smaller(self):
+        """ Records have no instance dictionary """
+        record = record_class(User).from_dict(User().to_dict())
+        self.assertFalse(hasattr(record, "__dict__"))
+        with self.assertRaises(AttributeError):
+            record.missing
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+""" Module for testing the FileStorage file formats """
+import io
+import json
+import math
+import os
+import tempfile
+import unittest
+from models.engine import serializers
+
+
+class test_serializers(unittest.TestCase):
+    """ Class to test the file formats """
+
+    record = {"id": "1", "created_at": "2024-12-09T10:25:03.707029",
+              "updated_at": "2024-12-09T10:25:03", "__class__": "Place",
+              "name": "My house", "number_rooms": 4, "latitude": 37.77,
+              "description": None, "amenity_ids": ["a", "b"]}
+
+    def roundtrip(self, name):
+        """ Write and read back two records in format `name` """
+        fmt = serializers.get(name)
+        f = io.BytesIO()
+        items = [("Place.1", fmt.dump_record(self.record)),
+                 ("Place.2", fmt.dump_record({"id": "2"}))]
+        entries = fmt.write(f, items)
+        data = f.getvalue()
+        self.assertIs(serializers.detect(data[:16]), fmt)
+        self.assertEqual(dict(fmt.read(data)),
+                         {"Place.1": self.record, "Place.2": {"id": "2"}})
+        for key, offset, length in entries:
+            self.assertEqual(
+                fmt.load_record(data[offset:offset + length]),
+                dict(fmt.read(data))[key])
+
+    def test_json(self):
+        """ The default format round-trips and matches json.dump """
+        self.roundtrip("json")
+        fmt = serializers.get("json")
+        f = io.BytesIO()
+        fmt.write(f, [("Place.1", fmt.dump_record(self.record))])
+        self.assertEqual(f.getvalue().decode(),
+                         json.dumps({"Place.1": self.record}, indent=2))
+
+    def test_compact(self):
+        """ The compact JSON format round-trips """
+        self.roundtrip("compact")
+
+    def test_compact_big_integer(self):
+        """ Integers of any size are encoded, with or without orjson """
+        fmt = serializers.get("compact")
+        record = {"id": "1", "number": 2 ** 70}
+        self.assertEqual(fmt.load_record(fmt.dump_record(record)), record)
+
+    def test_json_values(self):
+        """ NaN, infinities and big integers read back as written """
+        record = {"id": "1", "latitude": float("nan"),
+                  "longitude": float("inf"), "number": 2 ** 70,
+                  "amenity_ids": [float("-inf")]}
+        for name in ("json", "compact"):
+            fmt = serializers.get(name)
+            f = io.BytesIO()
+            fmt.write(f, [("Place.1", fmt.dump_record(record))])
+            found = dict(fmt.read(f.getvalue()))["Place.1"]
+            self.assertTrue(math.isnan(found.pop("latitude")))
+            self.assertEqual(found, {"id": "1", "longitude": float("inf"),
+                                     "number": 2 ** 70,
+                                     "amenity_ids": [float("-inf")]})
+            self.assertIsInstance(found["number"], int)
+
+    @unittest.skipIf(serializers.orjson is None, "orjson not installed")
+    def test_compact_orjson(self):
+        """ orjson encodes the compact format when installed """
+        fmt = serializers.get("compact")
+        self.assertEqual(json.loads(fmt.dump_record(self.record)),
+                         self.record)
+
+    def test_binary(self):
+        """ The struct-packed format round-trips """
+        self.roundtrip("binary")
+
+    @unittest.skipIf(serializers.msgpack is None, "msgpack not installed")
+    def test_msgpack(self):
+        """ The msgpack format round-trips """
+        self.roundtrip("msgpack")
+
+    def test_binary_smaller(self):
+        """ The binary format is smaller than the default one """
+        sizes = {}
+        for name in ("json", "compact", "binary"):
+            fmt = serializers.get(name)
+            sizes[name] = len(fmt.dump_record(self.record))
+        self.assertLess(sizes["compact"], sizes["json"])
+        self.assertLess(sizes["binary"], sizes["compact"])
+
+    def test_binary_truncated(self):
+        """ A truncated binary file raises ValueError """
+        fmt = serializers.get("binary")
+        f = io.BytesIO()
+        fmt.write(f, [("Place.1", fmt.dump_record(self.record))])
+        with self.assertRaises(ValueError):
+            list(fmt.read(f.getvalue()[:-3]))
+
+    def test_empty(self):
+        """ Empty stores are detected and read back empty """
+        for name in ("json", "compact", "binary"):
+            fmt = serializers.get(name)
+            f = io.BytesIO()
+            fmt.write(f, [])
+            self.assertEqual(list(fmt.read(f.getvalue())), [])
+            self.assertIsNotNone(serializers.detect(f.getvalue()))
+
+    def test_get_unknown(self):
+        """ Unknown formats are refused """
+        with self.assertRaises(ValueError):
+            serializers.get("yaml")
+
+    def test_migrate(self):
+        """ A JSON store is converted to the binary format """
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "file.json")
+            dst = os.path.join(tmp, "file.bin")
+            with open(src, 'w') as f:
+                json.dump({"Place.1": self.record}, f, indent=2)
+            self.assertEqual(serializers.migrate(src, dst, "binary"), 1)
+            with open(dst, 'rb') as f:
+                data = f.read()
+            fmt = serializers.detect(data[:16])
+            self.assertEqual(fmt.name, "binary")
+            self.assertEqual(dict(fmt.read(data)), {"Place.1": self.record})
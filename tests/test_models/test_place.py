@@ -2,6 +2,11 @@
 """ """
 from tests.test_models.test_base_model import test_basemodel
 from models.place import Place
+from models.amenity import Amenity
+from models.review import Review
+from models import storage
+import models
+import unittest
 
 
 class test_Place(test_basemodel):
@@ -67,3 +72,46 @@ class test_Place(test_basemodel):
         """ """
         new = self.value()
         self.assertEqual(type(new.amenity_ids), list)
+
+    @unittest.skipIf(models.storage_t == "db", "file storage only")
+    def test_amenity_ids_not_shared(self):
+        """ Each place has its own list of amenity ids """
+        first, second = self.value(), self.value()
+        first.amenity_ids.append("x")
+        self.assertEqual(second.amenity_ids, [])
+        self.assertIn("amenity_ids", first.to_dict())
+        self.assertEqual(self.value.from_dict({}).amenity_ids, [])
+
+    @unittest.skipIf(models.storage_t == "db", "file storage only")
+    def test_reviews(self):
+        """ reviews holds the reviews of the place only """
+        place, other = self.value(), self.value()
+        review = Review(place_id=place.id, text="nice")
+        objs = [place, other, review, Review(place_id=other.id)]
+        for obj in objs:
+            storage.new(obj)
+        try:
+            self.assertEqual([r.id for r in place.reviews], [review.id])
+        finally:
+            for obj in objs:
+                storage.delete(obj)
+
+    @unittest.skipIf(models.storage_t == "db", "file storage only")
+    def test_amenities(self):
+        """ amenities maps amenity_ids to Amenity instances """
+        place = self.value()
+        wifi, pool = Amenity(name="Wifi"), Amenity(name="Pool")
+        objs = [place, wifi, pool]
+        for obj in objs:
+            storage.new(obj)
+        try:
+            place.amenities = wifi
+            place.amenities = wifi
+            place.amenities = "not an amenity"
+            self.assertEqual(place.amenity_ids, [wifi.id])
+            self.assertEqual([a.id for a in place.amenities], [wifi.id])
+            storage.delete(wifi)
+            self.assertEqual(place.amenities, [])
+        finally:
+            for obj in objs:
+                storage.delete(obj)
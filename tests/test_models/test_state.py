@@ -2,6 +2,10 @@
 """ """
 from tests.test_models.test_base_model import test_basemodel
 from models.state import State
+from models.city import City
+from models import storage
+import models
+import unittest
 
 
 class test_state(test_basemodel):
@@ -17,3 +21,21 @@ class test_state(test_basemodel):
         """ """
         new = self.value()
         self.assertEqual(type(new.name), str)
+
+    @unittest.skipIf(models.storage_t == "db", "file storage only")
+    def test_cities(self):
+        """ cities holds the cities of the state only """
+        state, other = self.value(), self.value()
+        cities = [City(state_id=state.id), City(state_id=state.id),
+                  City(state_id=other.id)]
+        for obj in [state, other] + cities:
+            storage.new(obj)
+        try:
+            self.assertEqual(sorted(c.id for c in state.cities),
+                             sorted(c.id for c in cities[:2]))
+            self.assertEqual([c.id for c in other.cities], [cities[2].id])
+            storage.delete(cities[0])
+            self.assertEqual([c.id for c in state.cities], [cities[1].id])
+        finally:
+            for obj in [state, other] + cities:
+                storage.delete(obj)